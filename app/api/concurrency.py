@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+from fastapi import HTTPException
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# The service layer (OpenAI, Pinecone, Neo4j, SQLite clients) is blocking;
+# routes hand it to these pools so the event loop stays free.
+request_pool = ThreadPoolExecutor(max_workers=settings.request_max_workers, thread_name_prefix="request")
+ingestion_pool = ThreadPoolExecutor(max_workers=settings.ingestion_max_concurrency, thread_name_prefix="ingestion")
+
+_DONE = object()
+
+async def run_blocking(fn: Callable[..., T], *args, pool: Optional[ThreadPoolExecutor] = None, **kwargs) -> T:
+    """Run blocking service code on `pool` (the request pool by default) in the caller's context."""
+    loop = asyncio.get_running_loop()
+    call = partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await loop.run_in_executor(pool or request_pool, call)
+
+async def iterate_blocking(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Drive a blocking iterator (a streaming pipeline) from the event loop, one
+    item per pool hop. When iteration stops early (client gone, error) the
+    iterator is closed on the pool, once any step still running there ends,
+    so its cleanup runs.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    lock = threading.Lock()
+
+    def step():
+        with lock:
+            return next(iterator, _DONE)
+
+    def close():
+        with lock:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    try:
+        while True:
+            item = await loop.run_in_executor(request_pool, context.run, step)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        request_pool.submit(context.run, close)
+
+class AdmissionLimiter:
+    """
+    Caps how many requests of one kind run at once. Up to `max_queue` more
+    may wait, each for at most `queue_timeout` seconds, for a free slot.
+    Past that the request is rejected with 429 and Retry-After, so clients
+    back off instead of piling onto a saturated worker.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+        self._waiting = 0
+        self._peak_active = 0
+        self._admitted = 0
+        self._rejected = 0
+
+    def _reject(self) -> None:
+        self._rejected += 1
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many concurrent {self.name} requests; retry shortly",
+            headers={"Retry-After": str(settings.backpressure_retry_after_seconds)}
+        )
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._reject()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject()
+        finally:
+            self._waiting -= 1
+        self._active += 1
+        self._admitted += 1
+        self._peak_active = max(self._peak_active, self._active)
+
+    def release(self) -> None:
+        self._active -= 1
+        self._semaphore.release()
+
+    def releaser(self) -> Callable[[], Awaitable[None]]:
+        """
+        A release for a slot handed over to a streamed response. It may be
+        called from both the stream's cleanup and the response's background
+        task (the stream never starts if the client leaves first); only the
+        first call releases.
+        """
+        released = False
+
+        async def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+        return release
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "waiting": self._waiting,
+            "peak_active": self._peak_active,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "saturation": round(self._active / self.max_concurrent, 3)
+        }
+
+chat_limiter = AdmissionLimiter(
+    "chat",
+    max_concurrent=settings.chat_max_concurrency,
+    max_queue=settings.chat_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds
+)
+
+ingestion_limiter = AdmissionLimiter(
+    "ingestion",
+    max_concurrent=settings.ingestion_max_concurrency,
+    max_queue=settings.ingestion_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds
+)
+
+# A batch runs BATCH_WORKERS answers at once, so it is admitted on its own
+# limiter rather than holding a single chat slot.
+batch_limiter = AdmissionLimiter(
+    "batch",
+    max_concurrent=settings.batch_max_concurrency,
+    max_queue=settings.batch_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds
+)
+
+def pool_stats(pool: ThreadPoolExecutor) -> Dict[str, Any]:
+    return {"max_workers": pool._max_workers, "threads": len(pool._threads), "queued": pool._work_queue.qsize()}
\ No newline at end of file
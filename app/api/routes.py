@@ -1,17 +1,34 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from contextlib import aclosing
+from typing import List, Dict, Any, AsyncGenerator, Awaitable, Callable
 import shutil
+import json
 import os
 from app.core.config import settings
 from app.services.document_processor import process_uploaded_file
-from app.services.rag_pipeline import run_rag_pipeline
+from app.services.rag_pipeline import run_rag_pipeline, stream_rag_pipeline, run_batch_pipeline, stage_pool
+from app.services.kg_cache import graph_cache
+from app.services.answer_cache import answer_cache
+from app.services.llm_service import completion_flight
+from app.services.embedding_service import embedding_flight
+from app.services.entity_matcher import entity_matcher
+from app.services.rate_limiter import upstream
+from app.database.neo4j_connection import graph_db
+from app.utils.deadline import Deadline
+from app.utils.metrics import metrics
+from app.api.concurrency import (
+    run_blocking, iterate_blocking, chat_limiter, ingestion_limiter, batch_limiter,
+    request_pool, ingestion_pool, pool_stats
+)
 from app.database.repository import (
     get_all_documents, 
     get_session_history, 
     save_chat_message
 )
 from app.models.schemas import (
-    ChatRequest, ChatResponse, 
+    ChatRequest, ChatResponse, BatchChatRequest,
     UploadResponse, HealthResponse,
     DocumentListResponse, ChatHistoryResponse
 )
@@ -28,38 +45,134 @@ async def upload_document(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only PDF and TXT files supported")
     
     file_path = f"{settings.upload_folder}/{file.filename}"
+    async with ingestion_limiter.slot():
+        await run_blocking(_save_upload, file, file_path, pool=ingestion_pool)
+        try:
+            result = await run_blocking(process_uploaded_file, file_path, file.filename, pool=ingestion_pool)
+            return result
+        except Exception as e:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise HTTPException(status_code=500, detail=str(e))
+
+def _save_upload(file: UploadFile, file_path: str) -> None:
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
-        
-    try:
-        result = process_uploaded_file(file_path, file.filename)
-        return result
-    except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=str(e))
+
+def _save_exchange(session_id: int, question: str, answer: str) -> None:
+    save_chat_message(session_id, "user", question)
+    save_chat_message(session_id, "assistant", answer)
 
 @router.post("/chat/ask", response_model=ChatResponse)
 async def chat_ask(request: ChatRequest):
-    try:
-        session_id = request.session_id or 1 
-        response = run_rag_pipeline(
-            question=request.question, 
-            session_id=session_id,
-            mode=request.mode
-        )
-        
-        save_chat_message(session_id, "user", request.question)
-        save_chat_message(session_id, "assistant", response["answer"])
-        
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async with chat_limiter.slot():
+        try:
+            session_id = request.session_id or 1 
+            response = await run_blocking(
+                run_rag_pipeline,
+                question=request.question, 
+                session_id=session_id,
+                mode=request.mode or "hybrid",
+                filters=request.filters,
+                deadline=Deadline.from_ms(request.deadline_ms, settings.request_deadline_seconds),
+                timings=request.include_timings
+            )
+            
+            await run_blocking(_save_exchange, session_id, request.question, response["answer"])
+            
+            return response
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _event_stream(events: AsyncGenerator[str, None], release: Callable[[], Awaitable[None]]) -> StreamingResponse:
+    """
+    SSE response holding an admission slot. Once the response is over the
+    stream is closed (which closes the pipeline behind it) and the slot is
+    freed, also when the client left before the first event was sent.
+    """
+    async def finish() -> None:
+        try:
+            await events.aclose()
+        finally:
+            await release()
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(finish)
+    )
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Server-Sent Events: `retrieval`, then `token` deltas, then `final`
+    (verification, confidence and the refusal decision).
+    """
+    session_id = request.session_id or 1
+    deadline = Deadline.from_ms(request.deadline_ms, settings.request_deadline_seconds)
+    # Admission happens before the response starts, so saturation is a plain 429;
+    # the slot is held until the stream ends or the client leaves.
+    await chat_limiter.acquire()
+    release = chat_limiter.releaser()
+
+    async def events():
+        final = None
+        try:
+            pipeline = stream_rag_pipeline(
+                request.question, session_id, request.mode or "hybrid", request.filters, deadline, request.include_timings
+            )
+            async with aclosing(iterate_blocking(pipeline)) as steps:
+                async for event in steps:
+                    if event["event"] == "final":
+                        final = event["data"]
+                    yield _sse(event["event"], event["data"])
+            await run_blocking(_save_exchange, session_id, request.question, final["answer"])
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            await release()
+
+    return _event_stream(events(), release)
+
+@router.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """
+    Server-Sent Events: one `result` per question as soon as it is answered
+    (carrying its index in `questions`), then `done`. Retrieval is shared
+    across each chunk of the batch; see run_batch_pipeline. Batches are
+    admitted on their own limiter, not the chat one.
+    """
+    if len(request.questions) > settings.batch_max_questions:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_questions} questions per batch")
+
+    session_id = request.session_id or 1
+    await batch_limiter.acquire()
+    release = batch_limiter.releaser()
+
+    async def events():
+        try:
+            pipeline = run_batch_pipeline(request.questions, request.mode or "hybrid", request.filters)
+            async with aclosing(iterate_blocking(pipeline)) as steps:
+                async for event in steps:
+                    if event["event"] == "result":
+                        data = event["data"]
+                        await run_blocking(_save_exchange, session_id, data["question"], data["response"]["answer"])
+                    yield _sse(event["event"], event["data"])
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            await release()
+
+    return _event_stream(events(), release)
 
 @router.get("/documents", response_model=DocumentListResponse)
 async def list_documents():
     try:
-        docs = get_all_documents()
+        docs = await run_blocking(get_all_documents)
         return {"count": len(docs), "documents": docs}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -67,7 +180,66 @@ async def list_documents():
 @router.get("/chat/history/{session_id}", response_model=ChatHistoryResponse)
 async def get_history(session_id: int):
     try:
-        messages = get_session_history(session_id)
+        messages = await run_blocking(get_session_history, session_id)
         return {"session_id": session_id, "messages": messages}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/chat/cache/stats")
+async def answer_cache_stats():
+    return answer_cache.stats()
+
+@router.get("/llm/coalescing/stats")
+async def llm_coalescing_stats():
+    return {
+        "chat_completions": completion_flight.stats(),
+        "embeddings": embedding_flight.stats()
+    }
+
+@router.get("/llm/scheduler/stats")
+async def llm_scheduler_stats():
+    return upstream.stats()
+
+@router.get("/kg/cache/stats")
+async def kg_cache_stats():
+    return graph_cache.stats()
+
+@router.get("/kg/matcher/stats")
+async def kg_matcher_stats():
+    return entity_matcher.stats()
+
+@router.get("/kg/pool/stats")
+async def kg_pool_stats():
+    return graph_db.stats()
+
+@router.get("/server/concurrency/stats")
+async def concurrency_stats():
+    return {
+        "chat": chat_limiter.stats(),
+        "ingestion": ingestion_limiter.stats(),
+        "batch": batch_limiter.stats(),
+        "request_pool": pool_stats(request_pool),
+        "ingestion_pool": pool_stats(ingestion_pool)
+    }
+
+# Scraped on every /metrics request, next to the counters and histograms
+# recorded as requests run (service spans, upstream calls and tokens,
+# HTTP latency).
+metrics.add_stats("answer_cache", answer_cache.stats)
+metrics.add_stats("kg_cache", graph_cache.stats)
+metrics.add_stats("kg_pool", graph_db.stats)
+metrics.add_stats("entity_matcher", entity_matcher.stats)
+metrics.add_stats("upstream", upstream.stats)
+metrics.add_stats("completion_coalescing", completion_flight.stats)
+metrics.add_stats("embedding_coalescing", embedding_flight.stats)
+metrics.add_stats("chat_admission", chat_limiter.stats)
+metrics.add_stats("ingestion_admission", ingestion_limiter.stats)
+metrics.add_stats("batch_admission", batch_limiter.stats)
+metrics.add_stats("request_pool", lambda: pool_stats(request_pool))
+metrics.add_stats("ingestion_pool", lambda: pool_stats(ingestion_pool))
+metrics.add_stats("stage_pool", lambda: pool_stats(stage_pool))
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Span and HTTP latency histograms, upstream call and token counters, and the stats registered above."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
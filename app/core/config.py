@@ -1,10 +1,20 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Optional
 
 class Settings(BaseSettings):
     openai_api_key: str
     openai_model: str = "gpt-4o"
     openai_embedding_model: str = "text-embedding-3-small"
+    llm_provider: str = "openai"
+    llm_base_url: Optional[str] = None
+    llm_timeout_seconds: float = 600.0
+
+    upstream_requests_per_minute: int = 500
+    upstream_tokens_per_minute: int = 200000
+    upstream_max_retries: int = 5
+    upstream_backoff_base: float = 0.5
+    upstream_backoff_max: float = 30.0
 
     pinecone_api_key: str
     pinecone_environment: str
@@ -14,6 +24,10 @@ class Settings(BaseSettings):
     neo4j_username: str
     neo4j_password: str
     neo4j_database: str = "neo4j"
+    neo4j_max_pool_size: int = 50
+    neo4j_acquisition_timeout: float = 30.0
+    neo4j_max_connection_lifetime: int = 3600
+    neo4j_max_retry_time: float = 15.0
 
     upload_folder: str = "./data/uploads"
     sqlite_db_path: str = "./data/sqlite.db"
@@ -21,6 +35,63 @@ class Settings(BaseSettings):
     top_k: int = 5 
     min_similarity_threshold: float = 0.5 
 
+    kg_cache_max_mb: int = 64
+    kg_cache_ttl_seconds: int = 3600
+
+    answer_cache_enabled: bool = True
+    answer_cache_similarity: float = 0.95
+    answer_cache_ttl_seconds: int = 86400
+    answer_cache_max_entries: int = 5000
+    answer_cache_generation_recheck_seconds: float = 5.0
+
+    context_token_budget: int = 3000
+    context_chunk_max_tokens: int = 400
+    context_dedup_threshold: float = 0.8
+
+    entity_fuzzy_cutoff: float = 0.88
+    entity_llm_fallback: bool = True
+
+    pipeline_max_workers: int = 64
+    retrieval_vector_timeout_seconds: float = 5.0
+    retrieval_kg_timeout_seconds: float = 5.0
+
+    rerank_enabled: bool = True
+    rerank_candidates: int = 20
+    rerank_weight_dense: float = 0.6
+    rerank_weight_lexical: float = 0.2
+    rerank_weight_kg: float = 0.15
+    rerank_weight_diversity: float = 0.05
+    rerank_mmr_lambda: float = 0.7
+
+    request_max_workers: int = 64
+    chat_max_concurrency: int = 32
+    chat_max_queue: int = 64
+    ingestion_max_concurrency: int = 2
+    ingestion_max_queue: int = 4
+    admission_queue_timeout_seconds: float = 5.0
+    backpressure_retry_after_seconds: int = 1
+    batch_max_concurrency: int = 2
+    batch_max_queue: int = 4
+    batch_max_questions: int = 200
+    batch_chunk_size: int = 25
+    batch_workers: int = 8
+
+    answer_confidence_threshold: float = 0.4
+    evidence_gate_enabled: bool = True
+    evidence_min_top_similarity: float = 0.0
+
+    request_deadline_seconds: float = 30.0
+    generation_min_seconds: float = 2.0
+    verification_min_seconds: float = 3.0
+    degraded_verification_max_claims: int = 3
+
+    verification_mode: str = "batched"
+    verification_top_k: int = 3
+    verification_max_concurrency: int = 4
+    verification_cascade: bool = True
+    verification_lexical_support: float = 1.0
+    verification_embedding_reject: float = 0.25
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
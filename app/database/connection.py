@@ -2,6 +2,7 @@ import sqlite3
 from pathlib import Path
 from typing import List, Dict, Any
 from app.core.config import settings
+from app.utils.tracing import traced
 
 Path(settings.upload_folder).mkdir(parents=True, exist_ok=True)
 DB_PATH = settings.sqlite_db_path
@@ -56,6 +57,47 @@ def init_db() -> None:
         )
     """)
 
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS relation_provenance (
+            relation_key TEXT NOT NULL,          -- Matches r.relation_key in Neo4j
+            source TEXT NOT NULL,
+            relation TEXT NOT NULL,
+            target TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            document_id INTEGER,
+            document TEXT,
+            page INTEGER DEFAULT 0,
+            PRIMARY KEY (relation_key, chunk_id),
+            FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_provenance_document ON relation_provenance (document_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_provenance_relation ON relation_provenance (relation)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL DEFAULT 0  -- bumped after every ingestion / clear
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO ingestion_state (id, generation) VALUES (1, 0)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            filters TEXT NOT NULL,               -- Canonical JSON of the retrieval filters
+            generation INTEGER NOT NULL,         -- Ingestion generation the answer was built on
+            embedding BLOB NOT NULL,             -- float32, L2-normalised question embedding
+            response TEXT NOT NULL,              -- JSON pipeline response
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER DEFAULT 0
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_answer_cache_generation ON answer_cache (generation)")
+
     conn.commit()
     conn.close()
 
@@ -91,6 +133,7 @@ def get_chunk_text(chunk_id: str) -> str | None:
     conn.close()
     return row[0] if row else None
 
+@traced("chunk_fetch")
 def get_chunk_texts(chunk_ids: List[str]) -> Dict[str, str]:
     if not chunk_ids:
         return {}
@@ -0,0 +1,206 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from neo4j import GraphDatabase, AsyncGraphDatabase, Driver, AsyncDriver, Session, AsyncSession
+from app.core.config import settings
+from app.utils.tracing import span
+
+T = TypeVar("T")
+
+SPAN_NAMES = {"execute_read": "neo4j_read", "execute_write": "neo4j_write"}
+
+logger = logging.getLogger("rag_chatbot")
+
+class Neo4jConnectionManager:
+    """
+    Owns the process-wide Neo4j drivers (sync and async) and their
+    connection pool. All graph reads and writes go through execute_read /
+    execute_write, i.e. managed transactions that the driver retries on
+    transient errors for up to `neo4j_max_retry_time` seconds.
+    """
+
+    def __init__(self):
+        self._driver: Optional[Driver] = None
+        self._async_driver: Optional[AsyncDriver] = None
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._transactions = 0
+        self._retries = 0
+        self._failures = 0
+        self._acquire_ms_total = 0.0
+        self._hooks: List[Callable[[], None]] = []
+        self._hooks_lock = threading.RLock()
+        self._hooks_done = False
+        self._hooks_running = False
+
+    def _driver_config(self) -> Dict[str, Any]:
+        return {
+            "auth": (settings.neo4j_username, settings.neo4j_password),
+            "max_connection_pool_size": settings.neo4j_max_pool_size,
+            "connection_acquisition_timeout": settings.neo4j_acquisition_timeout,
+            "max_connection_lifetime": settings.neo4j_max_connection_lifetime,
+            "max_transaction_retry_time": settings.neo4j_max_retry_time
+        }
+
+    @property
+    def driver(self) -> Driver:
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    self._driver = GraphDatabase.driver(settings.neo4j_uri, **self._driver_config())
+        return self._driver
+
+    @property
+    def async_driver(self) -> AsyncDriver:
+        if self._async_driver is None:
+            with self._lock:
+                if self._async_driver is None:
+                    self._async_driver = AsyncGraphDatabase.driver(settings.neo4j_uri, **self._driver_config())
+        return self._async_driver
+
+    def on_first_use(self, hook: Callable[[], None]) -> None:
+        """Register setup (e.g. schema creation) to run before the first transaction."""
+        self._hooks.append(hook)
+        self._hooks_done = False
+
+    def _run_hooks(self) -> None:
+        if self._hooks_done:
+            return
+        with self._hooks_lock:
+            # Hooks issue queries themselves; re-entrant calls fall through.
+            if self._hooks_done or self._hooks_running:
+                return
+            self._hooks_running = True
+            try:
+                for hook in self._hooks:
+                    hook()
+                self._hooks_done = True
+            except Exception as e:
+                logger.warning(f"Neo4j first-use setup failed, will retry: {e}")
+            finally:
+                self._hooks_running = False
+
+    def session(self, **kwargs) -> Session:
+        return self.driver.session(database=settings.neo4j_database, **kwargs)
+
+    def async_session(self, **kwargs) -> AsyncSession:
+        return self.async_driver.session(database=settings.neo4j_database, **kwargs)
+
+    def execute_read(self, work: Callable[..., T], *args, **kwargs) -> T:
+        return self._execute("execute_read", work, *args, **kwargs)
+
+    def execute_write(self, work: Callable[..., T], *args, **kwargs) -> T:
+        return self._execute("execute_write", work, *args, **kwargs)
+
+    async def execute_read_async(self, work: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self._execute_async("execute_read", work, *args, **kwargs)
+
+    async def execute_write_async(self, work: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self._execute_async("execute_write", work, *args, **kwargs)
+
+    def read(self, query: str, **params) -> List[Dict[str, Any]]:
+        """Run one read query in a managed transaction and return its records."""
+        return self.execute_read(lambda tx: tx.run(query, params).data())
+
+    def write(self, query: str, **params) -> List[Dict[str, Any]]:
+        return self.execute_write(lambda tx: tx.run(query, params).data())
+
+    async def read_async(self, query: str, **params) -> List[Dict[str, Any]]:
+        async def work(tx):
+            result = await tx.run(query, params)
+            return await result.data()
+        return await self.execute_read_async(work)
+
+    def _execute(self, method: str, work: Callable[..., T], *args, **kwargs) -> T:
+        self._run_hooks()
+        started = self._checkout()
+        first_attempt = [True]
+
+        def tracked(tx, *a, **kw):
+            self._record_attempt(started, first_attempt)
+            return work(tx, *a, **kw)
+
+        try:
+            with span(SPAN_NAMES[method]), self.session() as session:
+                return getattr(session, method)(tracked, *args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        finally:
+            self._checkin()
+
+    async def _execute_async(self, method: str, work: Callable[..., Any], *args, **kwargs) -> Any:
+        self._run_hooks()
+        started = self._checkout()
+        first_attempt = [True]
+
+        async def tracked(tx, *a, **kw):
+            self._record_attempt(started, first_attempt)
+            return await work(tx, *a, **kw)
+
+        try:
+            with span(SPAN_NAMES[method]):
+                async with self.async_session() as session:
+                    return await getattr(session, method)(tracked, *args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        finally:
+            self._checkin()
+
+    def _checkout(self) -> float:
+        with self._lock:
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._transactions += 1
+        return time.perf_counter()
+
+    def _checkin(self) -> None:
+        with self._lock:
+            self._in_use -= 1
+
+    def _record_attempt(self, started: float, first_attempt: List[bool]) -> None:
+        with self._lock:
+            if first_attempt[0]:
+                # Time until the transaction function first runs = pool acquisition + BEGIN.
+                self._acquire_ms_total += (time.perf_counter() - started) * 1000
+                first_attempt[0] = False
+            else:
+                self._retries += 1
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Pool utilisation as seen by this process: transactions currently
+        holding a connection versus the configured pool size.
+        """
+        with self._lock:
+            pool_size = settings.neo4j_max_pool_size
+            return {
+                "max_pool_size": pool_size,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "utilisation": round(self._in_use / pool_size, 4) if pool_size else 0.0,
+                "transactions": self._transactions,
+                "retries": self._retries,
+                "failures": self._failures,
+                "avg_acquire_ms": round(self._acquire_ms_total / self._transactions, 3) if self._transactions else 0.0
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._driver is not None:
+                self._driver.close()
+                self._driver = None
+
+    async def close_async(self) -> None:
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+
+graph_db = Neo4jConnectionManager()
\ No newline at end of file
@@ -1,3 +1,4 @@
+import json
 import sqlite3
 from typing import List, Dict, Any, Optional
 from app.database.connection import (
@@ -75,5 +76,177 @@ def get_session_history(session_id: int) -> List[Dict[str, Any]]:
             }
             for row in rows
         ]
+    finally:
+        conn.close()
+
+def save_relation_provenance(rows: List[Dict[str, Any]]) -> int:
+    """
+    Store one row per (relation, chunk). Repeated mentions from the same
+    chunk are ignored, so provenance never grows with duplicates.
+    """
+    if not rows:
+        return 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("""
+            INSERT OR IGNORE INTO relation_provenance
+                (relation_key, source, relation, target, chunk_id, document_id, document, page)
+            VALUES (:relation_key, :source, :relation, :target, :chunk_id, :document_id, :document, :page)
+        """, rows)
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def get_relation_provenance(
+    relation_type: Optional[str] = None,
+    document_id: Optional[int] = None,
+    relation_key: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        clauses, params = [], []
+        if relation_key is not None:
+            clauses.append("relation_key = ?")
+            params.append(relation_key)
+        if relation_type is not None:
+            clauses.append("relation = ?")
+            params.append(relation_type)
+        if document_id is not None:
+            clauses.append("document_id = ?")
+            params.append(document_id)
+
+        query = "SELECT relation_key, source, relation, target, document, document_id, page, chunk_id FROM relation_provenance"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        cursor.execute(query, params)
+        return [
+            {
+                "relation_key": row[0],
+                "source": row[1],
+                "relation": row[2],
+                "target": row[3],
+                "document": row[4],
+                "document_id": row[5],
+                "page": row[6],
+                "chunk_id": row[7]
+            }
+            for row in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+def clear_relation_provenance() -> None:
+    conn = get_connection()
+    try:
+        conn.execute("DELETE FROM relation_provenance")
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_ingestion_generation() -> int:
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT generation FROM ingestion_state WHERE id = 1").fetchone()
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+def bump_ingestion_generation() -> int:
+    """Mark the indexed corpus as changed; answers built on older generations go stale."""
+    conn = get_connection()
+    try:
+        conn.execute("UPDATE ingestion_state SET generation = generation + 1 WHERE id = 1")
+        conn.commit()
+        return conn.execute("SELECT generation FROM ingestion_state WHERE id = 1").fetchone()[0]
+    finally:
+        conn.close()
+
+def save_cached_answer(entry: Dict[str, Any]) -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO answer_cache
+                (question, mode, filters, generation, embedding, response, created_at, last_used_at)
+            VALUES (:question, :mode, :filters, :generation, :embedding, :response, :created_at, :created_at)
+        """, {**entry, "response": json.dumps(entry["response"], default=str)})
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+def get_cached_answers(generation: int, min_created_at: float) -> List[Dict[str, Any]]:
+    """Index rows (no response bodies) of the live cache entries."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT id, question, mode, filters, embedding, created_at, last_used_at
+            FROM answer_cache
+            WHERE generation = ? AND created_at >= ?
+        """, (generation, min_created_at))
+        return [
+            {
+                "id": row[0],
+                "question": row[1],
+                "mode": row[2],
+                "filters": row[3],
+                "embedding": row[4],
+                "created_at": row[5],
+                "last_used_at": row[6]
+            }
+            for row in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+def use_cached_answer(entry_id: int, used_at: float) -> Optional[Dict[str, Any]]:
+    """Fetch a cached response and record the hit."""
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT response FROM answer_cache WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE answer_cache SET last_used_at = ?, hits = hits + 1 WHERE id = ?",
+            (used_at, entry_id)
+        )
+        conn.commit()
+        return json.loads(row[0])
+    finally:
+        conn.close()
+
+def delete_cached_answers(entry_ids: List[int]) -> None:
+    if not entry_ids:
+        return
+
+    conn = get_connection()
+    try:
+        placeholders = ','.join('?' for _ in entry_ids)
+        conn.execute(f"DELETE FROM answer_cache WHERE id IN ({placeholders})", entry_ids)
+        conn.commit()
+    finally:
+        conn.close()
+
+def purge_cached_answers(generation: int, min_created_at: float) -> int:
+    """Drop entries from older ingestion generations or past their TTL."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM answer_cache WHERE generation != ? OR created_at < ?",
+            (generation, min_created_at)
+        )
+        conn.commit()
+        return cursor.rowcount
     finally:
         conn.close()
\ No newline at end of file
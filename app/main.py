@@ -1,14 +1,43 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from app.api.routes import router
+from app.database.neo4j_connection import graph_db
+from app.utils.metrics import metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    graph_db.close()
+    await graph_db.close_async()
 
 app = FastAPI(
     title="Explainable RAG Chatbot",
     description="Compliance-grade RAG with citations & confidence",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(router)
 
+HTTP_SECONDS = metrics.histogram(
+    "http_request_seconds", "Time to response headers (first byte for streams) per route", ("method", "route", "status")
+)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.monotonic()
+    response = await call_next(request)
+    # The route template, not the raw path, keeps label cardinality bounded.
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        time.monotonic() - started,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    )
+    return response
+
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Literal
+from typing import List, Optional, Dict, Any, Literal, Union
 
 class HealthResponse(BaseModel):
     status: str
@@ -48,23 +48,53 @@ class KnowledgeGraphSchema(BaseModel):
 class ChatRequest(BaseModel):
     question: str
     session_id: Optional[int] = None
-    mode: Optional[str] = "hybrid"
+    mode: Optional[Literal["llm_only", "rag_only", "kg_only", "hybrid"]] = "hybrid"
+    filters: Optional[Dict[str, Any]] = Field(None, description="Pinecone metadata filter, e.g. {\"document\": \"policy.pdf\"}")
+    deadline_ms: Optional[int] = Field(None, gt=0, description="Time budget for the whole request; defaults to REQUEST_DEADLINE_SECONDS")
+    include_timings: bool = Field(False, description="Add a per-span `timings` block to the response")
+
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, description="Up to BATCH_MAX_QUESTIONS questions, answered with shared retrieval")
+    session_id: Optional[int] = None
+    mode: Optional[Literal["llm_only", "rag_only", "kg_only", "hybrid"]] = "hybrid"
+    filters: Optional[Dict[str, Any]] = Field(None, description="Pinecone metadata filter applied to every question")
 
 class Citation(BaseModel):
     document: str
     page: int
-    text_snippet: str
-    source_type: Literal["text", "graph"]
+    source: Literal["text", "graph"]
+
+class SupportedClaim(BaseModel):
+    claim: str
+    supported_by: str = Field(..., description="text, KG or text + KG")
+    verified_by: str = Field(..., description="Verification tier that accepted the claim: lexical or llm")
+
+class ExplanationSources(BaseModel):
+    documents: List[Dict[str, Any]]
+    kg_paths: List[Dict[str, Any]]
 
 class Explanation(BaseModel):
     summary: str
-    reasoning_chain: List[str]
-    confidence_score: float
-    metrics: Dict[str, float] 
+    supported_claims: List[SupportedClaim]
+    unsupported_claims: List[str]
+    sources: ExplanationSources
+    confidence_signals: Dict[str, float]
 
 class ChatResponse(BaseModel):
     answer: str
-    citations: List[Citation]
-    explanation: Optional[Explanation] = None
+    citations: List[Citation] = Field(default_factory=list)
+    explanation: Optional[Union[Explanation, str]] = Field(None, description="Structured for a verified answer; a sentence for refusals and retrieval-only responses")
     refusal: bool
-    refusal_reason: Optional[str] = None
\ No newline at end of file
+    refusal_reason: Optional[str] = None
+    confidence: Optional[float] = None
+    confidence_level: Optional[str] = None
+    unsupported_claims: Optional[List[str]] = Field(None, description="Claims that failed verification, when they caused the refusal")
+    sources: Optional[Dict[str, int]] = Field(None, description="Vector chunks and KG paths the answer drew on")
+    context_packing: Optional[Dict[str, Any]] = None
+    evidence_gate: Optional[Dict[str, Any]] = Field(None, description="Why the evidence gate refused before generation")
+    cached: bool = False
+    cache: Optional[Dict[str, Any]] = Field(None, description="Similarity and matched question when served from the answer cache")
+    degraded: List[str] = Field(default_factory=list, description="Stages cut short to meet the deadline, e.g. kg_enrichment, verification, generation")
+    mode: Optional[str] = None
+    latency_ms: Optional[Dict[str, float]] = Field(None, description="Wall time per pipeline stage that ran, plus the total")
+    timings: Optional[Dict[str, Any]] = Field(None, description="Service spans of this request, when include_timings was set")
\ No newline at end of file
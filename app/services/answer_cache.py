@@ -0,0 +1,248 @@
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.core.config import settings
+from app.utils.tracing import traced
+from app.database.repository import (
+    get_ingestion_generation,
+    save_cached_answer,
+    get_cached_answers,
+    use_cached_answer,
+    delete_cached_answers,
+    purge_cached_answers
+)
+
+def _filters_key(filters: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+def _normalise(embedding: np.ndarray) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class AnswerCache:
+    """
+    Semantic answer cache. Responses live in SQLite (answer_cache); the
+    normalised question embeddings of the live entries are kept in memory
+    as one matrix, so a lookup is a single matrix-vector product.
+
+    A hit needs cosine similarity >= threshold, the same mode and filters,
+    and the ingestion generation the answer was built on. Any upload or
+    graph clear bumps the generation, which empties the cache. Ingestion in
+    this process reports the bump through invalidate(); the stored
+    generation is re-read every `recheck_seconds` for other processes.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int, recheck_seconds: float = 5.0):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._latest: Optional[int] = None
+        self._checked_at = 0.0
+        self._reset_index()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _reset_index(self) -> None:
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._matrix: Optional[np.ndarray] = None
+        self._codes = np.zeros(0, dtype=np.int64)
+        self._created = np.zeros(0)
+        self._last_used = np.zeros(0)
+        self._questions: List[str] = []
+        self._key_codes: Dict[tuple, int] = {}
+
+    def _code(self, mode: str, filters_key: str) -> int:
+        return self._key_codes.setdefault((mode, filters_key), len(self._key_codes))
+
+    def _append(self, entry_id: int, question: str, code: int, vector: np.ndarray, created: float, last_used: float) -> None:
+        self._ids = np.append(self._ids, entry_id)
+        self._codes = np.append(self._codes, code)
+        self._created = np.append(self._created, created)
+        self._last_used = np.append(self._last_used, last_used)
+        self._matrix = vector[None, :] if self._matrix is None else np.vstack([self._matrix, vector])
+        self._questions.append(question)
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self._ids = self._ids[mask]
+        self._codes = self._codes[mask]
+        self._created = self._created[mask]
+        self._last_used = self._last_used[mask]
+        self._matrix = self._matrix[mask] if self._matrix is not None and mask.any() else None
+        self._questions = [q for q, keep in zip(self._questions, mask) if keep]
+
+    def _load(self, rows: List[Dict[str, Any]]) -> None:
+        self._reset_index()
+        if not rows:
+            return
+        self._ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self._codes = np.array([self._code(row["mode"], row["filters"]) for row in rows], dtype=np.int64)
+        self._created = np.array([row["created_at"] for row in rows], dtype=float)
+        self._last_used = np.array([row["last_used_at"] for row in rows], dtype=float)
+        self._matrix = np.stack([np.frombuffer(row["embedding"], dtype=np.float32) for row in rows])
+        self._questions = [row["question"] for row in rows]
+
+    def _latest_generation(self) -> int:
+        """
+        The newest known ingestion generation. SQLite is read outside the
+        lock, and at most every `recheck_seconds`.
+        """
+        with self._lock:
+            latest, checked_at = self._latest, self._checked_at
+        if latest is not None and time.monotonic() - checked_at < self.recheck_seconds:
+            return latest
+
+        stored = get_ingestion_generation()
+        with self._lock:
+            # An invalidate() that raced with the read may already be newer.
+            self._latest = stored if self._latest is None else max(self._latest, stored)
+            self._checked_at = time.monotonic()
+            return self._latest
+
+    def _sync(self, generation: int) -> int:
+        """Reload the index when the generation moved on (called under the lock)."""
+        if generation != self._generation:
+            min_created = time.time() - self.ttl_seconds
+            purge_cached_answers(generation, min_created)
+            self._load(get_cached_answers(generation, min_created))
+            self._generation = generation
+        return generation
+
+    def invalidate(self, generation: int) -> None:
+        """Ingestion bumped the generation to `generation`; older answers go stale."""
+        with self._lock:
+            self._latest = generation if self._latest is None else max(self._latest, generation)
+
+    def _expire(self, now: float) -> None:
+        expired = self._created < now - self.ttl_seconds
+        if expired.any():
+            delete_cached_answers(self._ids[expired].tolist())
+            self._keep(~expired)
+
+    def generation(self) -> int:
+        """Take before building an answer and pass it to store()."""
+        latest = self._latest_generation()
+        with self._lock:
+            return self._sync(latest)
+
+    @traced("answer_cache_lookup")
+    def lookup(
+        self,
+        embedding: np.ndarray,
+        mode: str,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        query = _normalise(embedding)
+        latest = self._latest_generation()
+
+        with self._lock:
+            self._sync(latest)
+            self._expire(now)
+            code = self._key_codes.get((mode, _filters_key(filters)))
+            if code is None or self._matrix is None:
+                self._misses += 1
+                return None
+
+            similarities = np.where(self._codes == code, self._matrix @ query, -1.0)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._misses += 1
+                return None
+
+            entry_id = int(self._ids[best])
+            matched_question = self._questions[best]
+            cached_at = float(self._created[best])
+            self._last_used[best] = now
+
+        response = use_cached_answer(entry_id, now)
+        with self._lock:
+            if response is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+
+        return {
+            **response,
+            "cached": True,
+            "cache": {
+                "similarity": round(similarity, 4),
+                "matched_question": matched_question,
+                "cached_at": datetime.fromtimestamp(cached_at, tz=timezone.utc).isoformat()
+            }
+        }
+
+    def store(
+        self,
+        question: str,
+        embedding: np.ndarray,
+        mode: str,
+        filters: Optional[Dict[str, Any]],
+        response: Dict[str, Any],
+        generation: int
+    ) -> None:
+        """Cache a grounded answer; refusals are not cached."""
+        if response.get("refusal"):
+            return
+
+        vector = _normalise(embedding)
+        filters_key = _filters_key(filters)
+        now = time.time()
+        body = {k: v for k, v in response.items() if k not in ("cached", "cache")}
+        latest = self._latest_generation()
+
+        with self._lock:
+            # The corpus changed while the answer was being built.
+            if self._sync(latest) != generation:
+                return
+
+        entry_id = save_cached_answer({
+            "question": question,
+            "mode": mode,
+            "filters": filters_key,
+            "generation": generation,
+            "embedding": vector.tobytes(),
+            "response": body,
+            "created_at": now
+        })
+
+        with self._lock:
+            if self._generation != generation:
+                return
+            self._append(entry_id, question, self._code(mode, filters_key), vector, now, now)
+
+            overflow = len(self._ids) - self.max_entries
+            if overflow > 0:
+                evict = np.zeros(len(self._ids), dtype=bool)
+                evict[np.argsort(self._last_used, kind="stable")[:overflow]] = True
+                delete_cached_answers(self._ids[evict].tolist())
+                self._keep(~evict)
+                self._evictions += overflow
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._ids),
+                "max_entries": self.max_entries,
+                "generation": self._generation,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions
+            }
+
+answer_cache = AnswerCache(
+    threshold=settings.answer_cache_similarity,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    max_entries=settings.answer_cache_max_entries,
+    recheck_seconds=settings.answer_cache_generation_recheck_seconds
+)
\ No newline at end of file
@@ -0,0 +1,218 @@
+import re
+import zlib
+import logging
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.core.config import settings
+from app.services.reranker import content_terms
+from app.utils.tracing import traced
+
+logger = logging.getLogger("rag_chatbot")
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+NUM_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 31) - 1
+KG_WEIGHT = 0.8
+HOP_DECAY = 0.85
+CENTRALITY_WEIGHT = 0.3
+QUESTION_WEIGHT = 0.5
+DOCUMENT_HEADER = "=== Relevant Document Excerpts ===\n"
+KG_HEADER = "=== Knowledge Graph Facts ===\n"
+
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        logger.warning("tiktoken not installed; approximating token counts as chars / 4")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(settings.openai_model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The BPE file is downloaded on first use, which fails offline.
+        logger.warning(f"tiktoken encoding unavailable ({e}); approximating token counts as chars / 4")
+        return None
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash over word shingles; the fraction of equal slots estimates Jaccard similarity."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))}
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+    # (a * x + b) mod p for every permutation and shingle, minimum per permutation.
+    permuted = (hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+def format_chunk(ev: Dict[str, Any], text: Optional[str] = None) -> str:
+    return (
+        f"Document: {ev['document']} (Page {ev['page']})\n"
+        f"Text: {ev['text'] if text is None else text}\n"
+    )
+
+def format_kg_fact(path: Dict[str, Any]) -> str:
+    if "path" in path:
+        rels = " -> ".join([f"{r['type']} ({r.get('description', '')})" for r in path["path"]])
+        return f"{path.get('start', '')} {rels} {path.get('target', '')}\n"
+    return str(path) + "\n"
+
+def _kg_score(path: Dict[str, Any]) -> float:
+    """
+    Mean edge confidence, decayed per hop; paths joining question entities
+    rank first. Paths ending in a well-connected entity (graph analytics
+    centrality, when kg_store attached it) rank above peripheral ones.
+    """
+    relations = path.get("path") or []
+    if not relations:
+        return 0.0
+    confidence = float(np.mean([min(r.get("confidence", 0.9), 1.0) for r in relations]))
+    weight = 1.0 if path.get("source") == "claim_path" else KG_WEIGHT
+    centrality = path.get("target_centrality")
+    if centrality is not None:
+        weight *= 1 - CENTRALITY_WEIGHT + CENTRALITY_WEIGHT * centrality
+    return weight * confidence * HOP_DECAY ** (len(relations) - 1)
+
+def _question_overlap(terms: List[str], text: str) -> float:
+    """Share of the question's content terms found in `text`."""
+    if not terms:
+        return 0.0
+    present = set(content_terms(text))
+    return sum(term in present for term in terms) / len(terms)
+
+def _relevance(terms: List[str], native: List[float], texts: List[str]) -> List[float]:
+    """
+    Scores on the [0, 1] scale chunks and KG facts share: the native score
+    (similarity, path confidence) relative to the best in its own list,
+    blended with the share of question terms the item contains.
+    """
+    best = max(native, default=0.0)
+    return [
+        (1 - QUESTION_WEIGHT) * (score / best if best > 0 else 0.0) + QUESTION_WEIGHT * _question_overlap(terms, text)
+        for score, text in zip(native, texts)
+    ]
+
+def _render(chunk_lines: List[str], kg_lines: List[str]) -> str:
+    parts = []
+    if chunk_lines:
+        parts.append(DOCUMENT_HEADER)
+        parts.extend(chunk_lines)
+    if kg_lines:
+        parts.append(KG_HEADER)
+        parts.extend(kg_lines)
+    return "\n".join(parts)
+
+def _dedupe_chunks(chunks: List[Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    """Drop chunks whose estimated Jaccard with a better-scored chunk reaches `threshold`."""
+    if len(chunks) < 2:
+        return chunks
+
+    signatures = np.stack([minhash_signature(c["text"]) for c in chunks])
+    overlap = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+
+    kept: List[int] = []
+    for i in range(len(chunks)):
+        if all(overlap[i, j] < threshold for j in kept):
+            kept.append(i)
+    return [chunks[i] for i in kept]
+
+def _dedupe_kg(facts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep one fact per rendered line and per unordered endpoint pair."""
+    kept, seen = [], set()
+    for fact in facts:
+        line = format_kg_fact(fact)
+        endpoints = frozenset((fact.get("start"), fact.get("target"))) if "path" in fact else line
+        if line in seen or endpoints in seen:
+            continue
+        seen.update([line, endpoints])
+        kept.append(fact)
+    return kept
+
+@traced("context_packing")
+def pack_context(
+    question: str,
+    evidence: Dict[str, Any],
+    token_budget: Optional[int] = None,
+    chunk_max_tokens: Optional[int] = None,
+    dedup_threshold: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Build the generation context under a token budget:
+    1. drop near-duplicate chunks (MinHash) and redundant KG paths,
+    2. score chunks and KG facts on one scale against the question
+       (see _relevance),
+    3. greedily add the best-scored items that still fit the budget.
+
+    Returns the rendered context, the kept evidence and packing stats.
+    """
+    token_budget = token_budget or settings.context_token_budget
+    chunk_max_tokens = chunk_max_tokens or settings.context_chunk_max_tokens
+    dedup_threshold = dedup_threshold or settings.context_dedup_threshold
+
+    rag_evidence = [ev for ev in evidence.get("rag_evidence", []) if ev.get("text")]
+    kg_evidence = evidence.get("kg_evidence", [])
+    candidate_tokens = count_tokens(_render(
+        [format_chunk(ev) for ev in rag_evidence], [format_kg_fact(fact) for fact in kg_evidence]
+    ))
+
+    chunks = _dedupe_chunks(sorted(rag_evidence, key=lambda ev: ev.get("similarity", 0.0), reverse=True), dedup_threshold)
+    facts = _dedupe_kg(sorted(kg_evidence, key=_kg_score, reverse=True))
+    duplicates = (len(rag_evidence) - len(chunks)) + (len(kg_evidence) - len(facts))
+
+    terms = list(dict.fromkeys(content_terms(question)))
+    chunk_lines = [format_chunk(ev, truncate_tokens(ev["text"], chunk_max_tokens)) for ev in chunks]
+    fact_lines = [format_kg_fact(fact) for fact in facts]
+    chunk_scores = _relevance(terms, [ev.get("similarity", 0.0) for ev in chunks], [ev["text"] for ev in chunks])
+    fact_scores = _relevance(terms, [_kg_score(fact) for fact in facts], fact_lines)
+    items = [
+        (score, "chunk", ev, line) for score, ev, line in zip(chunk_scores, chunks, chunk_lines)
+    ] + [
+        (score, "kg", fact, line) for score, fact, line in zip(fact_scores, facts, fact_lines)
+    ]
+    items.sort(key=lambda item: item[0], reverse=True)
+
+    used = count_tokens(DOCUMENT_HEADER) + count_tokens(KG_HEADER)
+    packed = {"chunk": [], "kg": []}
+    for _, kind, ev, line in items:
+        cost = count_tokens(line)
+        if used + cost <= token_budget:
+            packed[kind].append((ev, line))
+            used += cost
+
+    context = _render([line for _, line in packed["chunk"]], [line for _, line in packed["kg"]])
+    packed_tokens = count_tokens(context)
+    return {
+        "context": context,
+        "rag_evidence": [ev for ev, _ in packed["chunk"]],
+        "kg_evidence": [fact for fact, _ in packed["kg"]],
+        "stats": {
+            "token_budget": token_budget,
+            "candidate_tokens": candidate_tokens,
+            "packed_tokens": packed_tokens,
+            "tokens_saved": max(candidate_tokens - packed_tokens, 0),
+            "duplicates_removed": duplicates,
+            "items_dropped": len(items) - len(packed["chunk"]) - len(packed["kg"]),
+            "tokenizer": "tiktoken" if _encoding() is not None else "approximate"
+        }
+    }
\ No newline at end of file
@@ -6,7 +6,9 @@ from app.core.config import settings
 from app.services.embedding_service import get_embeddings
 from app.services.vector_store import upsert_chunks
 from app.services.kg_builder import build_kg_from_chunks
-from app.database.repository import save_chunks, get_or_create_document_id
+from app.services.answer_cache import answer_cache
+from app.services.rate_limiter import upstream_priority, INGESTION
+from app.database.repository import save_chunks, get_or_create_document_id, bump_ingestion_generation
 from app.utils.helpers import semantic_chunk_text
 
 def process_uploaded_file(file_path: Union[Path, str], filename: str) -> Dict[str, Any]:
@@ -52,9 +54,11 @@ def process_uploaded_file(file_path: Union[Path, str], filename: str) -> Dict[st
         for chunk in chunks
     ]
 
-    upsert_chunks(pinecone_chunks)
+    with upstream_priority(INGESTION):
+        upsert_chunks(pinecone_chunks)
 
     build_kg_from_chunks(chunks, document_name=filename, document_id=document_id)
+    answer_cache.invalidate(bump_ingestion_generation())
 
     return {
         "status": "success",
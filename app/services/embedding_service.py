@@ -1,20 +1,43 @@
-from openai import OpenAI
 from app.core.config import settings
+from app.services.llm_provider import get_client
+from app.services.rate_limiter import upstream, estimate_embedding_tokens
+from app.utils.single_flight import SingleFlight, call_key
+from app.utils.tracing import traced
 import numpy as np
 from typing import List
 
-client = OpenAI(api_key=settings.openai_api_key)
+client = get_client()
 
+embedding_flight = SingleFlight("embeddings")
+
+def _create_embeddings(cleaned_texts: List[str]) -> np.ndarray:
+    response = upstream.call(
+        client.embeddings.create,
+        estimated_tokens=estimate_embedding_tokens(cleaned_texts),
+        model=settings.openai_embedding_model,
+        input=cleaned_texts
+    )
+
+    embeddings = [item.embedding for item in response.data]
+    return np.array(embeddings)
+
+@traced("embedding")
 def get_embeddings(texts: List[str]) -> np.ndarray:
+    """
+    Identical concurrent requests share one upstream call; the result
+    array is shared too, so callers must not modify it in place.
+    """
     if not texts:
         return np.array([])
 
     cleaned_texts = [text.replace("\n", " ") for text in texts]
+    key = call_key(settings.openai_embedding_model, cleaned_texts)
+    return embedding_flight.do(key, _create_embeddings, cleaned_texts)
 
-    response = client.embeddings.create(
-        model=settings.openai_embedding_model,
-        input=cleaned_texts
-    )
+async def get_embeddings_async(texts: List[str]) -> np.ndarray:
+    if not texts:
+        return np.array([])
 
-    embeddings = [item.embedding for item in response.data]
-    return np.array(embeddings)
\ No newline at end of file
+    cleaned_texts = [text.replace("\n", " ") for text in texts]
+    key = call_key(settings.openai_embedding_model, cleaned_texts)
+    return await embedding_flight.do_async(key, _create_embeddings, cleaned_texts)
\ No newline at end of file
@@ -0,0 +1,165 @@
+import re
+import difflib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+from app.core.config import settings
+from app.database.neo4j_connection import graph_db
+from app.utils.tracing import traced
+
+ENTITY_ALIASES_QUERY = """
+    MATCH (e:Entity)
+    RETURN e.name AS name, coalesce(e.aliases, []) AS aliases
+"""
+
+TERMINAL = "\0"
+MAX_NGRAM = 3
+MIN_FUZZY_CHARS = 4
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "is", "are",
+    "was", "were", "be", "it", "its", "this", "that", "what", "who", "how", "why",
+    "when", "where", "which", "does", "do", "did", "with", "by", "from", "as"
+}
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+def _aliases(name: str, extra: Iterable[str] = ()) -> Set[str]:
+    """Normalised surface forms of an entity: the name, a leading "the" dropped, stored aliases."""
+    forms = set()
+    for surface in [name, *extra]:
+        tokens = _tokens(surface or "")
+        if tokens and tokens[0] == "the" and len(tokens) > 1:
+            forms.add(" ".join(tokens[1:]))
+        if tokens:
+            forms.add(" ".join(tokens))
+    # Single short or stop words ("It", "US" spelled "us") would match almost every question.
+    return {f for f in forms if " " in f or (len(f) > 2 and f not in STOPWORDS)}
+
+class EntityMatcher:
+    """
+    Finds graph entities in a question without an LLM call.
+
+    Entity names and aliases are stored in a token trie; matching walks
+    the question once, taking the longest entity at each position, so it
+    is word-boundary aware and costs microseconds. Tokens left uncovered
+    are then compared against aliases sharing their first two characters
+    (difflib ratio >= `fuzzy_cutoff`) to absorb typos and inflections.
+    """
+
+    def __init__(self, fuzzy_cutoff: float):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._reset()
+        self._questions = 0
+        self._matched = 0
+        self._fuzzy_matches = 0
+
+    def _reset(self) -> None:
+        self._trie: Dict[str, Any] = {}
+        self._by_prefix: Dict[str, List[str]] = {}
+        self._canonical: Dict[str, Set[str]] = {}
+        self._entities: Set[str] = set()
+
+    def _insert(self, name: str, extra: Iterable[str] = ()) -> None:
+        self._entities.add(name)
+        for alias in _aliases(name, extra):
+            node = self._trie
+            for token in alias.split():
+                node = node.setdefault(token, {})
+            node.setdefault(TERMINAL, set()).add(name)
+
+            if alias not in self._canonical:
+                self._by_prefix.setdefault(alias[:2], []).append(alias)
+            self._canonical.setdefault(alias, set()).add(name)
+
+    def load(self) -> None:
+        """Full rebuild from the graph."""
+        records = graph_db.read(ENTITY_ALIASES_QUERY)
+        with self._lock:
+            self._reset()
+            for record in records:
+                if record["name"]:
+                    self._insert(record["name"], record["aliases"])
+            self._loaded = True
+
+    def add(self, names: Iterable[str]) -> None:
+        """Incremental refresh with entities written by an ingestion."""
+        with self._lock:
+            if not self._loaded:
+                return
+            for name in names:
+                if name and name not in self._entities:
+                    self._insert(name)
+
+    def reset(self) -> None:
+        """The graph was cleared; rebuild lazily on the next question."""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    @traced("entity_match")
+    def match(self, question: str) -> List[str]:
+        """Entity names found in the question, in order of appearance."""
+        if not self._loaded:
+            self.load()
+
+        tokens = _tokens(question)
+        covered = [False] * len(tokens)
+        found: List[tuple] = []
+
+        with self._lock:
+            i = 0
+            while i < len(tokens):
+                node, end, names = self._trie, None, None
+                for j in range(i, len(tokens)):
+                    node = node.get(tokens[j])
+                    if node is None:
+                        break
+                    if TERMINAL in node:
+                        end, names = j + 1, node[TERMINAL]
+                if end is None:
+                    i += 1
+                    continue
+                found.extend((i, name) for name in sorted(names))
+                covered[i:end] = [True] * (end - i)
+                i = end
+
+            for start, name in self._fuzzy(tokens, covered):
+                found.append((start, name))
+                self._fuzzy_matches += 1
+
+            self._questions += 1
+            self._matched += bool(found)
+
+        found.sort(key=lambda item: item[0])
+        return list(dict.fromkeys(name for _, name in found))
+
+    def _fuzzy(self, tokens: List[str], covered: List[bool]) -> List[tuple]:
+        matches = []
+        for size in range(MAX_NGRAM, 0, -1):
+            for i in range(len(tokens) - size + 1):
+                if any(covered[i:i + size]):
+                    continue
+                phrase = " ".join(tokens[i:i + size])
+                if len(phrase) < MIN_FUZZY_CHARS or phrase in STOPWORDS:
+                    continue
+                close = difflib.get_close_matches(
+                    phrase, self._by_prefix.get(phrase[:2], []), n=1, cutoff=self.fuzzy_cutoff
+                )
+                if close:
+                    matches.extend((i, name) for name in sorted(self._canonical[close[0]]))
+                    covered[i:i + size] = [True] * size
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entities": len(self._entities),
+                "aliases": len(self._canonical),
+                "questions": self._questions,
+                "matched_questions": self._matched,
+                "fuzzy_matches": self._fuzzy_matches
+            }
+
+entity_matcher = EntityMatcher(fuzzy_cutoff=settings.entity_fuzzy_cutoff)
\ No newline at end of file
@@ -0,0 +1,76 @@
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from app.services.embedding_service import get_embeddings
+
+logger = logging.getLogger("rag_chatbot")
+
+SHINGLE_SIZE = 3
+
+def normalize(text: str) -> List[str]:
+    """Lowercased word tokens; punctuation, casing and spacing differences vanish."""
+    return re.findall(r"\w+", text.lower())
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[Tuple[str, ...]]:
+    tokens = normalize(text)
+    return {tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+class EvidenceIndex:
+    """
+    Lookup structure over the evidence passages of one answer.
+
+    Word shingles go into an inverted index, so the share of a claim's
+    shingles found in each passage (containment) costs one dictionary probe
+    per shingle. Passage embeddings are fetched once, together with the
+    first batch of claims, and reused for every later similarity query.
+    `kinds` labels each passage "text" (document chunk) or "kg" (graph fact).
+    """
+
+    def __init__(self, passages: List[str], kinds: Optional[List[str]] = None):
+        self.passages = passages
+        self.kinds = kinds or ["text"] * len(passages)
+        self._postings: Dict[Tuple[str, ...], List[int]] = {}
+        for i, passage in enumerate(passages):
+            for shingle in shingles(passage):
+                self._postings.setdefault(shingle, []).append(i)
+        self._vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def containment(self, claim: str) -> np.ndarray:
+        """Per passage, the share of the claim's shingles it contains (0 for claims under SHINGLE_SIZE words)."""
+        counts = np.zeros(len(self.passages))
+        claim_shingles = shingles(claim)
+        for shingle in claim_shingles:
+            for i in self._postings.get(shingle, ()):
+                counts[i] += 1
+        return counts / len(claim_shingles) if claim_shingles else counts
+
+    def similarity(self, claims: List[str]) -> Optional[np.ndarray]:
+        """Cosine matrix claims x passages, or None if embedding failed."""
+        if not claims or not self.passages:
+            return np.zeros((len(claims), len(self.passages)))
+        try:
+            if self._vectors is None:
+                vectors = _unit(get_embeddings(claims + self.passages))
+                self._vectors = vectors[len(claims):]
+                claim_vectors = vectors[:len(claims)]
+            else:
+                claim_vectors = _unit(get_embeddings(claims))
+        except Exception as e:
+            logger.warning(f"Evidence embedding failed: {e}")
+            return None
+        return claim_vectors @ self._vectors.T
+
+    def top_k(self, similarity: Optional[np.ndarray], k: int, rows: int) -> List[List[int]]:
+        """The k most similar passage indices per claim row (all passages without a similarity matrix)."""
+        if similarity is None or len(self.passages) <= k:
+            return [list(range(len(self.passages))) for _ in range(rows)]
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarity, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1).tolist()
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
\ No newline at end of file
@@ -1,6 +1,8 @@
 from typing import Dict, Any, List
 from app.services.verification import verify_claims
+from app.utils.tracing import traced
 
+@traced("explanation")
 def build_explanation(
     answer: str,
     verification: Dict[str, Any],
@@ -55,12 +57,13 @@ def build_explanation(
             })
 
     claims = verification.get("claims", [])
-    for claim in claims:
-        if claim not in verification.get("unsupported", []):
+    kinds = verification.get("passage_kinds", [])
+    for verdict in verification.get("verdicts", []):
+        if verdict["supported"]:
             explanation["supported_claims"].append({
-                "claim": claim,
-                "supported_by": "text + KG" if _supported_by_both(claim, evidence) else 
-                                "text" if _supported_by_text(claim, evidence) else "KG"
+                "claim": verdict["claim"],
+                "supported_by": _supported_by(verdict, kinds),
+                "verified_by": verdict["tier"]
             })
 
     if verification["unsupported_count"] == 0:
@@ -79,15 +82,16 @@ def _avg_similarity(rag_evidence: List[Dict]) -> float:
     return round(sum(ev["similarity"] for ev in rag_evidence) / len(rag_evidence), 3)
 
 
-def _supported_by_text(claim: str, evidence: Dict) -> bool:
-    claim_lower = claim.lower()
-    for ev in evidence.get("rag_evidence", []):
-        if claim_lower in ev["text"].lower():
-            return True
-    return False
-
-
-def _supported_by_both(claim: str, evidence: Dict) -> bool:
-    return _supported_by_text(claim, evidence) and any(
-        claim.lower() in str(path).lower() for path in evidence.get("kg_evidence", [])
-    )
\ No newline at end of file
+def _supported_by(verdict: Dict[str, Any], kinds: List[str]) -> str:
+    """
+    Label a supported claim by the kinds of the evidence-index passages
+    backing it; a verdict that cites none (a batched verdict whose indices
+    were all invalid) falls back to the passages it was judged against.
+    """
+    indices = verdict.get("evidence") or verdict.get("candidates") or []
+    found = {kinds[i] for i in indices if i < len(kinds)}
+    if not found:
+        return "unattributed"
+    if found == {"text", "kg"}:
+        return "text + KG"
+    return "text" if "text" in found else "KG"
\ No newline at end of file
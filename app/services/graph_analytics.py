@@ -0,0 +1,217 @@
+import logging
+import threading
+from typing import List, Dict, Any, Iterable
+import numpy as np
+from app.database.neo4j_connection import graph_db
+from app.utils.kg_utils import degree_centrality
+
+logger = logging.getLogger("rag_chatbot")
+
+SCORE_FIELDS = ("degree", "pagerank", "avg_relation_confidence", "max_relation_confidence")
+WRITE_BATCH_SIZE = 5000
+
+ENTITY_NAMES_QUERY = "MATCH (e:Entity) RETURN e.name AS name"
+
+RELATION_EDGES_QUERY = """
+    MATCH (s:Entity)-[r:RELATION]->(t:Entity)
+    RETURN s.name AS source, t.name AS target, coalesce(r.confidence, 0.9) AS confidence
+"""
+
+REFRESH_SCORES_QUERY = """
+    UNWIND $names AS name
+    MATCH (e:Entity {name: name})
+    OPTIONAL MATCH (e)-[r:RELATION]-()
+    WITH e, r, CASE WHEN r IS NULL THEN null ELSE coalesce(r.confidence, 0.9) END AS confidence
+    WITH e, count(r) AS degree, avg(confidence) AS avg_conf, max(confidence) AS max_conf
+    SET e.degree = degree,
+        e.avg_relation_confidence = coalesce(avg_conf, 0.0),
+        e.max_relation_confidence = coalesce(max_conf, 0.0),
+        e.pagerank = coalesce(e.pagerank, 0.0)
+    RETURN e.name AS name, e.degree AS degree, e.pagerank AS pagerank,
+           e.avg_relation_confidence AS avg_relation_confidence,
+           e.max_relation_confidence AS max_relation_confidence
+"""
+
+LOAD_SCORES_QUERY = """
+    MATCH (e:Entity)
+    RETURN e.name AS name,
+           coalesce(e.degree, 0) AS degree,
+           coalesce(e.pagerank, 0.0) AS pagerank,
+           coalesce(e.avg_relation_confidence, 0.0) AS avg_relation_confidence,
+           coalesce(e.max_relation_confidence, 0.0) AS max_relation_confidence
+"""
+
+WRITE_SCORES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (e:Entity {name: row.name})
+    SET e.degree = row.degree,
+        e.pagerank = row.pagerank,
+        e.avg_relation_confidence = row.avg_relation_confidence,
+        e.max_relation_confidence = row.max_relation_confidence,
+        e.analytics_updated_at = timestamp()
+"""
+
+_lock = threading.Lock()
+_index: Dict[str, int] = {}
+_scores: Dict[str, np.ndarray] = {field: np.zeros(0) for field in SCORE_FIELDS}
+_loaded = False
+
+def pagerank(
+    src: np.ndarray,
+    dst: np.ndarray,
+    num_nodes: int,
+    damping: float = 0.85,
+    max_iter: int = 50,
+    tol: float = 1e-6
+) -> np.ndarray:
+    """
+    Power-iteration PageRank over an edge list; dangling mass is spread uniformly.
+    """
+    if num_nodes == 0:
+        return np.zeros(0)
+
+    out_degree = np.bincount(src, minlength=num_nodes).astype(float)
+    dangling = out_degree == 0
+    rank = np.full(num_nodes, 1.0 / num_nodes)
+
+    for _ in range(max_iter):
+        share = np.divide(rank, out_degree, out=np.zeros(num_nodes), where=~dangling)
+        new_rank = np.bincount(dst, weights=share[src], minlength=num_nodes)
+        new_rank = (1.0 - damping) / num_nodes + damping * (new_rank + rank[dangling].sum() / num_nodes)
+        converged = np.abs(new_rank - rank).sum() < tol
+        rank = new_rank
+        if converged:
+            break
+
+    return rank
+
+def run_graph_analytics() -> Dict[str, Any]:
+    """
+    Bulk job: compute degree, PageRank and relation-confidence aggregates
+    for every entity, write them back as node properties and refresh the
+    local score arrays. Run after large ingestions (python -m app.services.graph_analytics).
+    """
+    def fetch(tx):
+        names = [record["name"] for record in tx.run(ENTITY_NAMES_QUERY)]
+        edges = tx.run(RELATION_EDGES_QUERY).values()
+        return names, edges
+
+    names, edges = graph_db.execute_read(fetch)
+
+    index = {name: i for i, name in enumerate(names)}
+    num_nodes = len(names)
+
+    if edges:
+        src = np.array([index[e[0]] for e in edges], dtype=np.int64)
+        dst = np.array([index[e[1]] for e in edges], dtype=np.int64)
+        confidence = np.array([e[2] for e in edges], dtype=float)
+    else:
+        src = dst = np.zeros(0, dtype=np.int64)
+        confidence = np.zeros(0)
+
+    endpoints = np.concatenate([src, dst])
+    incident_conf = np.concatenate([confidence, confidence])
+    degree = np.bincount(endpoints, minlength=num_nodes).astype(float)
+    conf_sum = np.bincount(endpoints, weights=incident_conf, minlength=num_nodes)
+    max_conf = np.zeros(num_nodes)
+    np.maximum.at(max_conf, endpoints, incident_conf)
+
+    scores = {
+        "degree": degree,
+        "pagerank": pagerank(src, dst, num_nodes),
+        "avg_relation_confidence": np.divide(conf_sum, degree, out=np.zeros(num_nodes), where=degree > 0),
+        "max_relation_confidence": max_conf
+    }
+
+    rows = [
+        {"name": name, **{field: float(scores[field][i]) for field in SCORE_FIELDS}}
+        for i, name in enumerate(names)
+    ]
+    _write_scores(rows)
+
+    global _index, _scores, _loaded
+    with _lock:
+        _index, _scores, _loaded = index, scores, True
+
+    logger.info(f"Graph analytics updated for {num_nodes} entities and {len(edges)} relations")
+    return {"entities": num_nodes, "relations": len(edges)}
+
+def refresh_entity_scores(entity_names: Iterable[str]) -> None:
+    """
+    Incremental update after ingestion: recompute degree and confidence
+    aggregates for the touched entities only. PageRank is global and keeps
+    its last bulk value (0 for new entities) until the next bulk run.
+    """
+    names = list(dict.fromkeys(n for n in entity_names if n))
+    if not names:
+        return
+
+    records = graph_db.write(REFRESH_SCORES_QUERY, names=names)
+
+    if _loaded:
+        _merge_rows(records)
+
+def load_scores() -> None:
+    """Load precomputed scores from node properties into the local arrays."""
+    records = graph_db.read(LOAD_SCORES_QUERY)
+
+    global _index, _scores, _loaded
+    with _lock:
+        _index = {row["name"]: i for i, row in enumerate(records)}
+        _scores = {
+            field: np.array([row[field] for row in records], dtype=float)
+            for field in SCORE_FIELDS
+        }
+        _loaded = True
+
+def get_entity_scores(entity_names: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized lookup: arrays aligned with `entity_names` for every score
+    field plus `centrality` (saturated degree). Unknown entities score 0.
+    No graph round trip once the local arrays are loaded.
+    """
+    if not _loaded:
+        load_scores()
+
+    with _lock:
+        positions = np.array([_index.get(name, -1) for name in entity_names], dtype=np.int64)
+        known = positions >= 0
+        result = {}
+        for field in SCORE_FIELDS:
+            values = np.zeros(len(entity_names))
+            values[known] = _scores[field][positions[known]]
+            result[field] = values
+
+    result["centrality"] = degree_centrality(result["degree"])
+    return result
+
+def reset_scores() -> None:
+    """Drop the local arrays (the graph was cleared)."""
+    global _index, _scores, _loaded
+    with _lock:
+        _index = {}
+        _scores = {field: np.zeros(0) for field in SCORE_FIELDS}
+        _loaded = False
+
+def _write_scores(rows: List[Dict[str, Any]]) -> None:
+    for i in range(0, len(rows), WRITE_BATCH_SIZE):
+        graph_db.write(WRITE_SCORES_QUERY, rows=rows[i:i + WRITE_BATCH_SIZE])
+
+def _merge_rows(rows: List[Dict[str, Any]]) -> None:
+    global _scores
+    with _lock:
+        new_names = [row["name"] for row in rows if row["name"] not in _index]
+        for name in new_names:
+            _index[name] = len(_index)
+        if new_names:
+            _scores = {
+                field: np.concatenate([values, np.zeros(len(new_names))])
+                for field, values in _scores.items()
+            }
+        for row in rows:
+            i = _index[row["name"]]
+            for field in SCORE_FIELDS:
+                _scores[field][i] = row[field]
+
+if __name__ == "__main__":
+    print(run_graph_analytics())
\ No newline at end of file
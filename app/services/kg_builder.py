@@ -1,32 +1,34 @@
 import json
 from typing import List, Dict, Any
-from neo4j import GraphDatabase
 from app.core.config import settings
-from app.services.llm_service import client as openai_client 
-
-driver = GraphDatabase.driver(
-    settings.neo4j_uri,
-    auth=(settings.neo4j_username, settings.neo4j_password),
-    database=settings.neo4j_database
-)
+from app.database.neo4j_connection import graph_db
+from app.services.llm_service import chat_completion
+from app.services.rate_limiter import upstream_priority, INGESTION
+from app.services.kg_cache import graph_cache, chunk_token, EDGES_TOKEN
+from app.services.graph_analytics import refresh_entity_scores, reset_scores
+from app.services.kg_schema import ensure_schema
+from app.services.entity_matcher import entity_matcher
+from app.services.answer_cache import answer_cache
+from app.database.repository import save_relation_provenance, clear_relation_provenance, bump_ingestion_generation
+from app.utils.helpers import relation_key
 
 EXTRACTION_PROMPT = """
 You are an expert knowledge graph builder. Extract entities and relationships from the given text.
 
 Return ONLY valid JSON in this exact format:
-{
+{{
   "entities": [
-    {"name": "Entity Name", "type": "PERSON|ORGANIZATION|LOCATION|CONCEPT|DATE|OTHER"}
+    {{"name": "Entity Name", "type": "PERSON|ORGANIZATION|LOCATION|CONCEPT|DATE|OTHER"}}
   ],
   "relationships": [
-    {
+    {{
       "source": "Exact entity name",
       "target": "Exact entity name",
       "relation": "Brief relation in uppercase (e.g. WORKS_AT, LOCATED_IN, ACQUIRED_BY, CAUSED)",
       "description": "One short sentence explaining the relation"
-    }
+    }}
   ]
-}
+}}
 
 Rules:
 - Extract only clear, factual relations
@@ -42,16 +44,17 @@ def extract_entities_relations(text: str) -> Dict[str, Any]:
     """
     Use OpenAI to extract structured entities and relations from chunk text.
     """
-    response = openai_client.chat.completions.create(
-        model=settings.openai_model,
-        messages=[
-            {"role": "system", "content": "You are a precise knowledge extraction system."},
-            {"role": "user", "content": EXTRACTION_PROMPT.format(text=text)}
-        ],
-        response_format={"type": "json_object"},
-        temperature=0.0,
-        max_tokens=1000
-    )
+    with upstream_priority(INGESTION):
+        response = chat_completion(
+            model=settings.openai_model,
+            messages=[
+                {"role": "system", "content": "You are a precise knowledge extraction system."},
+                {"role": "user", "content": EXTRACTION_PROMPT.format(text=text)}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.0,
+            max_tokens=1000
+        )
 
     try:
         content = response.choices[0].message.content.strip()
@@ -61,6 +64,117 @@ def extract_entities_relations(text: str) -> Dict[str, Any]:
         return {"entities": [], "relationships": []}
 
 
+MERGE_ENTITY_QUERY = """
+    MERGE (e:Entity {name: $name})
+    ON CREATE SET e.type = $type, e.first_seen = timestamp()
+    ON MATCH SET e.last_seen = timestamp()
+"""
+
+MERGE_RELATION_QUERY = """
+    MATCH (source:Entity {name: $source})
+    MATCH (target:Entity {name: $target})
+    MERGE (source)-[r:RELATION {type: $relation}]->(target)
+    ON CREATE SET 
+        r.description = $description,
+        r.confidence = 0.9,
+        r.relation_key = $relation_key,
+        r.source_count = $sources
+    ON MATCH SET 
+        r.confidence = r.confidence + 0.1,
+        r.relation_key = $relation_key,
+        r.source_count = coalesce(r.source_count, 0) + $sources
+    RETURN r.relation_key AS relation_key
+"""
+
+MERGE_CHUNK_QUERY = """
+    MERGE (c:Chunk {chunk_id: $chunk_id})
+    ON CREATE SET 
+        c.text = $text,
+        c.document = $document,
+        c.page = $page
+"""
+
+MERGE_MENTIONS_QUERY = """
+    MATCH (c:Chunk {chunk_id: $chunk_id})
+    UNWIND $entity_names AS name
+    MATCH (e:Entity {name: name})
+    MERGE (c)-[:MENTIONS]->(e)
+"""
+
+CLEAR_GRAPH_QUERY = "MATCH (n) DETACH DELETE n"
+
+LEGACY_PROVENANCE_QUERY = """
+    MATCH (s:Entity)-[r:RELATION]->(t:Entity)
+    WHERE r.sources IS NOT NULL
+    RETURN s.name AS source, r.type AS relation, t.name AS target, r.sources AS sources
+    LIMIT $batch_size
+"""
+
+MIGRATE_PROVENANCE_QUERY = """
+    UNWIND $edges AS edge
+    MATCH (s:Entity {name: edge.source})-[r:RELATION {type: edge.relation}]->(t:Entity {name: edge.target})
+    SET r.relation_key = edge.relation_key, r.source_count = edge.source_count
+    REMOVE r.sources
+"""
+
+def _chunk_relations(extracted: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Relations of one chunk, de-duplicated by relation key."""
+    relations = {}
+    for rel in extracted.get("relationships", []):
+        key = relation_key(rel["source"], rel["relation"], rel["target"])
+        relations.setdefault(key, {**rel, "relation_key": key})
+    return list(relations.values())
+
+def _write_chunk_graph(
+    tx,
+    extracted: Dict[str, Any],
+    relations: List[Dict[str, Any]],
+    chunk: Dict[str, Any],
+    document_name: str
+) -> List[str]:
+    """
+    Writes one chunk's entities, relations and mentions in a single
+    transaction, so a retried or failed chunk never leaves partial writes.
+    Provenance lives in SQLite (relation_provenance); the edge only keeps
+    its relation_key and a source count, which counts only chunks that
+    provenance can record. Returns the relation keys actually merged: a
+    relation whose endpoint is not an extracted entity creates no edge.
+    """
+    chunk_text = chunk["text"]
+    chunk_id = chunk.get("chunk_id")
+    page = chunk["metadata"].get("page", 0)
+
+    for entity in extracted.get("entities", []):
+        tx.run(MERGE_ENTITY_QUERY, name=entity["name"], type=entity["type"])
+
+    merged = []
+    for rel in relations:
+        record = tx.run(MERGE_RELATION_QUERY,
+            source=rel["source"],
+            target=rel["target"],
+            relation=rel["relation"],
+            description=rel["description"],
+            relation_key=rel["relation_key"],
+            sources=1 if chunk_id else 0
+        ).single()
+        if record is not None:
+            merged.append(record["relation_key"])
+
+    entity_names = [e["name"] for e in extracted.get("entities", [])]
+    if entity_names and chunk_id:
+        tx.run(MERGE_CHUNK_QUERY,
+            chunk_id=chunk_id,
+            text=chunk_text[:1000],
+            document=document_name,
+            page=page
+        )
+
+        tx.run(MERGE_MENTIONS_QUERY,
+            chunk_id=chunk_id,
+            entity_names=entity_names
+        )
+    return merged
+
 def build_kg_from_chunks(
     chunks: List[Dict[str, Any]],
     document_name: str,
@@ -70,73 +184,88 @@ def build_kg_from_chunks(
     Main function: build KG from list of chunks.
     Called after chunks are saved to SQLite and upserted to Pinecone.
     """
-    with driver.session() as session:
-        for chunk in chunks:
-            chunk_text = chunk["text"]
-            chunk_id = chunk.get("chunk_id")
-            page = chunk["metadata"].get("page", 0)
-
-            extracted = extract_entities_relations(chunk_text)
-
-            for entity in extracted.get("entities", []):
-                session.run("""
-                    MERGE (e:Entity {name: $name})
-                    ON CREATE SET e.type = $type, e.first_seen = timestamp()
-                    ON MATCH SET e.last_seen = timestamp()
-                    """, name=entity["name"], type=entity["type"])
-
-            for rel in extracted.get("relationships", []):
-                session.run("""
-                    MATCH (source:Entity {name: $source})
-                    MATCH (target:Entity {name: $target})
-                    MERGE (source)-[r:RELATION {type: $relation}]->(target)
-                    ON CREATE SET 
-                        r.description = $description,
-                        r.confidence = 0.9,
-                        r.sources = [$source_info]
-                    ON MATCH SET 
-                        r.confidence = r.confidence + 0.1,
-                        r.sources = r.sources + $source_info
-                    """,
-                    source=rel["source"],
-                    target=rel["target"],
-                    relation=rel["relation"],
-                    description=rel["description"],
-                    source_info={
-                        "document": document_name,
-                        "document_id": document_id,
-                        "chunk_id": chunk_id,
-                        "page": page
-                    }
-                )
-
-            entity_names = [e["name"] for e in extracted.get("entities", [])]
-            if entity_names and chunk_id:
-                session.run("""
-                    MATCH (c:Chunk {chunk_id: $chunk_id})
-                    MERGE (c)-[:MENTIONS]->(e:Entity)
-                    WHERE e.name IN $entity_names
-                    """,
-                    chunk_id=chunk_id,
-                    entity_names=entity_names
-                )
-
-                session.run("""
-                    MERGE (c:Chunk {chunk_id: $chunk_id})
-                    ON CREATE SET 
-                        c.text = $text,
-                        c.document = $document,
-                        c.page = $page
-                    """,
-                    chunk_id=chunk_id,
-                    text=chunk_text[:1000],
-                    document=document_name,
-                    page=page
-                )
+    ensure_schema()
+    touched_entities = set()
+
+    for chunk in chunks:
+        chunk_id = chunk.get("chunk_id")
+        extracted = extract_entities_relations(chunk["text"])
+        relations = _chunk_relations(extracted)
+
+        merged = set(graph_db.execute_write(_write_chunk_graph, extracted, relations, chunk, document_name))
+        written = [rel for rel in relations if rel["relation_key"] in merged]
+
+        if chunk_id:
+            save_relation_provenance([
+                {
+                    "relation_key": rel["relation_key"],
+                    "source": rel["source"],
+                    "relation": rel["relation"],
+                    "target": rel["target"],
+                    "chunk_id": str(chunk_id),
+                    "document_id": document_id,
+                    "document": document_name,
+                    "page": chunk["metadata"].get("page", 0)
+                }
+                for rel in written
+            ])
+
+        touched = [e["name"] for e in extracted.get("entities", [])]
+        for rel in written:
+            touched.extend([rel["source"], rel["target"]])
+        if chunk_id:
+            touched.append(chunk_token(chunk_id))
+        if written:
+            touched.append(EDGES_TOKEN)
+        graph_cache.invalidate(touched)
+        touched_entities.update(touched)
+
+    entity_names = [name for name in touched_entities if not name.startswith("chunk:") and name != EDGES_TOKEN]
+    refresh_entity_scores(entity_names)
+    entity_matcher.add(entity_names)
 
 def clear_kg() -> None:
-    with driver.session() as session:
-        session.run("MATCH (n) DETACH DELETE n")
+    graph_db.write(CLEAR_GRAPH_QUERY)
+    clear_relation_provenance()
+    graph_cache.clear()
+    reset_scores()
+    entity_matcher.reset()
+    answer_cache.invalidate(bump_ingestion_generation())
+
+def migrate_legacy_provenance(batch_size: int = 1000) -> int:
+    """
+    One-off migration for graphs built before provenance moved to SQLite:
+    copies every `r.sources` list into relation_provenance, then replaces it
+    on the edge with relation_key / source_count.
+    """
+    migrated = 0
+    while True:
+        records = graph_db.read(LEGACY_PROVENANCE_QUERY, batch_size=batch_size)
+        if not records:
+            return migrated
+
+        rows, edges = [], []
+        for record in records:
+            key = relation_key(record["source"], record["relation"], record["target"])
+            edges.append({**record, "relation_key": key, "source_count": len(record["sources"])})
+            for src in record["sources"]:
+                rows.append({
+                    "relation_key": key,
+                    "source": record["source"],
+                    "relation": record["relation"],
+                    "target": record["target"],
+                    "chunk_id": str(src.get("chunk_id") or ""),
+                    "document_id": src.get("document_id"),
+                    "document": src.get("document"),
+                    "page": src.get("page", 0)
+                })
+
+        save_relation_provenance(rows)
+        graph_db.write(MIGRATE_PROVENANCE_QUERY, edges=[{k: v for k, v in edge.items() if k != "sources"} for edge in edges])
+        migrated += len(edges)
 
 def close_driver():
-    driver.close()
\ No newline at end of file
+    graph_db.close()
+
+if __name__ == "__main__":
+    print(f"Migrated provenance of {migrate_legacy_provenance()} relations")
\ No newline at end of file
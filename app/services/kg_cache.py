@@ -0,0 +1,157 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+from app.core.config import settings
+
+# Bumped by every ingestion that writes a relation. A shortest path (or the
+# absence of one) can change through edges between any two entities, not
+# only those on the cached path, so pair-path entries depend on it.
+EDGES_TOKEN = "graph:edges"
+
+# Version stamps tracked before stale entries are swept and the stamps
+# dropped (at least this many, or one per cached entry).
+MIN_TRACKED_VERSIONS = 10_000
+
+def chunk_token(chunk_id: str) -> str:
+    """Dependency token for a chunk, kept apart from entity names."""
+    return f"chunk:{chunk_id}"
+
+def _approx_size(value: Any) -> int:
+    """Rough deep size in bytes of the JSON-like values stored in the cache."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_approx_size(v) for v in value)
+    return size
+
+class GraphCache:
+    """
+    Bounded LRU cache for Neo4j lookups (neighbourhoods, pair paths, chunk entities).
+
+    Every entry lists the entities (and chunk tokens) its result depends on.
+    Ingestion bumps a version stamp for each entity it touches; an entry is
+    only served while none of its dependencies was bumped after the entry's
+    query started, so writes evict exactly the affected lookups. Pair paths
+    also depend on EDGES_TOKEN, since any new edge may shorten or create one.
+    Stamps are swept once they outnumber the entries (see _sweep), so they
+    stay bounded like the entries themselves.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._clock = 0
+        self._floor = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def stamp(self) -> int:
+        """Take before querying Neo4j and pass to put() with the result."""
+        return self._clock
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, depends_on, stamp, expires_at, _ = entry
+            if time.monotonic() > expires_at or self._is_stale(depends_on, stamp):
+                self._drop(key)
+                self._invalidations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, depends_on: Iterable[str], stamp: int) -> None:
+        depends_on = tuple(set(d for d in depends_on if d))
+        size = _approx_size(value) + _approx_size(depends_on)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # The graph changed while the query was running; don't cache a stale read.
+            if stamp < self._floor or self._is_stale(depends_on, stamp):
+                return
+
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, depends_on, stamp, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def invalidate(self, dependencies: Iterable[str]) -> None:
+        """Bump the version stamp of every touched entity / chunk token."""
+        with self._lock:
+            self._clock += 1
+            for dep in dependencies:
+                if dep:
+                    self._versions[dep] = self._clock
+            if len(self._versions) > max(MIN_TRACKED_VERSIONS, len(self._entries)):
+                self._sweep()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._versions.clear()
+            self._bytes = 0
+            self._clock += 1
+            self._floor = self._clock
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "max_memory_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "tracked_entities": len(self._versions)
+            }
+
+    def _is_stale(self, depends_on: tuple, stamp: int) -> bool:
+        return any(self._versions.get(dep, 0) > stamp for dep in depends_on)
+
+    def _sweep(self) -> None:
+        """
+        Drop the stale entries, then every version stamp: no cached entry
+        needs one any more, and raising the floor keeps results of queries
+        still in flight from being cached.
+        """
+        stale = [key for key, entry in self._entries.items() if self._is_stale(entry[1], entry[2])]
+        for key in stale:
+            self._drop(key)
+        self._invalidations += len(stale)
+        self._versions.clear()
+        self._floor = self._clock
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry[4]
+
+graph_cache = GraphCache(
+    max_bytes=settings.kg_cache_max_mb * 1024 * 1024,
+    ttl_seconds=settings.kg_cache_ttl_seconds
+)
\ No newline at end of file
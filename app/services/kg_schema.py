@@ -0,0 +1,149 @@
+import sys
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+from neo4j.exceptions import Neo4jError
+from app.database.neo4j_connection import graph_db
+
+logger = logging.getLogger("rag_chatbot")
+
+# (statement, fallback if the statement is rejected, e.g. duplicates block a constraint)
+SCHEMA_STATEMENTS: List[Tuple[str, Optional[str]]] = [
+    (
+        "CREATE CONSTRAINT entity_name_unique IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE",
+        "CREATE INDEX entity_name_range IF NOT EXISTS FOR (e:Entity) ON (e.name)"
+    ),
+    (
+        "CREATE CONSTRAINT chunk_id_unique IF NOT EXISTS FOR (c:Chunk) REQUIRE c.chunk_id IS UNIQUE",
+        "CREATE INDEX chunk_id_range IF NOT EXISTS FOR (c:Chunk) ON (c.chunk_id)"
+    ),
+    ("CREATE INDEX relation_type_range IF NOT EXISTS FOR ()-[r:RELATION]-() ON (r.type)", None),
+    ("CREATE INDEX relation_key_range IF NOT EXISTS FOR ()-[r:RELATION]-() ON (r.relation_key)", None),
+    (
+        """
+        CREATE FULLTEXT INDEX entityNameIndex IF NOT EXISTS
+        FOR (e:Entity) ON EACH [e.name]
+        OPTIONS {indexConfig: {`fulltext.analyzer`: 'english'}}
+        """,
+        None
+    )
+]
+
+# Plan operators that touch every node / relationship of a label or type.
+FULL_SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan", "RelationshipTypeScan", "AllRelationshipsScan")
+
+# Bulk jobs that are expected to read or clear the whole graph.
+BULK_QUERIES = {
+    "kg_builder.CLEAR_GRAPH_QUERY",
+    "kg_builder.LEGACY_PROVENANCE_QUERY",
+    "graph_analytics.ENTITY_NAMES_QUERY",
+    "graph_analytics.RELATION_EDGES_QUERY",
+    "graph_analytics.LOAD_SCORES_QUERY"
+}
+
+# Parameter values only need the right shape for EXPLAIN; nothing is executed.
+SAMPLE_PARAMS: Dict[str, Any] = {
+    "query": "entity",
+    "limit": 10,
+    "name": "entity",
+    "names": ["entity"],
+    "seeds": ["entity"],
+    "pairs": [["entity", "other"]],
+    "type": "CONCEPT",
+    "source": "entity",
+    "target": "other",
+    "relation": "RELATED_TO",
+    "description": "",
+    "relation_key": "key",
+    "sources": 1,
+    "chunk_id": "chunk",
+    "chunk_ids": ["chunk"],
+    "text": "",
+    "document": "doc.pdf",
+    "page": 1,
+    "entity_names": ["entity"],
+    "batch_size": 1,
+    "edges": [{"source": "entity", "relation": "RELATED_TO", "target": "other",
+               "relation_key": "key", "source_count": 1}],
+    "rows": [{"name": "entity", "degree": 0, "pagerank": 0.0,
+              "avg_relation_confidence": 0.0, "max_relation_confidence": 0.0}]
+}
+
+_schema_ready = False
+
+def ensure_schema(force: bool = False) -> None:
+    """
+    Create the constraints and indexes behind the exact-match lookups.
+    Every statement is IF NOT EXISTS, so this is safe to repeat; it runs
+    once per process unless forced.
+    """
+    global _schema_ready
+    if _schema_ready and not force:
+        return
+
+    for statement, fallback in SCHEMA_STATEMENTS:
+        try:
+            graph_db.write(statement)
+        except Neo4jError as e:
+            if fallback is None:
+                raise
+            logger.warning(f"Constraint not created ({e.message}); falling back to a range index")
+            graph_db.write(fallback)
+
+    _schema_ready = True
+
+def collect_queries() -> Dict[str, str]:
+    """Every *_QUERY constant of the graph modules, keyed by module.NAME."""
+    from app.services import kg_store, kg_builder, graph_analytics
+
+    queries = {}
+    for module in (kg_store, kg_builder, graph_analytics):
+        prefix = module.__name__.rsplit(".", 1)[-1]
+        for name, value in vars(module).items():
+            if name.endswith("_QUERY") and isinstance(value, str):
+                queries[f"{prefix}.{name}"] = kg_store._with_depth(value, 2)
+    return queries
+
+def _plan_operators(plan: Dict[str, Any]) -> List[str]:
+    operators = [plan["operatorType"]]
+    for child in plan.get("children", []):
+        operators.extend(_plan_operators(child))
+    return operators
+
+def explain(query: str) -> List[str]:
+    """Operator names of the planned query (EXPLAIN, so nothing runs)."""
+    def work(tx):
+        return tx.run("EXPLAIN " + query, SAMPLE_PARAMS).consume().plan
+
+    # Write transaction so EXPLAIN is accepted for MERGE / SET statements too.
+    plan = graph_db.execute_write(work)
+    return _plan_operators(plan) if plan else []
+
+def check_query_plans() -> List[Dict[str, Any]]:
+    """
+    EXPLAIN every graph query and return the hot ones whose plan contains
+    a full label or relationship-type scan. An empty list means all
+    per-request and ingestion lookups are index seeks.
+    """
+    ensure_schema()
+    failures = []
+
+    for name, query in collect_queries().items():
+        scans = [
+            op for op in explain(query)
+            if any(op.startswith(scan) for scan in FULL_SCAN_OPERATORS)
+        ]
+        if scans and name not in BULK_QUERIES:
+            failures.append({"query": name, "operators": scans})
+
+    return failures
+
+graph_db.on_first_use(ensure_schema)
+
+if __name__ == "__main__":
+    ensure_schema(force=True)
+    failures = check_query_plans()
+    for failure in failures:
+        print(f"❌ {failure['query']}: {', '.join(failure['operators'])}")
+    if failures:
+        sys.exit(1)
+    print("✅ All graph queries plan index seeks")
\ No newline at end of file
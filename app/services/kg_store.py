@@ -1,129 +1,408 @@
-from neo4j import GraphDatabase
-from typing import List, Dict, Any, Optional
-from app.core.config import settings
+from itertools import combinations
+from typing import List, Dict, Any, Optional, Tuple
+from app.database.neo4j_connection import graph_db
+from app.database.repository import get_relation_provenance
+from app.services.kg_schema import ensure_schema
+from app.services.kg_cache import graph_cache, chunk_token, EDGES_TOKEN
+from app.services.graph_analytics import get_entity_scores
+from app.utils.kg_utils import find_connecting_paths
+from app.utils.tracing import traced
 
-driver = GraphDatabase.driver(
-    settings.neo4j_uri,
-    auth=(settings.neo4j_username, settings.neo4j_password),
-    database=settings.neo4j_database
-)
+ENTITY_SEARCH_QUERY = """
+    CALL db.index.fulltext.queryNodes("entityNameIndex", $query + "~")
+    YIELD node, score
+    RETURN node.name AS name, node.type AS type, score
+    ORDER BY score DESC
+    LIMIT $limit
+"""
+
+RELATED_ENTITIES_QUERY = """
+    MATCH path = (e:Entity {name: $name})-[:RELATION*1..$depth]-(related)
+    RETURN 
+        e.name AS start,
+        [r IN relationships(path) | {
+            type: r.type,
+            description: r.description,
+            confidence: coalesce(r.confidence, 0.9)
+        }] AS relations,
+        related.name AS target,
+        related.type AS target_type
+    ORDER BY length(path) DESC
+"""
+
+CHUNK_ENTITIES_QUERY = """
+    MATCH (c:Chunk {chunk_id: $chunk_id})-[:MENTIONS]->(e:Entity)
+    RETURN e.name AS entity_name
+"""
+
+CHUNK_ENTITIES_BATCH_QUERY = """
+    UNWIND $chunk_ids AS chunk_id
+    MATCH (c:Chunk {chunk_id: chunk_id})-[:MENTIONS]->(e:Entity)
+    RETURN chunk_id, collect(e.name) AS entity_names
+"""
 
 def search_entities(query: str, limit: int = 10) -> List[Dict[str, Any]]:
     """
     Fuzzy search for entities by name.
     Useful for query analysis and routing.
     """
-    with driver.session() as session:
-        result = session.run("""
-            CALL db.index.fulltext.queryNodes("entityNameIndex", $query + "~")
-            YIELD node, score
-            RETURN node.name AS name, node.type AS type, score
-            ORDER BY score DESC
-            LIMIT $limit
-            """, query=query, limit=limit)
-        
-        return [dict(record) for record in result]
+    return graph_db.read(ENTITY_SEARCH_QUERY, query=query, limit=limit)
+
+def _with_depth(query: str, depth: int) -> str:
+    """
+    Cypher cannot parameterise variable-length bounds, so the
+    validated depth is inlined into the query text instead.
+    """
+    return query.replace("$depth", str(max(1, int(depth))))
 
 def get_related_entities(entity_name: str, depth: int = 1) -> List[Dict[str, Any]]:
     """
     Get connected entities and relationships (multi-hop).
     Returns structured paths for reasoning.
     """
-    with driver.session() as session:
-        result = session.run("""
-            MATCH path = (e:Entity {name: $name})-[:RELATION*1..$depth]-(related)
-            RETURN 
-                e.name AS start,
-                [r IN relationships(path) | {
-                    type: r.type,
-                    description: r.description,
-                    confidence: coalesce(r.confidence, 0.9)
-                }] AS relations,
-                related.name AS target,
-                related.type AS target_type
-            ORDER BY length(path) DESC
-            """, name=entity_name, depth=depth)
-        
-        paths = []
-        for record in result:
-            paths.append({
-                "start": record["start"],
-                "target": record["target"],
-                "target_type": record["target_type"],
-                "path": record["relations"]
-            })
-        return paths
+    key = ("related", entity_name, depth)
+    cached = graph_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    stamp = graph_cache.stamp()
+    records = graph_db.read(_with_depth(RELATED_ENTITIES_QUERY, depth), name=entity_name)
+
+    paths = []
+    for record in records:
+        paths.append({
+            "start": record["start"],
+            "target": record["target"],
+            "target_type": record["target_type"],
+            "path": record["relations"]
+        })
+
+    graph_cache.put(key, paths, [entity_name] + [p["target"] for p in paths], stamp)
+    return list(paths)
+
+MAX_PATH_HOPS = 4
+
+CLAIM_PATHS_QUERY = """
+    UNWIND $pairs AS pair
+    MATCH (e1:Entity {name: pair[0]})
+    MATCH (e2:Entity {name: pair[1]})
+    MATCH path = shortestPath((e1)-[:RELATION*..4]-(e2))
+    RETURN
+        e1.name AS source,
+        e2.name AS target,
+        [r IN relationships(path) | {
+            type: r.type,
+            description: r.description
+        }] AS path,
+        [n IN nodes(path) | n.name] AS nodes,
+        length(path) AS hops
+"""
+
+FRONTIER_QUERY = """
+    UNWIND $names AS name
+    MATCH (n:Entity {name: name})-[r:RELATION]-(m:Entity)
+    RETURN
+        name,
+        m.name AS neighbour,
+        r.type AS type,
+        r.description AS description
+"""
+
+def _entity_pairs(entities: List[str]) -> List[Tuple[str, str]]:
+    """Unordered entity pairs, normalised so A-B and B-A share a cache entry."""
+    return [tuple(sorted(pair)) for pair in combinations(entities, 2)]
+
+def _cache_pair_path(
+    pair: Tuple[str, str],
+    path: Optional[Dict[str, Any]],
+    stamp: int
+) -> List[Dict[str, Any]]:
+    paths = [path] if path else []
+    depends_on = [EDGES_TOKEN, *pair] + (path.get("nodes", []) if path else [])
+    graph_cache.put(("path", *pair, MAX_PATH_HOPS), paths, depends_on, stamp)
+    return paths
+
+def _top_paths(
+    pair_paths: Dict[Tuple[str, str], List[Dict[str, Any]]],
+    max_paths: int
+) -> List[Dict[str, Any]]:
+    paths = [path for found in pair_paths.values() for path in found]
+    paths.sort(key=lambda p: p["hops"])
+    return paths[:max_paths]
+
+def _bfs_pair_paths(tx, pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Connecting paths of `pairs` from one multi-source BFS, one FRONTIER_QUERY per level."""
+    entities = list(dict.fromkeys(name for pair in pairs for name in pair))
+
+    def expand(frontier: List[str]) -> Dict[str, List[Any]]:
+        adjacency: Dict[str, List[Any]] = {}
+        for record in tx.run(FRONTIER_QUERY, names=frontier):
+            adjacency.setdefault(record["name"], []).append((
+                record["neighbour"],
+                {"type": record["type"], "description": record["description"]}
+            ))
+        return adjacency
+
+    return find_connecting_paths(entities, expand, max_hops=MAX_PATH_HOPS, max_paths=len(entities) ** 2)
+
+def _by_pair(paths: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    return {tuple(sorted((p["source"], p["target"]))): p for p in paths}
+
+def _search_pair_paths(
+    pairs: List[Tuple[str, str]],
+    strategy: str
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    if strategy == "cypher":
+        return _by_pair(graph_db.read(CLAIM_PATHS_QUERY, pairs=[list(pair) for pair in pairs]))
+    return _by_pair(graph_db.execute_read(_bfs_pair_paths, pairs))
 
 def get_evidence_for_claim(
     claim_entities: List[str],
-    max_paths: int = 5
+    max_paths: int = 5,
+    strategy: str = "bfs"
 ) -> List[Dict[str, Any]]:
     """
     Find KG paths connecting entities mentioned in a claim/question.
     Used in hybrid retrieval and verification.
+
+    Each unordered entity pair is searched once, over RELATION edges only,
+    and cached per pair. strategy="bfs" runs one multi-source BFS shared by
+    all uncached entities (one query per BFS level); strategy="cypher" runs
+    shortestPath per pair in a single query.
     """
+    claim_entities = list(dict.fromkeys(claim_entities))
     if len(claim_entities) < 2:
         return []
 
-    with driver.session() as session:
-        result = session.run("""
-            UNWIND $entities AS entity1
-            UNWIND $entities AS entity2
-            WITH entity1, entity2 WHERE entity1 <> entity2
-            MATCH path = shortestPath((e1:Entity {name: entity1})-[*..4]-(e2:Entity {name: entity2}))
-            RETURN 
-                entity1 AS source,
-                entity2 AS target,
-                [r IN relationships(path) | {
-                    type: r.type,
-                    description: r.description
-                }] AS path,
-                length(path) AS hops
-            ORDER BY hops ASC
-            LIMIT $max_paths
-            """, entities=claim_entities, max_paths=max_paths)
-        
-        return [dict(record) for record in result]
+    pair_paths = {pair: graph_cache.get(("path", *pair, MAX_PATH_HOPS)) for pair in _entity_pairs(claim_entities)}
+    missing = [pair for pair, paths in pair_paths.items() if paths is None]
+
+    if missing:
+        stamp = graph_cache.stamp()
+        found = _search_pair_paths(missing, strategy)
+        for pair in missing:
+            pair_paths[pair] = _cache_pair_path(pair, found.get(pair), stamp)
+
+    return _top_paths(pair_paths, max_paths)
+
+NEIGHBOURHOODS_QUERY = """
+    UNWIND $seeds AS seed
+    MATCH path = (e:Entity {name: seed})-[:RELATION*1..$depth]-(related:Entity)
+    WHERE related <> e
+    WITH seed, related, path
+    ORDER BY length(path) ASC
+    WITH seed, related, head(collect(path)) AS path
+    RETURN seed, collect({
+        start: seed,
+        target: related.name,
+        target_type: related.type,
+        path: [r IN relationships(path) | {
+            type: r.type,
+            description: r.description,
+            confidence: coalesce(r.confidence, 0.9)
+        }]
+    }) AS paths
+"""
+
+def _merge_neighbourhoods(
+    seeds: List[str],
+    neighbourhoods: Dict[str, List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Keep each neighbour once across seeds, preferring the shortest path."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for seed in seeds:
+        for path in neighbourhoods[seed]:
+            current = merged.get(path["target"])
+            if current is None or len(path["path"]) < len(current["path"]):
+                merged[path["target"]] = path
+    return sorted(merged.values(), key=lambda p: len(p["path"]))
+
+def _plan_kg_context(
+    entities: List[str],
+    depth: int,
+    max_seed_entities: int
+) -> Dict[str, Any]:
+    """Resolve what the graph cache already knows; the rest needs one query."""
+    seeds = entities[:max_seed_entities]
+    neighbourhoods = {seed: graph_cache.get(("neighbourhood", seed, depth)) for seed in seeds}
+    pair_paths = {pair: graph_cache.get(("path", *pair, MAX_PATH_HOPS)) for pair in _entity_pairs(entities)}
+    return {
+        "seeds": seeds,
+        "depth": depth,
+        "neighbourhoods": neighbourhoods,
+        "pair_paths": pair_paths,
+        "missing_seeds": [seed for seed, paths in neighbourhoods.items() if paths is None],
+        "missing_pairs": [pair for pair, paths in pair_paths.items() if paths is None],
+        "stamp": graph_cache.stamp()
+    }
+
+def _fetch_kg_context(
+    seeds: List[str],
+    pairs: List[Tuple[str, str]],
+    depth: int
+) -> Dict[str, Any]:
+    """
+    Neighbourhoods of `seeds` and connecting paths of `pairs` in one read
+    transaction: one query for the neighbourhoods, then the shared BFS of
+    get_evidence_for_claim for the pairs.
+    """
+    def work(tx) -> Dict[str, Any]:
+        neighbourhoods = {}
+        if seeds:
+            for record in tx.run(_with_depth(NEIGHBOURHOODS_QUERY, depth), seeds=seeds):
+                neighbourhoods[record["seed"]] = record["paths"]
+        return {
+            "neighbourhoods": neighbourhoods,
+            "claim_paths": _by_pair(_bfs_pair_paths(tx, pairs)) if pairs else {}
+        }
+
+    return graph_db.execute_read(work)
+
+def _finish_kg_context(
+    plan: Dict[str, Any],
+    fetched: Dict[str, Any],
+    max_paths: int
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Cache the freshly fetched seeds / pairs and assemble the context."""
+    neighbourhoods, pair_paths = plan["neighbourhoods"], plan["pair_paths"]
+
+    for seed in plan["missing_seeds"]:
+        paths = list(fetched["neighbourhoods"].get(seed, []))
+        graph_cache.put(
+            ("neighbourhood", seed, plan["depth"]), paths,
+            [seed] + [p["target"] for p in paths], plan["stamp"]
+        )
+        neighbourhoods[seed] = paths
+
+    for pair in plan["missing_pairs"]:
+        pair_paths[pair] = _cache_pair_path(pair, fetched["claim_paths"].get(pair), plan["stamp"])
+
+    return _with_centrality({
+        "neighbours": _merge_neighbourhoods(plan["seeds"], neighbourhoods),
+        "claim_paths": _top_paths(pair_paths, max_paths)
+    })
+
+def _with_centrality(context: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Copies of the paths carrying their target's centrality from the
+    precomputed graph analytics (not cached with the paths, so a bulk
+    analytics run applies at once).
+    """
+    paths = context["neighbours"] + context["claim_paths"]
+    centrality = get_entity_scores([p["target"] for p in paths])["centrality"] if paths else []
+    annotated = [{**p, "target_centrality": float(c)} for p, c in zip(paths, centrality)]
+    split = len(context["neighbours"])
+    return {"neighbours": annotated[:split], "claim_paths": annotated[split:]}
+
+@traced("kg_context")
+def get_kg_context(
+    entities: List[str],
+    depth: int = 2,
+    max_seed_entities: int = 3,
+    max_paths: int = 5
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Batched KG lookup for all question entities in one read transaction.
+    Returns the neighbourhoods of the first `max_seed_entities` entities,
+    with neighbours shared between seeds kept once (shortest path wins),
+    plus the paths connecting the entities to each other (shared BFS).
+    Only seeds and pairs missing from the graph cache are queried.
+    """
+    entities = list(dict.fromkeys(entities))
+    if not entities:
+        return {"neighbours": [], "claim_paths": []}
+
+    plan = _plan_kg_context(entities, depth, max_seed_entities)
+    fetched = {"neighbourhoods": {}, "claim_paths": {}}
+    if plan["missing_seeds"] or plan["missing_pairs"]:
+        fetched = _fetch_kg_context(plan["missing_seeds"], plan["missing_pairs"], depth)
+    return _finish_kg_context(plan, fetched, max_paths)
+
+@traced("kg_context_batch")
+def get_kg_contexts(
+    entity_lists: List[List[str]],
+    depth: int = 2,
+    max_seed_entities: int = 3,
+    max_paths: int = 5
+) -> List[Dict[str, List[Dict[str, Any]]]]:
+    """
+    get_kg_context for many questions at once (batch answering): seeds and
+    pairs missing from the graph cache are de-duplicated across questions
+    and fetched in a single read transaction.
+    """
+    entity_lists = [list(dict.fromkeys(entities)) for entities in entity_lists]
+    plans = [_plan_kg_context(entities, depth, max_seed_entities) if entities else None for entities in entity_lists]
+
+    seeds = list(dict.fromkeys(seed for plan in plans if plan for seed in plan["missing_seeds"]))
+    pairs = list(dict.fromkeys(pair for plan in plans if plan for pair in plan["missing_pairs"]))
+    fetched = {"neighbourhoods": {}, "claim_paths": {}}
+    if seeds or pairs:
+        fetched = _fetch_kg_context(seeds, pairs, depth)
+
+    return [
+        _finish_kg_context(plan, fetched, max_paths) if plan else {"neighbours": [], "claim_paths": []}
+        for plan in plans
+    ]
 
 def get_chunk_entities(chunk_id: str) -> List[str]:
     """
     Get all entities mentioned in a specific chunk (for hybrid scoring).
     """
-    with driver.session() as session:
-        result = session.run("""
-            MATCH (c:Chunk {chunk_id: $chunk_id})-[:MENTIONS]->(e:Entity)
-            RETURN e.name AS entity_name
-            """, chunk_id=chunk_id)
-        return [record["entity_name"] for record in result]
+    key = ("chunk_entities", chunk_id)
+    cached = graph_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    stamp = graph_cache.stamp()
+    records = graph_db.read(CHUNK_ENTITIES_QUERY, chunk_id=chunk_id)
+    names = [record["entity_name"] for record in records]
 
-def get_provenance(relation_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    graph_cache.put(key, names, [chunk_token(chunk_id)] + names, stamp)
+    return list(names)
+
+def get_chunk_entities_batch(chunk_ids: List[str]) -> Dict[str, List[str]]:
+    """
+    get_chunk_entities for many chunks (reranking candidates): cached chunks
+    come from the graph cache, the rest from one round trip.
+    """
+    result: Dict[str, List[str]] = {}
+    missing = []
+    for chunk_id in dict.fromkeys(chunk_ids):
+        cached = graph_cache.get(("chunk_entities", chunk_id))
+        if cached is None:
+            missing.append(chunk_id)
+        else:
+            result[chunk_id] = list(cached)
+
+    if missing:
+        stamp = graph_cache.stamp()
+        records = graph_db.read(CHUNK_ENTITIES_BATCH_QUERY, chunk_ids=missing)
+        fetched = {record["chunk_id"]: record["entity_names"] for record in records}
+        for chunk_id in missing:
+            names = fetched.get(chunk_id, [])
+            graph_cache.put(("chunk_entities", chunk_id), names, [chunk_token(chunk_id)] + names, stamp)
+            result[chunk_id] = list(names)
+    return result
+
+def get_provenance(
+    relation_type: Optional[str] = None,
+    document_id: Optional[int] = None,
+    relation_key: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Get source provenance for relations (for citations).
+    Served from the indexed relation_provenance table instead of scanning
+    and unwinding every relation in the graph.
     """
-    with driver.session() as session:
-        query = """
-            MATCH ()-[r:RELATION]->()
-            WHERE $rel_type IS NULL OR r.type = $rel_type
-            UNWIND r.sources AS src
-            RETURN 
-                r.type AS relation,
-                src.document AS document,
-                src.page AS page,
-                src.chunk_id AS chunk_id
-            """
-        result = session.run(query, rel_type=relation_type)
-        return [dict(record) for record in result]
+    return get_relation_provenance(
+        relation_type=relation_type,
+        document_id=document_id,
+        relation_key=relation_key
+    )
 
 def create_indexes() -> None:
-    """Create full-text index for fast entity search (run once)"""
-    with driver.session() as session:
-        session.run("""
-            CREATE FULLTEXT INDEX entityNameIndex IF NOT EXISTS
-            FOR (e:Entity) ON (e.name)
-            OPTIONS {indexConfig: {`fulltext.analyzer`: 'english'}}
-            """)
-
-create_indexes()
+    """Create constraints and indexes now (normally applied lazily on first connect)."""
+    ensure_schema(force=True)
 
 def close():
-    driver.close()
\ No newline at end of file
+    graph_db.close()
\ No newline at end of file
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Callable, Dict
+from openai import OpenAI
+from app.core.config import settings
+
+LOCAL_BASE_URL = "http://127.0.0.1:8765/v1"
+
+def _openai_client() -> OpenAI:
+    return OpenAI(
+        api_key=settings.openai_api_key,
+        base_url=settings.llm_base_url,
+        timeout=settings.llm_timeout_seconds,
+        # Retries and backoff are owned by the upstream scheduler.
+        max_retries=0
+    )
+
+def _local_client() -> OpenAI:
+    """Deterministic stand-in server (local_llm_server.py); no key or spend."""
+    return OpenAI(
+        api_key="local",
+        base_url=settings.llm_base_url or LOCAL_BASE_URL,
+        timeout=settings.llm_timeout_seconds,
+        max_retries=0
+    )
+
+PROVIDERS: Dict[str, Callable[[], OpenAI]] = {
+    "openai": _openai_client,
+    "local": _local_client
+}
+
+@lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """
+    The process-wide chat / embedding client for the provider named by
+    LLM_PROVIDER. Every provider speaks the OpenAI HTTP API, so services
+    only ever see an OpenAI client.
+    """
+    try:
+        factory = PROVIDERS[settings.llm_provider]
+    except KeyError:
+        raise ValueError(f"Unknown LLM_PROVIDER '{settings.llm_provider}', expected one of {sorted(PROVIDERS)}")
+    return factory()
\ No newline at end of file
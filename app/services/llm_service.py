@@ -1,39 +1,40 @@
-from openai import OpenAI
 from app.core.config import settings
-from typing import List, Dict, Any, Optional
+from app.services.llm_provider import get_client
+from app.services.context_packer import pack_context
+from app.services.rate_limiter import upstream, estimate_chat_tokens
+from app.utils.single_flight import SingleFlight, call_key
+from app.utils.tracing import traced
+from typing import List, Dict, Any, Optional, Iterator
+
+client = get_client()
+
+completion_flight = SingleFlight("chat_completions")
+
+def chat_completion(**params) -> Any:
+    """Raw chat completion admitted (and retried) by the shared upstream scheduler."""
+    return upstream.call(
+        client.chat.completions.create,
+        estimated_tokens=estimate_chat_tokens(params),
+        **params
+    )
 
-client = OpenAI(api_key=settings.openai_api_key)
+def _create_completion(params: Dict[str, Any]) -> str:
+    response = chat_completion(**params)
+    return response.choices[0].message.content.strip()
 
-def generate_answer(
-    question: str,
-    evidence: Dict[str, Any],
-    temperature: float = 0.0,
-    max_tokens: int = 1000
-) -> str:
+def _complete(**params) -> str:
+    """One chat completion; identical concurrent requests are coalesced into one upstream call."""
+    return completion_flight.do(call_key(params), _create_completion, params)
+
+async def _complete_async(**params) -> str:
+    return await completion_flight.do_async(call_key(params), _create_completion, params)
+
+def _answer_messages(question: str, evidence: Dict[str, Any]) -> List[Dict[str, str]]:
     """
-    Generate answer using hybrid evidence (RAG chunks + KG paths).
-    Strict grounding + refusal instructions.
+    Grounded system + user prompt shared by the blocking and streaming answers.
+    `evidence` is either packed context (pack_context output) or raw retrieval evidence.
     """
-    context_parts = []
-
-    if evidence.get("rag_evidence"):
-        context_parts.append("=== Relevant Document Excerpts ===\n")
-        for ev in evidence["rag_evidence"]:
-            context_parts.append(
-                f"Document: {ev['document']} (Page {ev['page']})\n"
-                f"Text: {ev['text'][:1000]}\n"
-            )
-
-    if evidence.get("kg_evidence"):
-        context_parts.append("=== Knowledge Graph Facts ===\n")
-        for path in evidence["kg_evidence"][:10]:
-            if "path" in path:
-                rels = " -> ".join([f"{r['type']} ({r.get('description', '')})" for r in path["path"]])
-                context_parts.append(f"{path.get('start', '')} {rels} {path.get('target', '')}\n")
-            else:
-                context_parts.append(str(path) + "\n")
-
-    context = "\n".join(context_parts)
+    context = evidence["context"] if "context" in evidence else pack_context(question, evidence)["context"]
 
     system_prompt = """
 You are a precise, evidence-based reasoning assistant.
@@ -54,20 +55,69 @@ Question: {question}
 Answer:
     """.strip()
 
-    response = client.chat.completions.create(
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _direct_messages(question: str) -> List[Dict[str, str]]:
+    """No-retrieval prompt (llm_only mode): the model answers from its own knowledge."""
+    return [
+        {"role": "system", "content": "You are a precise assistant. Answer concisely and factually; say so if you do not know."},
+        {"role": "user", "content": question}
+    ]
+
+@traced("generation")
+def generate_answer(
+    question: str,
+    evidence: Optional[Dict[str, Any]],
+    temperature: float = 0.0,
+    max_tokens: int = 1000
+) -> str:
+    """
+    Generate answer using hybrid evidence (RAG chunks + KG paths).
+    Strict grounding + refusal instructions. With evidence=None (llm_only
+    mode) the question is answered without retrieved context.
+    """
+    return _complete(
         model=settings.openai_model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
+        messages=_answer_messages(question, evidence) if evidence is not None else _direct_messages(question),
         temperature=temperature,
         max_tokens=max_tokens,
         top_p=1.0
     )
 
-    return response.choices[0].message.content.strip()
+@traced("generation_stream")
+def stream_answer(
+    question: str,
+    evidence: Optional[Dict[str, Any]],
+    temperature: float = 0.0,
+    max_tokens: int = 1000,
+    timeout: Optional[float] = None
+) -> Iterator[str]:
+    """
+    Same prompt as generate_answer, but yields content deltas as the
+    model produces them (streaming completion). `timeout` bounds the HTTP
+    request, so an abandoned stream does not keep its connection forever.
+    """
+    params = dict(
+        model=settings.openai_model,
+        messages=_answer_messages(question, evidence) if evidence is not None else _direct_messages(question),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        top_p=1.0,
+        stream=True
+    )
+    if timeout is not None:
+        params["timeout"] = timeout
+    stream = chat_completion(**params)
+
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
 
 
+@traced("structured_generation")
 def generate_structured(
     prompt: str,
     response_format: Optional[Dict] = None,
@@ -77,13 +127,26 @@ def generate_structured(
     For structured tasks (e.g., entity extraction, JSON output).
     Use response_format={"type": "json_object"} when needed.
     """
-    response = client.chat.completions.create(
+    return _complete(
+        model=settings.openai_model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        response_format=response_format
+    )
+
+
+async def generate_structured_async(
+    prompt: str,
+    response_format: Optional[Dict] = None,
+    temperature: float = 0.0
+) -> str:
+    """generate_structured for callers on the event loop (shares in-flight calls with it)."""
+    return await _complete_async(
         model=settings.openai_model,
         messages=[{"role": "user", "content": prompt}],
         temperature=temperature,
         response_format=response_format
     )
-    return response.choices[0].message.content.strip()
 
 
 def extract_entities_relations(text: str) -> Dict[str, Any]:
@@ -1,15 +1,59 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional
 import json
+import time
+import logging
+import threading
+import contextvars
+from queue import Queue, Empty
+from contextlib import contextmanager, closing
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+import numpy as np
 from app.services.vector_store import query as pinecone_query
-from app.services.kg_store import get_related_entities, get_evidence_for_claim
+from app.services.kg_store import get_kg_context, get_kg_contexts, get_chunk_entities_batch
+from app.services.reranker import rerank
 from app.services.llm_service import generate_answer as generate_with_evidence
+from app.services.llm_service import stream_answer
+from app.services.embedding_service import get_embeddings
+from app.services.answer_cache import answer_cache
+from app.services.context_packer import pack_context, format_kg_fact
+from app.services.entity_matcher import entity_matcher
 from app.services.llm_service import generate_structured
 from app.services.verification import verify_claims
 from app.services.explanation import build_explanation
 from app.database.repository import get_chunk_texts
 from app.core.config import settings
+from app.utils.deadline import Deadline
+from app.utils.tracing import Trace, traced, span, collect_trace
+
+logger = logging.getLogger("rag_chatbot")
+
+# Shared by all requests: retrieval branches, and generation / verification
+# when they run under a deadline.
+stage_pool = ThreadPoolExecutor(max_workers=settings.pipeline_max_workers, thread_name_prefix="pipeline")
+
+# Confidence = retrieval similarity * 0.4 + KG coverage * 0.3 + claim support * 0.3
+CLAIM_SUPPORT_WEIGHT = 0.3
+
+# Retrieval branches each mode runs; llm_only answers without retrieval.
+MODE_BRANCHES = {
+    "llm_only": (),
+    "rag_only": ("vector",),
+    "kg_only": ("kg",),
+    "hybrid": ("vector", "kg")
+}
 
 def extract_entities_from_question(question: str) -> List[str]:
+    """
+    Matches graph entity names locally; the LLM extractor is only a
+    fallback for questions where nothing matched.
+    """
+    entities = entity_matcher.match(question)
+    if entities or not settings.entity_llm_fallback:
+        return entities
+    return extract_entities_with_llm(question)
+
+@traced("entity_extraction_llm")
+def extract_entities_with_llm(question: str) -> List[str]:
     """
     Extracts entities using structured JSON generation.
     """
@@ -34,62 +78,256 @@ def extract_entities_from_question(question: str) -> List[str]:
     except Exception:
         return [word for word in question.split() if word.istitle()][:5]
 
-def hybrid_retrieval(question: str, top_k: int = 5) -> Dict[str, Any]:
+def _vector_branch(
+    question: str,
+    top_k: int,
+    filters: Optional[Dict[str, Any]],
+    question_embedding: Optional[np.ndarray],
+    with_chunk_entities: bool
+) -> Dict[str, Any]:
     """
-    Combines Vector Search (Pinecone) and Graph Traversal (Neo4j).
+    Vector search, then the chunk texts for the matches. With reranking on,
+    RERANK_CANDIDATES matches are fetched with their vectors. When the mode
+    uses the graph, the entities each candidate mentions are looked up in
+    Neo4j alongside the texts, as a separate future ("entity_lookup") that
+    the caller waits for under the KG timeout, not the vector one.
     """
+    reranking = settings.rerank_enabled
     vector_results = pinecone_query(
         question=question,
-        top_k=top_k,
-        min_similarity=settings.min_similarity_threshold
+        top_k=max(settings.rerank_candidates, top_k) if reranking else top_k,
+        min_similarity=settings.min_similarity_threshold,
+        filters=filters,
+        embedding=question_embedding,
+        include_values=reranking
     )
     
     chunk_ids = [match["chunk_id"] for match in vector_results]
+    entity_lookup = _submit(get_chunk_entities_batch, chunk_ids) if with_chunk_entities and reranking and chunk_ids else None
     chunk_texts = get_chunk_texts(chunk_ids)
+    return {"candidates": _vector_candidates(vector_results, chunk_texts), "entity_lookup": entity_lookup}
 
-    rag_evidence = [
+def _vector_candidates(vector_results: List[Dict[str, Any]], chunk_texts: Dict[str, str]) -> List[Dict[str, Any]]:
+    return [
         {
-            "text": chunk_texts.get(cid, ""),
+            "chunk_id": match["chunk_id"],
+            "text": chunk_texts.get(match["chunk_id"], ""),
             "document": match["document"],
             "page": match["page"],
             "similarity": match["similarity"],
-            "source": "vector"
+            "source": "vector",
+            "values": match.get("values")
         }
-        for cid, match in zip(chunk_ids, vector_results)
+        for match in vector_results
     ]
 
+def _select_chunks(
+    question: str,
+    candidates: List[Dict[str, Any]],
+    entities: List[str],
+    chunk_entities: Optional[Dict[str, List[str]]],
+    top_k: int
+) -> List[Dict[str, Any]]:
+    """
+    The final top_k chunks: reranked candidates, or the first matches with
+    reranking off. `chunk_entities` is None when the lookup was skipped,
+    failed or timed out; the reranker then scores without the KG feature.
+    """
+    if settings.rerank_enabled:
+        candidates = rerank(
+            question,
+            candidates,
+            top_k,
+            question_entities=entities,
+            chunk_entities=chunk_entities,
+            weights={
+                "dense": settings.rerank_weight_dense,
+                "lexical": settings.rerank_weight_lexical,
+                "kg": settings.rerank_weight_kg,
+                "diversity": settings.rerank_weight_diversity
+            },
+            mmr_lambda=settings.rerank_mmr_lambda
+        )
+    return [{k: v for k, v in c.items() if k != "values"} for c in candidates[:top_k]]
+
+def _kg_branch(question: str) -> Dict[str, Any]:
+    """Question entities, then their neighbourhoods and connecting paths in one graph transaction."""
     entities = extract_entities_from_question(question)
-    kg_evidence = []
-    
-    for entity in entities[:3]:
-        paths = get_related_entities(entity, depth=2)
-        kg_evidence.extend(paths)
+    kg_context = get_kg_context(entities, depth=2, max_seed_entities=3)
+    return {"kg_evidence": _kg_evidence(kg_context), "entities": entities}
 
-    if len(entities) >= 2:
-        claim_paths = get_evidence_for_claim(entities)
-        kg_evidence.extend([{"source": "claim_path", **p} for p in claim_paths])
+def _kg_evidence(kg_context: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    kg_evidence = list(kg_context["neighbours"])
+    kg_evidence.extend([{**p, "start": p["source"], "source": "claim_path"} for p in kg_context["claim_paths"]])
+    return kg_evidence
 
-    return {
-        "rag_evidence": rag_evidence,
-        "kg_evidence": kg_evidence,
-        "entities": entities
-    }
+def _timed(fn: Callable[..., Any], *args) -> tuple:
+    started = time.monotonic()
+    return fn(*args), time.monotonic() - started
 
-def calculate_confidence(verification: Dict, evidence: Dict) -> float:
+def _submit(fn: Callable[..., Any], *args) -> Future:
+    # copy_context keeps the caller's upstream priority in the worker thread.
+    return stage_pool.submit(contextvars.copy_context().run, _timed, fn, *args)
+
+_STREAM_END = object()
+
+def _stream_within(tokens: Iterator[str], deadline: Deadline) -> Iterator[str]:
     """
-    Calculates composite confidence score.
+    Yield `tokens` until `deadline`, reading them on the stage pool so a
+    model that stalls before or between tokens cannot hold the request past
+    it. Raises queue.Empty when the deadline passes first.
+    """
+    queue: Queue = Queue()
+    stop = threading.Event()
+
+    def read() -> None:
+        try:
+            for token in tokens:
+                if stop.is_set():
+                    break
+                queue.put(token)
+        except Exception as e:
+            queue.put(e)
+        finally:
+            tokens.close()
+            queue.put(_STREAM_END)
+
+    stage_pool.submit(contextvars.copy_context().run, read)
+    try:
+        while True:
+            item = queue.get(timeout=deadline.remaining())
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def _collect(name: str, future: Future, started: float, timeout: float, fallback: Any) -> tuple:
+    """
+    Wait for a branch until `timeout` after `started`. A timed-out or failed
+    branch contributes `fallback`; a timed-out one still runs to completion
+    in the pool, but nothing waits for it.
+    """
+    try:
+        result, seconds = future.result(timeout=max(started + timeout - time.monotonic(), 0))
+        return result, {"status": "ok", "latency_ms": round(seconds * 1000, 1)}
+    except FutureTimeout:
+        logger.warning(f"Retrieval branch '{name}' timed out after {timeout:.2f}s")
+        status = "timeout"
+    except Exception as e:
+        logger.error(f"Retrieval branch '{name}' failed: {e}")
+        status = "error"
+    return fallback, {"status": status, "latency_ms": round((time.monotonic() - started) * 1000, 1)}
+
+def hybrid_retrieval(
+    question: str,
+    top_k: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+    question_embedding: Optional[np.ndarray] = None,
+    deadline: Optional[Deadline] = None,
+    mode: str = "hybrid"
+) -> Dict[str, Any]:
     """
+    Combines Vector Search (Pinecone) and Graph Traversal (Neo4j).
+
+    Only the branches of `mode` run: rag_only never touches Neo4j or entity
+    extraction, kg_only skips vector search and chunk fetches. The branches
+    are independent and run concurrently on the shared stage pool, each
+    under its own timeout, so retrieval takes as long as the slowest branch
+    rather than the sum. "branches" reports each branch's status
+    (ok / timeout / error / skipped) and latency. Once both are in, the
+    over-fetched vector candidates are reranked (see reranker.rerank) with
+    the question entities found by the KG branch.
+
+    Under a deadline the vector branch may use what is left of it, while KG
+    enrichment (KG next to vector search) only gets the time not reserved
+    for generation and verification, and is skipped when there is none.
+    The candidates' graph entities are a Neo4j read too, so they get the KG
+    timeout: a slow graph costs the reranker its KG feature, never the
+    vector results.
+    """
+    branches = MODE_BRANCHES[mode]
+    deadline = deadline or Deadline(settings.request_deadline_seconds)
+    reserve = settings.generation_min_seconds + settings.verification_min_seconds
+    vector_timeout = deadline.budget(settings.retrieval_vector_timeout_seconds)
+    kg_timeout = deadline.budget(settings.retrieval_kg_timeout_seconds, reserve if "vector" in branches else 0.0)
+
+    started = time.monotonic()
+    with_kg = "kg" in branches and kg_timeout > 0
+    vector = _submit(
+        _vector_branch, question, top_k, filters, question_embedding, with_kg
+    ) if "vector" in branches else None
+    kg = _submit(_kg_branch, question) if with_kg else None
+
+    statuses: Dict[str, Dict[str, Any]] = {}
+    vector_result = {"candidates": [], "entity_lookup": None}
+    kg_result = {"kg_evidence": [], "entities": []}
+    chunk_entities = None
+    if vector is not None:
+        vector_result, statuses["vector"] = _collect("vector", vector, started, vector_timeout, vector_result)
+    if vector_result["entity_lookup"] is not None:
+        chunk_entities, _ = _collect("chunk_entities", vector_result["entity_lookup"], started, kg_timeout, None)
+    if kg is not None:
+        kg_result, statuses["kg"] = _collect("kg", kg, started, kg_timeout, kg_result)
+    elif "kg" in branches:
+        statuses["kg"] = {"status": "skipped", "latency_ms": 0.0}
+
+    return {
+        "rag_evidence": _select_chunks(
+            question, vector_result["candidates"], kg_result["entities"], chunk_entities, top_k
+        ),
+        "kg_evidence": kg_result["kg_evidence"],
+        "entities": kg_result["entities"],
+        "branches": statuses
+    }
+
+def _retrieval_confidence(evidence: Dict) -> float:
+    """The retrieval share of the confidence score (at most 0.7)."""
     if not evidence.get("rag_evidence"):
         sim_score = 0.0
     else:
         sim_score = sum(e["similarity"] for e in evidence["rag_evidence"]) / len(evidence["rag_evidence"])
     
     kg_coverage = min(len(evidence.get("kg_evidence", [])) / 5.0, 1.0)
-    
+    return (sim_score * 0.4) + (kg_coverage * 0.3)
+
+def calculate_confidence(verification: Dict, evidence: Dict) -> float:
+    """
+    Calculates composite confidence score.
+    """
     total_claims = max(len(verification.get("claims", [])), 1)
     claim_support = 1.0 - (verification.get("unsupported_count", 0) / total_claims)
 
-    return (sim_score * 0.4) + (kg_coverage * 0.3) + (claim_support * 0.3)
+    return _retrieval_confidence(evidence) + (claim_support * CLAIM_SUPPORT_WEIGHT)
+
+def evidence_gate(evidence: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Pre-generation sufficiency check. Even a perfectly supported answer
+    cannot score more than the retrieval confidence plus the full claim
+    support weight; if that ceiling is under the answer threshold (or the
+    best chunk is under EVIDENCE_MIN_TOP_SIMILARITY), generating and
+    verifying an answer would only end in a refusal. Returns the refusal
+    reason, or None when the evidence could carry an answer.
+    """
+    if not settings.evidence_gate_enabled:
+        return None
+
+    ceiling = _retrieval_confidence(evidence) + CLAIM_SUPPORT_WEIGHT
+    top_similarity = max((ev["similarity"] for ev in evidence["rag_evidence"]), default=0.0)
+    if ceiling < settings.answer_confidence_threshold:
+        reason = "max_confidence"
+    elif evidence["rag_evidence"] and top_similarity < settings.evidence_min_top_similarity:
+        reason = "top_similarity"
+    else:
+        return None
+    return {
+        "reason": reason,
+        "max_confidence": round(ceiling, 3),
+        "threshold": settings.answer_confidence_threshold,
+        "top_similarity": round(top_similarity, 3)
+    }
 
 def extract_citations(evidence: Dict) -> List[Dict]:
     citations = []
@@ -105,36 +343,121 @@ def extract_citations(evidence: Dict) -> List[Dict]:
             seen.add(key)
     return citations
 
-def run_rag_pipeline(question: str, session_id: int) -> Dict[str, Any]:
+def _source_counts(evidence: Dict) -> Dict[str, int]:
+    return {
+        "vector_chunks": len(evidence["rag_evidence"]),
+        "kg_paths": len(evidence["kg_evidence"])
+    }
+
+def _degraded_stages(evidence: Dict[str, Any]) -> List[str]:
+    branches = evidence.get("branches", {})
+    degraded = []
+    if branches.get("vector", {}).get("status", "ok") != "ok":
+        degraded.append("vector_retrieval")
+    if branches.get("kg", {}).get("status", "ok") != "ok":
+        degraded.append("kg_enrichment" if "vector" in branches else "kg_retrieval")
+    return degraded
+
+def _retrieval_only_response(
+    evidence: Dict[str, Any],
+    degraded: List[str],
+    packed: Optional[Dict[str, Any]] = None,
+    cause: str = "answer generation or verification did not fit in the request deadline"
+) -> Dict[str, Any]:
     """
-    Main Orchestrator.
+    Degraded answer when an answer cannot be generated or verified (no time
+    left, or verification failed): the most relevant passages themselves,
+    with only the retrieval share of confidence.
     """
-    evidence = hybrid_retrieval(question, top_k=settings.top_k)
+    excerpts = [
+        f"- {ev['document']} (page {ev['page']}): {ev['text'][:300].strip()}"
+        for ev in evidence["rag_evidence"][:3] if ev.get("text")
+    ]
+    excerpts.extend(f"- {format_kg_fact(fact).strip()}" for fact in evidence["kg_evidence"][:3 - len(excerpts)])
+    return {
+        "answer": "A verified answer could not be produced. The most relevant evidence found:\n" + "\n".join(excerpts),
+        "refusal": False,
+        "confidence": round(_retrieval_confidence(evidence), 2),
+        "confidence_level": "Low",
+        "citations": extract_citations(evidence),
+        "explanation": f"Retrieval-only response: {cause}.",
+        "sources": _source_counts(evidence),
+        "context_packing": packed["stats"] if packed else None,
+        "degraded": degraded
+    }
 
-    if not evidence["rag_evidence"] and not evidence["kg_evidence"]:
-        return {
-            "answer": "I don't have sufficient evidence to answer this question.",
-            "refusal": True,
-            "confidence": 0.0,
-            "citations": [],
-            "explanation": "No relevant chunks or KG paths found."
-        }
+def _insufficient_evidence_response(evidence: Dict[str, Any], gate: Dict[str, Any], degraded: List[str]) -> Dict[str, Any]:
+    return {
+        "answer": "I don't have sufficient evidence to answer this question.",
+        "refusal": True,
+        "confidence": round(_retrieval_confidence(evidence), 2),
+        "citations": [],
+        "explanation": "The retrieved evidence is too weak to support a confident answer, so none was generated.",
+        "sources": _source_counts(evidence),
+        "evidence_gate": gate,
+        "degraded": degraded,
+        "cached": False
+    }
 
-    answer = generate_with_evidence(
-        question=question,
-        evidence=evidence
-    )
+def _no_evidence_response() -> Dict[str, Any]:
+    return {
+        "answer": "I don't have sufficient evidence to answer this question.",
+        "refusal": True,
+        "confidence": 0.0,
+        "citations": [],
+        "explanation": "No relevant chunks or KG paths found."
+    }
+
+def finalize_answer(
+    answer: str,
+    evidence: Dict[str, Any],
+    packed: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+    degraded: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Verify the generated answer against the evidence and apply the claim
+    gate: unsupported claims or low confidence turn it into a refusal.
+
+    With less than VERIFICATION_MIN_SECONDS left only the leading claims
+    are verified; if verification still overruns the deadline the answer
+    is dropped for a retrieval-only response. So is an answer verification
+    could not check at all (claim extraction failed): it is never served
+    as supported, and being degraded it is never cached.
+    """
+    deadline = deadline or Deadline(settings.request_deadline_seconds)
+    degraded = list(degraded or [])
+    max_claims = None
+    if not deadline.allows(settings.verification_min_seconds):
+        max_claims = settings.degraded_verification_max_claims
+        degraded.append("verification")
+
+    try:
+        verification, _ = _submit(verify_claims, answer, evidence, max_claims).result(timeout=deadline.remaining())
+    except FutureTimeout:
+        logger.warning("Verification overran the request deadline; returning retrieval-only")
+        if "verification" not in degraded:
+            degraded.append("verification")
+        return _retrieval_only_response(evidence, degraded, packed)
+    except Exception as e:
+        logger.error(f"Verification failed: {e}")
+        verification = {"status": "unverified"}
 
-    verification = verify_claims(answer, evidence)
+    if verification["status"] != "verified":
+        if "verification" not in degraded:
+            degraded.append("verification")
+        return _retrieval_only_response(evidence, degraded, packed, cause="the generated answer could not be verified")
     confidence = calculate_confidence(verification, evidence)
 
-    if verification["unsupported_count"] > 0 or confidence < 0.4:
+    if verification["unsupported_count"] > 0 or confidence < settings.answer_confidence_threshold:
         return {
             "answer": "I cannot confidently answer this based on the available evidence.",
             "refusal": True,
             "confidence": round(confidence, 2),
             "unsupported_claims": verification["unsupported"],
-            "explanation": "Significant claims in the potential answer lacked supporting evidence."
+            "explanation": "Significant claims in the potential answer lacked supporting evidence.",
+            "context_packing": packed["stats"] if packed else None,
+            "degraded": degraded
         }
 
     explanation = build_explanation(answer, verification, evidence)
@@ -146,8 +469,523 @@ def run_rag_pipeline(question: str, session_id: int) -> Dict[str, Any]:
         "citations": extract_citations(evidence),
         "explanation": explanation,
         "refusal": False,
-        "sources": {
-            "vector_chunks": len(evidence["rag_evidence"]),
-            "kg_paths": len(evidence["kg_evidence"])
+        "sources": _source_counts(evidence),
+        "context_packing": packed["stats"] if packed else None,
+        "degraded": degraded
+    }
+
+def _cache_lookup(question: str, mode: str, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Embed the question once (reused for retrieval) and check the answer cache.
+    """
+    if not settings.answer_cache_enabled:
+        return {"embedding": None, "generation": None, "response": None}
+
+    embedding = get_embeddings([question])[0]
+    generation = answer_cache.generation()
+    return {
+        "embedding": embedding,
+        "generation": generation,
+        "response": answer_cache.lookup(embedding, mode, filters)
+    }
+
+def _cache_store(
+    question: str,
+    mode: str,
+    filters: Optional[Dict[str, Any]],
+    lookup: Dict[str, Any],
+    response: Dict[str, Any]
+) -> Dict[str, Any]:
+    # Degraded answers are a product of load, not of the question; don't replay them.
+    if lookup["embedding"] is not None and not response.get("degraded"):
+        answer_cache.store(question, lookup["embedding"], mode, filters, response, lookup["generation"])
+    return {**response, "cached": False}
+
+@contextmanager
+def _stage(latency: Dict[str, float], name: str):
+    """Add the wall time of a pipeline stage to `latency` (ms), and record it as a stage_<name> span."""
+    started = time.monotonic()
+    try:
+        with span(f"stage_{name}"):
+            yield
+    finally:
+        latency[name] = round(latency.get(name, 0.0) + (time.monotonic() - started) * 1000, 1)
+
+def _check_mode(mode: str) -> None:
+    if mode not in MODE_BRANCHES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {list(MODE_BRANCHES)}")
+
+def _generate(question: str, packed: Optional[Dict[str, Any]], deadline: Deadline) -> Optional[str]:
+    """The answer, or None if there is no time to generate (and then verify) one."""
+    if not deadline.allows(settings.generation_min_seconds):
+        return None
+    try:
+        answer, _ = _submit(generate_with_evidence, question, packed).result(timeout=deadline.remaining())
+        return answer
+    except FutureTimeout:
+        logger.warning("Answer generation overran the request deadline; returning retrieval-only")
+        return None
+
+def _unverified_response(answer: str) -> Dict[str, Any]:
+    """llm_only: there is no evidence to verify against or cite."""
+    return {
+        "answer": answer,
+        "refusal": False,
+        "confidence": 0.0,
+        "confidence_level": "Unverified",
+        "citations": [],
+        "explanation": "LLM-only mode: answered from the model's own knowledge, without retrieval or verification.",
+        "degraded": []
+    }
+
+def _timed_out_response() -> Dict[str, Any]:
+    return {
+        "answer": "A response could not be produced in time.",
+        "refusal": True,
+        "confidence": 0.0,
+        "citations": [],
+        "explanation": "Answer generation did not fit in the request deadline.",
+        "degraded": ["generation"]
+    }
+
+def _answer(
+    question: str,
+    mode: str,
+    filters: Optional[Dict[str, Any]],
+    deadline: Deadline,
+    latency: Dict[str, float]
+) -> Dict[str, Any]:
+    with _stage(latency, "cache_lookup"):
+        lookup = _cache_lookup(question, mode, filters)
+    if lookup["response"] is not None:
+        return lookup["response"]
+
+    if mode == "llm_only":
+        return _answer_directly(question, mode, filters, lookup, deadline, latency)
+
+    with _stage(latency, "retrieval"):
+        evidence = hybrid_retrieval(
+            question,
+            top_k=settings.top_k,
+            filters=filters,
+            question_embedding=lookup["embedding"],
+            deadline=deadline,
+            mode=mode
+        )
+    return _answer_from_evidence(question, mode, filters, lookup, evidence, deadline, latency)
+
+def _answer_directly(
+    question: str,
+    mode: str,
+    filters: Optional[Dict[str, Any]],
+    lookup: Dict[str, Any],
+    deadline: Deadline,
+    latency: Dict[str, float]
+) -> Dict[str, Any]:
+    """llm_only: generation without retrieval or verification."""
+    with _stage(latency, "generation"):
+        answer = _generate(question, None, deadline)
+    if answer is None:
+        return {**_timed_out_response(), "cached": False}
+    return _cache_store(question, mode, filters, lookup, _unverified_response(answer))
+
+def _answer_from_evidence(
+    question: str,
+    mode: str,
+    filters: Optional[Dict[str, Any]],
+    lookup: Dict[str, Any],
+    evidence: Dict[str, Any],
+    deadline: Deadline,
+    latency: Dict[str, float]
+) -> Dict[str, Any]:
+    """Everything after retrieval: evidence gate, generation, verification, cache store."""
+    degraded = _degraded_stages(evidence)
+
+    if not evidence["rag_evidence"] and not evidence["kg_evidence"]:
+        return {**_no_evidence_response(), "degraded": degraded, "cached": False}
+
+    gate = evidence_gate(evidence)
+    if gate is not None:
+        return _insufficient_evidence_response(evidence, gate, degraded)
+
+    packed = pack_context(question, evidence)
+    with _stage(latency, "generation"):
+        answer = _generate(question, packed, deadline)
+    if answer is None:
+        return {**_retrieval_only_response(evidence, degraded + ["generation"], packed), "cached": False}
+
+    with _stage(latency, "verification"):
+        response = finalize_answer(answer, evidence, packed, deadline, degraded)
+    return _cache_store(question, mode, filters, lookup, response)
+
+def run_rag_pipeline(
+    question: str,
+    session_id: int,
+    mode: str = "hybrid",
+    filters: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+    timings: bool = False
+) -> Dict[str, Any]:
+    """
+    Main Orchestrator.
+
+    `mode` selects the stages: hybrid and rag_only / kg_only retrieve from
+    both or one store, llm_only answers without retrieval or verification.
+    "latency_ms" reports the time spent in each stage that ran.
+
+    Every stage runs within `deadline` (REQUEST_DEADLINE_SECONDS by default)
+    and degrades instead of overrunning it: KG enrichment is skipped,
+    verification capped to the leading claims, or a retrieval-only response
+    returned. "degraded" lists the stages affected.
+
+    With `timings`, "timings" adds every service span the request ran
+    (embedding, vector query, each Neo4j read, each LLM call, ...).
+    """
+    _check_mode(mode)
+    deadline = deadline or Deadline(settings.request_deadline_seconds)
+    latency: Dict[str, float] = {}
+    with collect_trace(timings) as trace:
+        response = _answer(question, mode, filters, deadline, latency)
+    latency["total"] = round(deadline.elapsed() * 1000, 1)
+    response = {**response, "mode": mode, "latency_ms": latency}
+    if trace is not None:
+        response["timings"] = trace.summary()
+    return response
+
+def stream_rag_pipeline(
+    question: str,
+    session_id: int,
+    mode: str = "hybrid",
+    filters: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+    timings: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of run_rag_pipeline. Yields events in order:
+    - retrieval: citations and source counts, as soon as evidence is in
+      (not sent in llm_only mode)
+    - token: answer text deltas from the streaming completion
+    - final: the same payload run_rag_pipeline returns
+
+    The claim gate runs on the completed answer, so a final event with
+    refusal=True means the client must replace the streamed text.
+    A cache hit is sent as a single final event. Streaming stops when the
+    deadline passes; the final event is then a retrieval-only response.
+    """
+    _check_mode(mode)
+    with collect_trace(timings) as trace:
+        yield from _stream(question, mode, filters, deadline or Deadline(settings.request_deadline_seconds), trace)
+
+def _stream(
+    question: str,
+    mode: str,
+    filters: Optional[Dict[str, Any]],
+    deadline: Deadline,
+    trace: Optional[Trace]
+) -> Iterator[Dict[str, Any]]:
+    latency: Dict[str, float] = {}
+
+    def final(response: Dict[str, Any]) -> Dict[str, Any]:
+        latency["total"] = round(deadline.elapsed() * 1000, 1)
+        data = {**response, "mode": mode, "latency_ms": latency}
+        if trace is not None:
+            data["timings"] = trace.summary()
+        return {"event": "final", "data": data}
+
+    with _stage(latency, "cache_lookup"):
+        lookup = _cache_lookup(question, mode, filters)
+    if lookup["response"] is not None:
+        yield final(lookup["response"])
+        return
+
+    evidence, packed, degraded = None, None, []
+    if mode != "llm_only":
+        with _stage(latency, "retrieval"):
+            evidence = hybrid_retrieval(
+                question,
+                top_k=settings.top_k,
+                filters=filters,
+                question_embedding=lookup["embedding"],
+                deadline=deadline,
+                mode=mode
+            )
+        degraded = _degraded_stages(evidence)
+
+        if not evidence["rag_evidence"] and not evidence["kg_evidence"]:
+            yield final({**_no_evidence_response(), "degraded": degraded, "cached": False})
+            return
+
+        gate = evidence_gate(evidence)
+        if gate is not None:
+            yield final(_insufficient_evidence_response(evidence, gate, degraded))
+            return
+
+        packed = pack_context(question, evidence)
+        yield {
+            "event": "retrieval",
+            "data": {
+                "citations": extract_citations(evidence),
+                "entities": evidence["entities"],
+                "sources": _source_counts(evidence),
+                "context_packing": packed["stats"],
+                "degraded": degraded
+            }
+        }
+
+    def out_of_time() -> Dict[str, Any]:
+        if evidence is None:
+            return final({**_timed_out_response(), "cached": False})
+        return final({**_retrieval_only_response(evidence, degraded + ["generation"], packed), "cached": False})
+
+    if not deadline.allows(settings.generation_min_seconds):
+        yield out_of_time()
+        return
+
+    tokens, timed_out = [], False
+    with _stage(latency, "generation"):
+        stream = stream_answer(question=question, evidence=packed, timeout=deadline.remaining())
+        try:
+            with closing(_stream_within(stream, deadline)) as bounded:
+                for token in bounded:
+                    tokens.append(token)
+                    yield {"event": "token", "data": {"text": token}}
+        except Empty:
+            logger.warning("Answer streaming overran the request deadline")
+            timed_out = True
+    if timed_out:
+        yield out_of_time()
+        return
+
+    answer = "".join(tokens).strip()
+    if evidence is None:
+        yield final(_cache_store(question, mode, filters, lookup, _unverified_response(answer)))
+        return
+
+    with _stage(latency, "verification"):
+        response = finalize_answer(answer, evidence, packed, deadline, degraded)
+    yield final(_cache_store(question, mode, filters, lookup, response))
+
+def batch_retrieval(
+    questions: List[str],
+    embeddings: Optional[np.ndarray] = None,
+    top_k: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+    mode: str = "hybrid"
+) -> List[Dict[str, Any]]:
+    """
+    hybrid_retrieval for many questions, with the lookups they have in
+    common done once:
+    - vector: one query per question (concurrently, with the precomputed
+      `embeddings`), then a single chunk-text fetch and a single
+      chunk-entity batch (under the KG timeout) over the union of all
+      matches
+    - kg: entity extraction per question, then one graph transaction for
+      every question's neighbourhoods and paths (kg_store.get_kg_contexts),
+      skipped when no question names an entity
+
+    Returns one evidence dict per question, in order. Branch timeouts apply
+    as in hybrid_retrieval; a failed shared lookup fails that branch for
+    every question.
+    """
+    branches = MODE_BRANCHES[mode]
+    reranking = settings.rerank_enabled
+    started = time.monotonic()
+
+    searches = [
+        _submit(
+            pinecone_query,
+            question,
+            max(settings.rerank_candidates, top_k) if reranking else top_k,
+            settings.min_similarity_threshold,
+            filters,
+            embeddings[i] if embeddings is not None else None,
+            reranking
+        )
+        for i, question in enumerate(questions)
+    ] if "vector" in branches else []
+    extractions = [
+        _submit(extract_entities_from_question, question) for question in questions
+    ] if "kg" in branches else []
+
+    statuses: List[Dict[str, Dict[str, Any]]] = [{} for _ in questions]
+    matches: List[List[Dict[str, Any]]] = [[] for _ in questions]
+    for i, future in enumerate(searches):
+        matches[i], statuses[i]["vector"] = _collect(
+            "vector", future, started, settings.retrieval_vector_timeout_seconds, []
+        )
+
+    chunk_ids = list(dict.fromkeys(m["chunk_id"] for results in matches for m in results))
+    texts = _submit(get_chunk_texts, chunk_ids) if chunk_ids else None
+    entity_lookup = _submit(
+        get_chunk_entities_batch, chunk_ids
+    ) if chunk_ids and reranking and "kg" in branches else None
+
+    entity_lists: List[List[str]] = [[] for _ in questions]
+    kg_contexts = [{"neighbours": [], "claim_paths": []} for _ in questions]
+    for i, future in enumerate(extractions):
+        entity_lists[i], statuses[i]["kg"] = _collect(
+            "kg", future, started, settings.retrieval_kg_timeout_seconds, []
+        )
+    if any(entity_lists):
+        kg_lookup = _submit(get_kg_contexts, entity_lists, 2, 3)
+        contexts, kg_status = _collect("kg", kg_lookup, started, settings.retrieval_kg_timeout_seconds, None)
+        if contexts is not None:
+            kg_contexts = contexts
+        else:
+            for status in statuses:
+                status["kg"] = {**status["kg"], "status": kg_status["status"]}
+
+    chunk_texts, chunk_entities = {}, None
+    if texts is not None:
+        chunk_texts, _ = _collect("chunks", texts, started, settings.retrieval_vector_timeout_seconds, {})
+    if entity_lookup is not None:
+        chunk_entities, _ = _collect(
+            "chunk_entities", entity_lookup, started, settings.retrieval_kg_timeout_seconds, None
+        )
+
+    return [
+        {
+            "rag_evidence": _select_chunks(
+                question, _vector_candidates(matches[i], chunk_texts), entity_lists[i], chunk_entities, top_k
+            ),
+            "kg_evidence": _kg_evidence(kg_contexts[i]),
+            "entities": entity_lists[i],
+            "branches": statuses[i]
+        }
+        for i, question in enumerate(questions)
+    ]
+
+def _batch_lookups(questions: List[str], mode: str, filters: Optional[Dict[str, Any]]) -> tuple:
+    """
+    _cache_lookup for every question from a single embedding call; the
+    embeddings are also returned for vector retrieval (None when neither
+    the cache nor the mode needs them).
+    """
+    miss = {"embedding": None, "generation": None, "response": None}
+    if not settings.answer_cache_enabled and "vector" not in MODE_BRANCHES[mode]:
+        return [dict(miss) for _ in questions], None
+
+    embeddings = get_embeddings(questions)
+    if not settings.answer_cache_enabled:
+        return [dict(miss) for _ in questions], embeddings
+
+    generation = answer_cache.generation()
+    lookups = [
+        {"embedding": embedding, "generation": generation, "response": answer_cache.lookup(embedding, mode, filters)}
+        for embedding in embeddings
+    ]
+    return lookups, embeddings
+
+def run_batch_pipeline(
+    questions: List[str],
+    mode: str = "hybrid",
+    filters: Optional[Dict[str, Any]] = None,
+    workers: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Answers a list of questions, yielding events as answers complete
+    (completion order, not input order):
+    - result: {"index", "question", "response"}, where response is the
+      payload run_rag_pipeline returns; a repeated question is answered
+      once and reported at each of its indexes
+    - error: {"indexes", "question", "detail"} for a question that failed
+    - done: question counts and the latency of the shared stages
+
+    The questions are taken BATCH_CHUNK_SIZE at a time: each chunk shares
+    one embedding call and one batch_retrieval, which bounds the Pinecone
+    queries a batch puts on the stage pool. Answers go to a pool of
+    `workers` (BATCH_WORKERS) threads as soon as their chunk is retrieved,
+    so later chunks are retrieved while earlier ones generate and verify,
+    each under its own REQUEST_DEADLINE_SECONDS deadline starting when its
+    turn comes.
+    """
+    _check_mode(mode)
+    batch_deadline = Deadline(settings.request_deadline_seconds)
+    shared_latency: Dict[str, float] = {}
+    unique = list(dict.fromkeys(questions))
+    indexes: Dict[str, List[int]] = {}
+    for i, question in enumerate(questions):
+        indexes.setdefault(question, []).append(i)
+
+    def results(question: str, response: Dict[str, Any], latency: Dict[str, float]) -> Iterator[Dict[str, Any]]:
+        latency["total"] = round(batch_deadline.elapsed() * 1000, 1)
+        for index in indexes[question]:
+            yield {
+                "event": "result",
+                "data": {"index": index, "question": question, "response": {**response, "mode": mode, "latency_ms": latency}}
+            }
+
+    def answer(question: str, lookup: Dict[str, Any], evidence: Optional[Dict[str, Any]]) -> tuple:
+        latency: Dict[str, float] = {}
+        deadline = Deadline(settings.request_deadline_seconds)
+        if mode == "llm_only":
+            response = _answer_directly(question, mode, filters, lookup, deadline, latency)
+        else:
+            response = _answer_from_evidence(question, mode, filters, lookup, evidence, deadline, latency)
+        return response, latency
+
+    futures: Dict[Future, str] = {}
+
+    def finished(wait: bool) -> Iterator[Dict[str, Any]]:
+        done = as_completed(list(futures)) if wait else [f for f in list(futures) if f.done()]
+        for future in done:
+            question = futures.pop(future)
+            try:
+                response, latency = future.result()
+            except Exception as e:
+                logger.error(f"Batch question failed: {e}")
+                yield {"event": "error", "data": {"indexes": indexes[question], "question": question, "detail": str(e)}}
+                continue
+            yield from results(question, response, latency)
+
+    cached = 0
+    pool = ThreadPoolExecutor(
+        max_workers=max(min(workers or settings.batch_workers, len(unique)), 1), thread_name_prefix="batch"
+    )
+    try:
+        for offset in range(0, len(unique), settings.batch_chunk_size):
+            chunk = unique[offset:offset + settings.batch_chunk_size]
+            with _stage(shared_latency, "cache_lookup"):
+                lookups, embeddings = _batch_lookups(chunk, mode, filters)
+
+            pending = []
+            for i, (question, lookup) in enumerate(zip(chunk, lookups)):
+                if lookup["response"] is not None:
+                    cached += 1
+                    yield from results(question, lookup["response"], {})
+                else:
+                    pending.append(i)
+            if not pending:
+                continue
+
+            evidences: List[Optional[Dict[str, Any]]] = [None] * len(pending)
+            if mode != "llm_only":
+                with _stage(shared_latency, "retrieval"):
+                    evidences = batch_retrieval(
+                        [chunk[i] for i in pending],
+                        embeddings=embeddings[pending] if embeddings is not None else None,
+                        top_k=settings.top_k,
+                        filters=filters,
+                        mode=mode
+                    )
+            for i, evidence in zip(pending, evidences):
+                future = pool.submit(contextvars.copy_context().run, answer, chunk[i], lookups[i], evidence)
+                futures[future] = chunk[i]
+            yield from finished(wait=False)
+
+        yield from finished(wait=True)
+    finally:
+        # A client that disconnects closes this generator: drop the answers not started yet.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    shared_latency["total"] = round(batch_deadline.elapsed() * 1000, 1)
+    yield {
+        "event": "done",
+        "data": {
+            "questions": len(questions),
+            "unique": len(unique),
+            "cached": cached,
+            "mode": mode,
+            "latency_ms": shared_latency
         }
     }
\ No newline at end of file
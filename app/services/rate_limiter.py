@@ -0,0 +1,237 @@
+import time
+import heapq
+import random
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional, TypeVar
+import openai
+from app.core.config import settings
+from app.services.context_packer import count_tokens
+from app.utils.metrics import metrics
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+INGESTION = "ingestion"
+EVALUATION = "evaluation"
+PRIORITY_ORDER = {INTERACTIVE: 0, INGESTION: 1, EVALUATION: 2}
+
+DEFAULT_COMPLETION_TOKENS = 500
+RATE_LIMIT_BACKOFF = 0.7
+RECOVERY_STEP = 0.02
+MIN_RATE_SHARE = 0.1
+
+UPSTREAM_CALLS = metrics.counter(
+    "upstream_calls_total", "Upstream API calls by model and outcome (ok / error); retries count once", ("model", "status")
+)
+UPSTREAM_TOKENS = metrics.counter(
+    "upstream_tokens_total", "Tokens charged per model (reported usage, else the estimate)", ("model",)
+)
+
+_priority: ContextVar[str] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+@contextmanager
+def upstream_priority(name: str):
+    """Run the enclosed upstream calls (same thread / task) in a priority class."""
+    if name not in PRIORITY_ORDER:
+        raise ValueError(f"Unknown priority class '{name}'")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def estimate_chat_tokens(params: Dict[str, Any]) -> int:
+    prompt = sum(count_tokens(str(m.get("content", ""))) for m in params.get("messages", []))
+    return prompt + (params.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+def estimate_embedding_tokens(texts: Iterable[str]) -> int:
+    return sum(count_tokens(t) for t in texts)
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+class UpstreamScheduler:
+    """
+    Single admission point for every chat / embedding request.
+
+    Requests and tokens are drawn from two per-minute token buckets. Waiting
+    callers queue by priority class (interactive > ingestion > evaluation,
+    FIFO within a class), so a long ingestion cannot starve chat.
+
+    Retryable failures (429, 5xx, connection errors) are retried with
+    full-jitter exponential backoff. A 429 honours Retry-After, pauses
+    admission for everyone, and cuts the effective request rate. Successful
+    calls let it recover gradually (AIMD) towards the configured limit.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._rate = float(requests_per_minute)
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._cooldown_until = 0.0
+
+        self._depth = {name: 0 for name in PRIORITY_ORDER}
+        self._peak_depth = 0
+        self._admitted = {name: 0 for name in PRIORITY_ORDER}
+        self._wait_seconds = {name: 0.0 for name in PRIORITY_ORDER}
+        self._retries = 0
+        self._rate_limited = 0
+        self._failures = 0
+        self._tokens_used = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._requests = min(self._rate, self._requests + elapsed * self._rate / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+        self._updated = now
+
+    def _acquire(self, priority: str, tokens: int) -> None:
+        # A request larger than the whole bucket still gets through once it is full.
+        tokens = min(tokens, self.tokens_per_minute)
+        entry = (PRIORITY_ORDER[priority], next(self._seq))
+        started = time.monotonic()
+
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._depth[priority] += 1
+            self._peak_depth = max(self._peak_depth, len(self._queue))
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    timeout = None
+                    if self._queue[0] == entry:
+                        if now < self._cooldown_until:
+                            timeout = self._cooldown_until - now
+                        elif self._requests >= 1 and self._tokens >= tokens:
+                            self._requests -= 1
+                            self._tokens -= tokens
+                            break
+                        else:
+                            timeout = max(
+                                (1 - self._requests) * 60 / self._rate,
+                                (tokens - self._tokens) * 60 / self.tokens_per_minute
+                            )
+                    self._cond.wait(timeout=timeout)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._depth[priority] -= 1
+                self._admitted[priority] += 1
+                self._wait_seconds[priority] += time.monotonic() - started
+                self._cond.notify_all()
+
+    def _backoff(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is not retryable."""
+        jitter = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+        if isinstance(error, openai.RateLimitError):
+            retry_after = _retry_after(error)
+            delay = min(retry_after + random.uniform(0, self.backoff_base), self.backoff_max) if retry_after is not None else jitter
+            with self._cond:
+                self._rate_limited += 1
+                self._rate = max(self._rate * RATE_LIMIT_BACKOFF, self.requests_per_minute * MIN_RATE_SHARE)
+                self._requests = min(self._requests, self._rate)
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            return delay
+
+        if isinstance(error, openai.APIStatusError):
+            return jitter if error.status_code >= 500 else None
+        if isinstance(error, openai.APIConnectionError):
+            return jitter
+        return None
+
+    def _settle(self, response: Any, estimated_tokens: int) -> int:
+        """Charge the bucket with actual usage and let the rate recover; returns the tokens charged."""
+        usage = getattr(response, "usage", None)
+        actual = getattr(usage, "total_tokens", None) or estimated_tokens
+        with self._cond:
+            self._tokens = min(self.tokens_per_minute, self._tokens + estimated_tokens - actual)
+            self._tokens_used += actual
+            self._rate = min(float(self.requests_per_minute), self._rate + self.requests_per_minute * RECOVERY_STEP)
+            self._cond.notify_all()
+        return actual
+
+    def call(self, fn: Callable[..., T], *args, estimated_tokens: int = 0, **kwargs) -> T:
+        """Admit, run and (if needed) retry one upstream request in the caller's priority class."""
+        priority = _priority.get()
+        model = kwargs.get("model", "unknown")
+        for attempt in range(self.max_retries + 1):
+            self._acquire(priority, estimated_tokens)
+            try:
+                response = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    with self._cond:
+                        self._failures += 1
+                    UPSTREAM_CALLS.inc(model=model, status="error")
+                    raise
+                with self._cond:
+                    self._retries += 1
+                time.sleep(delay)
+                continue
+            UPSTREAM_CALLS.inc(model=model, status="ok")
+            UPSTREAM_TOKENS.inc(self._settle(response, estimated_tokens), model=model)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "queue_depth": dict(self._depth),
+                "peak_queue_depth": self._peak_depth,
+                "admitted": dict(self._admitted),
+                "avg_wait_ms": {
+                    name: round(self._wait_seconds[name] / self._admitted[name] * 1000, 3) if self._admitted[name] else 0.0
+                    for name in PRIORITY_ORDER
+                },
+                "effective_requests_per_minute": round(self._rate, 1),
+                "requests_per_minute_limit": self.requests_per_minute,
+                "tokens_per_minute_limit": self.tokens_per_minute,
+                "tokens_available": int(self._tokens),
+                "tokens_used": self._tokens_used,
+                "retries": self._retries,
+                "rate_limited": self._rate_limited,
+                "failures": self._failures,
+                "cooling_down": time.monotonic() < self._cooldown_until
+            }
+
+upstream = UpstreamScheduler(
+    requests_per_minute=settings.upstream_requests_per_minute,
+    tokens_per_minute=settings.upstream_tokens_per_minute,
+    max_retries=settings.upstream_max_retries,
+    backoff_base=settings.upstream_backoff_base,
+    backoff_max=settings.upstream_backoff_max
+)
\ No newline at end of file
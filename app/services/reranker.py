@@ -0,0 +1,117 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from app.utils.tracing import traced
+
+DEFAULT_WEIGHTS = {"dense": 0.6, "lexical": 0.2, "kg": 0.15, "diversity": 0.05}
+
+STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "with", "from", "that", "this", "what",
+    "who", "how", "why", "when", "where", "which", "does", "did", "has", "have", "its"
+}
+
+def content_terms(text: str) -> List[str]:
+    """Lowercased words of three or more characters, minus common question words."""
+    return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 2 and t not in STOPWORDS]
+
+def candidate_features(
+    question: str,
+    candidates: List[Dict[str, Any]],
+    question_entities: Iterable[str] = (),
+    chunk_entities: Optional[Dict[str, List[str]]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Per-candidate features in [0, 1], one array each:
+    - dense: the vector search similarity
+    - lexical: IDF-weighted share of question terms in the chunk (IDF over the candidates)
+    - kg: share of question entities the chunk mentions in the graph
+    - diversity: 1 / rank of the chunk within its document (by dense score)
+    """
+    n = len(candidates)
+    dense = np.array([c["similarity"] for c in candidates], dtype=np.float64)
+
+    terms = list(dict.fromkeys(content_terms(question)))
+    lexical = np.zeros(n)
+    if terms:
+        chunk_terms = [set(content_terms(c.get("text", ""))) for c in candidates]
+        present = np.array([[t in ct for t in terms] for ct in chunk_terms], dtype=np.float64)
+        idf = np.log((n + 1) / (present.sum(axis=0) + 1)) + 1
+        lexical = present @ idf / idf.sum()
+
+    entities = list(dict.fromkeys(e.lower() for e in question_entities))
+    kg = np.zeros(n)
+    if entities and chunk_entities:
+        mentioned = [{e.lower() for e in chunk_entities.get(c.get("chunk_id"), [])} for c in candidates]
+        kg = np.array([[e in m for e in entities] for m in mentioned], dtype=np.float64).mean(axis=1)
+
+    _, documents = np.unique([c["document"] for c in candidates], return_inverse=True)
+    order = np.lexsort((-dense, documents))
+    first = np.searchsorted(documents[order], documents[order], side="left")
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - first
+    diversity = 1.0 / (rank + 1)
+
+    return {"dense": dense, "lexical": lexical, "kg": kg, "diversity": diversity}
+
+def mmr_select(scores: np.ndarray, vectors: Optional[np.ndarray], k: int, mmr_lambda: float) -> List[int]:
+    """
+    Maximal marginal relevance: repeatedly take the candidate with the best
+    lambda * score - (1 - lambda) * (max cosine to anything already taken).
+    Without vectors there is no redundancy term and this is a plain top-k.
+    """
+    n = len(scores)
+    if vectors is None:
+        similarity = np.zeros((n, n))
+    else:
+        unit = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+        similarity = unit @ unit.T
+
+    selected: List[int] = []
+    redundancy = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    for _ in range(min(k, n)):
+        mmr = np.where(available, mmr_lambda * scores - (1 - mmr_lambda) * redundancy, -np.inf)
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+@traced("rerank")
+def rerank(
+    question: str,
+    candidates: List[Dict[str, Any]],
+    top_k: int,
+    question_entities: Iterable[str] = (),
+    chunk_entities: Optional[Dict[str, List[str]]] = None,
+    weights: Optional[Dict[str, float]] = None,
+    mmr_lambda: float = 0.7
+) -> List[Dict[str, Any]]:
+    """
+    Score over-fetched vector candidates with a weighted sum of
+    candidate_features and pick `top_k` of them with MMR (over the candidate
+    vectors in "values", when every candidate has one). Returned candidates
+    carry their "rerank_score".
+
+    Without `chunk_entities` (not looked up, or the lookup failed) the KG
+    feature is left out and its weight spread over the others, so scores
+    keep their scale against MMR's redundancy term.
+    """
+    if not candidates:
+        return []
+
+    features = candidate_features(question, candidates, question_entities, chunk_entities)
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    names = [name for name in DEFAULT_WEIGHTS if name != "kg" or chunk_entities is not None]
+    total = sum(weights[name] for name in names)
+    scale = sum(weights[name] for name in DEFAULT_WEIGHTS) / total if total else 1.0
+    scores = sum(weights[name] * scale * features[name] for name in names)
+
+    vectors = None
+    if all(c.get("values") is not None for c in candidates):
+        vectors = np.stack([c["values"] for c in candidates])
+
+    return [
+        {**candidates[i], "rerank_score": round(float(scores[i]), 4)}
+        for i in mmr_select(scores, vectors, top_k, mmr_lambda)
+    ]
\ No newline at end of file
@@ -2,9 +2,11 @@ import uuid
 import time
 import logging
 from typing import List, Dict, Any, Optional
+import numpy as np
 from pinecone import Pinecone, ServerlessSpec
 from app.core.config import settings
 from app.services.embedding_service import get_embeddings
+from app.utils.tracing import traced
 
 logger = logging.getLogger("rag_chatbot")
 
@@ -62,20 +64,31 @@ def upsert_chunks(chunks: List[Dict[str, Any]]) -> None:
         batch = vectors_to_upsert[i:i + batch_size]
         index.upsert(vectors=batch)
 
+@traced("vector_query")
 def query(
     question: str,
     top_k: int = 5,
-    min_similarity: float = 0.65
+    min_similarity: float = 0.65,
+    filters: Optional[Dict[str, Any]] = None,
+    embedding: Optional[np.ndarray] = None,
+    include_values: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Semantic search returning consistent chunk_ids.
+    Pass `embedding` when the question was already embedded (e.g. by the answer cache);
+    `filters` is a Pinecone metadata filter. `include_values` adds each
+    match's vector (for reranking).
     """
-    query_embedding = list(get_embeddings([question])[0])
+    if embedding is None:
+        embedding = get_embeddings([question])[0]
+    query_embedding = list(embedding)
 
     results = index.query(
         vector=query_embedding,
         top_k=top_k * 2,
-        include_metadata=True
+        include_metadata=True,
+        include_values=include_values,
+        filter=filters
     )
 
     matches = []
@@ -89,6 +102,8 @@ def query(
             "page": int(match.metadata.get("page", 0)),
             "similarity": round(match.score, 4)
         })
+        if include_values:
+            matches[-1]["values"] = np.asarray(match.values, dtype=np.float32)
 
         if len(matches) >= top_k:
             break
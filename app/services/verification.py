@@ -1,7 +1,32 @@
 import json
-from typing import List, Dict, Any
-from app.services.llm_service import client, generate_structured
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.services.llm_service import chat_completion, generate_structured
+from app.services.context_packer import format_kg_fact
+from app.services.evidence_index import EvidenceIndex, normalize
 from app.core.config import settings
+from app.utils.tracing import traced
+
+logger = logging.getLogger("rag_chatbot")
+
+BATCH_VERIFICATION_PROMPT = """
+Judge each claim against the numbered evidence passages.
+A claim is supported only if the evidence fully entails it (not just shares keywords).
+Each claim lists the passages most relevant to it; judge it against those.
+For every claim list the indices of the passages that support it.
+
+Evidence:
+{evidence}
+
+Claims:
+{claims}
+
+Return JSON with exactly one verdict per claim:
+{{"verdicts": [{{"claim": 0, "supported": true, "evidence": [0, 2]}}]}}
+"""
 
 def verify_claims_nli(answer: str, evidence_texts: List[str]) -> Dict[str, Any]:
     """
@@ -14,43 +39,203 @@ def verify_claims_nli(answer: str, evidence_texts: List[str]) -> Dict[str, Any]:
     if not claims:
         return {"score": 0.0, "details": []}
 
-    evidence_blob = "\n".join(evidence_texts)[:10000]
-    
-    verified_claims = []
-    supported_count = 0
-
-    for claim in claims:
-        is_supported = _check_entailment(claim, evidence_blob)
-        verified_claims.append({
-            "claim": claim,
-            "supported": is_supported
-        })
-        if is_supported:
-            supported_count += 1
+    verdicts = judge_claims(claims, EvidenceIndex(evidence_texts))
+    supported_count = sum(v["supported"] for v in verdicts)
             
     score = supported_count / len(claims) if claims else 0.0
     
     return {
         "support_score": score,
-        "claims": verified_claims
+        "claims": verdicts
     }
 
-def _extract_atomic_claims(text: str) -> List[str]:
+@traced("verification")
+def verify_claims(answer: str, evidence: Dict[str, Any], max_claims: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Verify an answer against hybrid evidence (document chunks + KG facts).
+    Returns the claim strings, the unsupported ones, their count, the
+    support ratio, per-claim verdicts with supporting passage indices and
+    deciding tier, and the kind ("text" / "kg") of every passage.
+    `max_claims` verifies only the leading claims (the rest are reported
+    as skipped).
+
+    "status" is "verified", or "unverified" when the claims could not be
+    extracted (upstream error, bad JSON): nothing was checked, so callers
+    must not treat the answer as supported.
+    """
+    index = evidence_index(evidence)
+    extracted = _extract_atomic_claims(answer)
+    if extracted is None:
+        return {
+            "status": "unverified",
+            "claims": [],
+            "unsupported": [],
+            "unsupported_count": 0,
+            "support_ratio": 0.0,
+            "verdicts": [],
+            "passages": len(index),
+            "passage_kinds": index.kinds,
+            "passages_judged": 0,
+            "claims_skipped": 0,
+            "tiers": {"lexical": 0, "embedding": 0, "llm": 0}
+        }
+    claims = extracted[:max_claims] if max_claims else extracted
+    verdicts = judge_claims(claims, index) if claims else []
+    unsupported = [v["claim"] for v in verdicts if not v["supported"]]
+
+    return {
+        "status": "verified",
+        "claims": claims,
+        "unsupported": unsupported,
+        "unsupported_count": len(unsupported),
+        "support_ratio": 1 - len(unsupported) / len(claims) if claims else 1.0,
+        "verdicts": verdicts,
+        "passages": len(index),
+        "passage_kinds": index.kinds,
+        "passages_judged": len({i for v in verdicts if v["tier"] == "llm" for i in v["candidates"]}),
+        "claims_skipped": len(extracted) - len(claims),
+        "tiers": {tier: sum(v["tier"] == tier for v in verdicts) for tier in ("lexical", "embedding", "llm")}
+    }
+
+def evidence_passages(evidence: Dict[str, Any]) -> List[str]:
+    """Indexable evidence: chunk texts first, then rendered KG facts."""
+    passages = [ev["text"] for ev in evidence.get("rag_evidence", []) if ev.get("text")]
+    passages.extend(format_kg_fact(fact).strip() for fact in evidence.get("kg_evidence", []))
+    return passages
+
+def evidence_index(evidence: Dict[str, Any]) -> EvidenceIndex:
+    passages = evidence_passages(evidence)
+    chunk_count = sum(1 for ev in evidence.get("rag_evidence", []) if ev.get("text"))
+    return EvidenceIndex(passages, ["text"] * chunk_count + ["kg"] * (len(passages) - chunk_count))
+
+def judge_claims(claims: List[str], index: EvidenceIndex) -> List[Dict[str, Any]]:
+    """
+    Per-claim verdicts ({"claim", "supported", "evidence", "candidates", "tier"}),
+    decided by the cheapest tier that is confident:
+
+    1. lexical: a passage states the claim verbatim (see lexical_support).
+    2. embedding: the claim is unlike every passage (unsupported). Similarity
+       never accepts a claim; a changed number or name barely moves it.
+    3. llm: the ambiguous rest is judged against its top-k passages
+       ("candidates"), in one batched call or concurrent per-claim checks.
+    """
+    if not len(index):
+        return [_verdict(claim, False, [], [], "lexical") for claim in claims]
+
+    cascade = settings.verification_cascade
+    verdicts: List[Optional[Dict[str, Any]]] = [None] * len(claims)
+    if cascade:
+        for i, claim in enumerate(claims):
+            support = lexical_support(claim, index, settings.verification_lexical_support)
+            if support:
+                verdicts[i] = _verdict(claim, True, support, support, "lexical")
+
+    pending = [i for i, v in enumerate(verdicts) if v is None]
+    if not pending:
+        return verdicts
+
+    similarity = index.similarity([claims[i] for i in pending])
+    candidates = index.top_k(similarity, settings.verification_top_k, len(pending))
+    ambiguous = []
+    for row, i in enumerate(pending):
+        if cascade and similarity is not None:
+            if similarity[row].max() < settings.verification_embedding_reject:
+                verdicts[i] = _verdict(claims[i], False, [], candidates[row], "embedding")
+                continue
+        ambiguous.append((i, candidates[row]))
+
+    if ambiguous:
+        judged = _judge_with_llm([claims[i] for i, _ in ambiguous], index.passages, [c for _, c in ambiguous])
+        for (i, _), verdict in zip(ambiguous, judged):
+            verdicts[i] = verdict
+    return verdicts
+
+def lexical_support(claim: str, index: EvidenceIndex, threshold: float) -> List[int]:
+    """
+    Passages that state the claim verbatim: every one of its words, and at
+    least `threshold` of its word shingles. Shingles alone accept a claim
+    whose last word was changed; below 1.0 a reordered claim gets through.
+    """
+    contained = index.containment(claim)
+    words = set(normalize(claim))
+    return [
+        int(i) for i in np.flatnonzero(contained >= threshold)
+        if words <= set(normalize(index.passages[i]))
+    ]
+
+def _verdict(claim: str, supported: bool, evidence: List[int], candidates: List[int], tier: str) -> Dict[str, Any]:
+    return {"claim": claim, "supported": supported, "evidence": evidence, "candidates": candidates, "tier": tier}
+
+def _judge_with_llm(claims: List[str], passages: List[str], candidates: List[List[int]]) -> List[Dict[str, Any]]:
+    if settings.verification_mode == "batched":
+        verdicts = _judge_batched(claims, passages, candidates)
+        if verdicts is not None:
+            return verdicts
+        logger.warning("Batched verification output unusable; falling back to per-claim checks")
+
+    return _judge_each(claims, passages, candidates)
+
+def _judge_each(claims: List[str], passages: List[str], candidates: List[List[int]]) -> List[Dict[str, Any]]:
+    workers = max(1, min(settings.verification_max_concurrency, len(claims)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # copy_context keeps the caller's upstream priority in the worker threads.
+        futures = [
+            pool.submit(contextvars.copy_context().run, _check_entailment, claim, "\n".join(passages[i] for i in selected))
+            for claim, selected in zip(claims, candidates)
+        ]
+        results = [f.result() for f in futures]
+
+    return [
+        _verdict(claim, supported, selected if supported else [], selected, "llm")
+        for claim, selected, supported in zip(claims, candidates, results)
+    ]
+
+@traced("verification_llm")
+def _judge_batched(claims: List[str], passages: List[str], candidates: List[List[int]]) -> Optional[List[Dict[str, Any]]]:
+    shown = sorted({i for selected in candidates for i in selected})
+    prompt = BATCH_VERIFICATION_PROMPT.format(
+        evidence="\n".join(f"[{i}] {passages[i]}" for i in shown) or "(none)",
+        claims="\n".join(
+            f"[{i}] {claim}\n    passages: {', '.join(map(str, selected)) or 'none'}"
+            for i, (claim, selected) in enumerate(zip(claims, candidates))
+        )
+    )
+    try:
+        raw = generate_structured(prompt, response_format={"type": "json_object"}, temperature=0.0)
+        by_claim = {int(v["claim"]): v for v in json.loads(raw)["verdicts"]}
+        return [
+            _verdict(
+                claim,
+                bool(by_claim[i]["supported"]),
+                sorted({int(e) for e in by_claim[i].get("evidence", []) if 0 <= int(e) < len(passages)}),
+                candidates[i],
+                "llm"
+            )
+            for i, claim in enumerate(claims)
+        ]
+    except Exception:
+        return None
+
+@traced("claim_extraction")
+def _extract_atomic_claims(text: str) -> Optional[List[str]]:
+    """The answer's atomic claims, or None when they could not be extracted."""
     prompt = f"""
     Split the following text into atomic, factual claims. 
     Return JSON: {{"claims": ["claim1", "claim2"]}}
     Text: {text}
     """
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
             model=settings.openai_model,
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"}
         )
         return json.loads(response.choices[0].message.content).get("claims", [])
-    except:
-        return []
+    except Exception as e:
+        logger.error(f"Claim extraction failed: {e}")
+        return None
 
+@traced("verification_llm")
 def _check_entailment(claim: str, evidence: str) -> bool:
     """
     Returns True if evidence supports claim.
@@ -63,11 +248,11 @@ def _check_entailment(claim: str, evidence: str) -> bool:
     Does the evidence fully support this claim? Respond with JSON: {{"supported": true/false}}
     """
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
             model=settings.openai_model,
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"}
         )
         return json.loads(response.choices[0].message.content).get("supported", False)
-    except:
+    except Exception:
         return False
\ No newline at end of file
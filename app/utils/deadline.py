@@ -0,0 +1,31 @@
+import time
+from typing import Optional
+
+class Deadline:
+    """
+    A request's time budget, created once and passed through every stage.
+    Stages ask how long they may take; whatever they leave unused goes to
+    the stages after them.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+
+    @classmethod
+    def from_ms(cls, milliseconds: Optional[int], default_seconds: float) -> "Deadline":
+        return cls(milliseconds / 1000 if milliseconds else default_seconds)
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def allows(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+    def budget(self, limit: float, reserve: float = 0.0) -> float:
+        """Time a stage may take: its own limit, capped by what is left once `reserve` is kept for later stages."""
+        return max(min(limit, self.remaining() - reserve), 0.0)
\ No newline at end of file
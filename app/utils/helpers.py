@@ -9,6 +9,10 @@ def generate_hash(text: str) -> str:
     """Generate MD5 hash for deduping."""
     return hashlib.md5(text.encode("utf-8")).hexdigest()
 
+def relation_key(source: str, relation: str, target: str) -> str:
+    """Stable id for a (source)-[relation]->(target) edge, shared by Neo4j and SQLite."""
+    return generate_hash(f"{source}\x1f{relation}\x1f{target}")
+
 def semantic_chunk_text(text: str, max_tokens: int = 800) -> List[str]:
     """
     Splits text into chunks roughly based on paragraphs.
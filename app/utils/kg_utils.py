@@ -1,6 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Hashable, Tuple
 from neo4j import Driver
 import math
+import numpy as np
 
 def format_kg_path(path: List[Dict[str, Any]]) -> str:
     """
@@ -33,12 +34,15 @@ def calculate_graph_centrality(node_name: str, driver: Driver) -> float:
     and should carry higher weight in confidence scoring.
     
     Logic:
-    1. Query Neo4j for the count of relationships connected to the node.
+    1. Read the degree precomputed by graph_analytics, falling back to a
+       live count of the relationships connected to the node.
     2. Normalize the count to a 0.0 - 1.0 score using a saturation function.
+
+    For many nodes use graph_analytics.get_entity_scores, which needs no query.
     """
     query = """
-    MATCH (n:Entity {name: $name})-[r]-()
-    RETURN count(r) as degree
+    MATCH (n:Entity {name: $name})
+    RETURN coalesce(n.degree, COUNT { (n)-[:RELATION]-() }) AS degree
     """
     
     try:
@@ -58,4 +62,102 @@ def calculate_graph_centrality(node_name: str, driver: Driver) -> float:
 
     except Exception as e:
         print(f"Error calculating centrality for node '{node_name}': {e}")
-        return 0.0
\ No newline at end of file
+        return 0.0
+
+def degree_centrality(degrees: np.ndarray) -> np.ndarray:
+    """Vectorized form of the saturation used by calculate_graph_centrality."""
+    degrees = np.asarray(degrees, dtype=float)
+    return np.round(degrees / (degrees + 5.0), 4)
+
+def find_connecting_paths(
+    sources: List[Hashable],
+    expand: Callable[[List[Hashable]], Dict[Hashable, List[Tuple[Hashable, Dict[str, Any]]]]],
+    max_hops: int = 4,
+    max_paths: int = 5
+) -> List[Dict[str, Any]]:
+    """
+    Shortest paths between every unordered pair of `sources`, found with
+    one multi-source BFS whose frontier is shared by all sources.
+
+    `expand` receives the whole frontier of a level and returns the
+    adjacency of those nodes as {node: [(neighbour, relation), ...]}, so a
+    graph backend answers each BFS level with one batched lookup and no
+    node is expanded twice. Every node keeps a (distance, parent, relation)
+    label per source that reached it; a pair is connected as soon as one
+    node carries both labels. Expanding ceil(max_hops / 2) levels is enough
+    because every path of length <= max_hops has a midpoint within that
+    distance of both ends.
+    """
+    sources = list(dict.fromkeys(s for s in sources if s not in (None, "")))
+    if len(sources) < 2:
+        return []
+
+    order = {src: i for i, src in enumerate(sources)}
+    labels: Dict[Hashable, Dict[Hashable, Tuple[int, Any, Any]]] = {
+        src: {src: (0, None, None)} for src in sources
+    }
+    best: Dict[Tuple[Hashable, Hashable], Tuple[int, Hashable]] = {}
+    adjacency: Dict[Hashable, List[Tuple[Hashable, Dict[str, Any]]]] = {}
+    total_pairs = len(sources) * (len(sources) - 1) // 2
+
+    frontier = list(sources)
+    for level in range(math.ceil(max_hops / 2)):
+        unexpanded = [node for node in frontier if node not in adjacency]
+        if unexpanded:
+            fetched = expand(unexpanded)
+            for node in unexpanded:
+                adjacency[node] = fetched.get(node, [])
+
+        next_frontier = {}
+        for node in frontier:
+            reached = [src for src, label in labels[node].items() if label[0] == level]
+            for neighbour, relation in adjacency[node]:
+                node_labels = labels.setdefault(neighbour, {})
+                for src in reached:
+                    if src in node_labels:
+                        continue
+                    node_labels[src] = (level + 1, node, relation)
+                    next_frontier[neighbour] = True
+
+                    for other, (other_dist, _, _) in node_labels.items():
+                        if other == src:
+                            continue
+                        pair = (src, other) if order[src] < order[other] else (other, src)
+                        hops = level + 1 + other_dist
+                        if hops <= max_hops and (pair not in best or hops < best[pair][0]):
+                            best[pair] = (hops, neighbour)
+
+        frontier = list(next_frontier)
+        # Paths discovered in later levels are at least level + 2 hops long.
+        settled = all(hops <= level + 2 for hops, _ in best.values())
+        if not frontier or (len(best) == total_pairs and settled):
+            break
+
+    paths = []
+    for (source, target), (hops, meet) in best.items():
+        source_relations, source_nodes = _trace(labels, meet, source)
+        target_relations, target_nodes = _trace(labels, meet, target)
+        paths.append({
+            "source": source,
+            "target": target,
+            "path": source_relations[::-1] + target_relations,
+            "nodes": source_nodes[::-1] + target_nodes[1:],
+            "hops": hops
+        })
+
+    paths.sort(key=lambda p: (p["hops"], order[p["source"]], order[p["target"]]))
+    return paths[:max_paths]
+
+def _trace(
+    labels: Dict[Hashable, Dict[Hashable, Tuple[int, Any, Any]]],
+    node: Hashable,
+    source: Hashable
+) -> Tuple[List[Dict[str, Any]], List[Hashable]]:
+    """Relations and nodes from `node` back to `source` following BFS parent pointers."""
+    relations, nodes = [], [node]
+    while node != source:
+        _, parent, relation = labels[node][source]
+        relations.append(relation)
+        nodes.append(parent)
+        node = parent
+    return relations, nodes
\ No newline at end of file
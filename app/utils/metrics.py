@@ -0,0 +1,138 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Seconds; covers a local cache hit up to a full request deadline.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    """Monotonic count per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, in the Prometheus layout."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            # [count per bucket ..., +Inf count, sum]
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(bound)
+                    lines.append(f"{self.name}_bucket{_labels(names, key + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {round(series[-1], 6)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Counters and histograms recorded as requests run, plus `stats()` sources
+    (caches, pools, the upstream scheduler) read at scrape time, all
+    rendered in the Prometheus text exposition format. Hand-rolled so the
+    endpoint needs no extra dependency.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+        self._stats: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def _register(self, metric: Any) -> Any:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help, labelnames, **kwargs))
+
+    def add_stats(self, name: str, source: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Export a component's stats() as gauges named <prefix>_<name>_<key>.
+        Numbers and booleans become one gauge each; a dict of numbers
+        (e.g. per priority class) becomes one gauge labelled by key.
+        """
+        with self._lock:
+            self._stats.append((f"{self.prefix}_{name}", source))
+
+    def _render_stats(self, name: str, source: Callable[[], Dict[str, Any]]) -> List[str]:
+        try:
+            stats = source()
+        except Exception as e:
+            return [f"# {name} unavailable: {_escape(e)}"]
+
+        lines = []
+        for key, value in stats.items():
+            metric = f"{name}_{key}"
+            if isinstance(value, (bool, int, float)):
+                lines += [f"# TYPE {metric} gauge", f"{metric} {_number(value)}"]
+            elif isinstance(value, dict) and all(isinstance(v, (bool, int, float)) for v in value.values()):
+                lines.append(f"# TYPE {metric} gauge")
+                lines += [f"{metric}{_labels(['key'], [k])} {_number(v)}" for k, v in value.items()]
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, stats = list(self._metrics.values()), list(self._stats)
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        for name, source in stats:
+            lines += self._render_stats(name, source)
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry("rag")
\ No newline at end of file
@@ -0,0 +1,86 @@
+import json
+import asyncio
+import hashlib
+import threading
+from functools import partial
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+def call_key(*parts: Any) -> str:
+    """Stable key for an upstream call: model, prompt and parameters."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: the first caller for a key runs the
+    function, everyone arriving while it runs waits for and shares the same
+    result (or exception). Threads and asyncio tasks share one in-flight
+    table, so a request on the event loop can join a call made by a worker
+    thread and vice versa. Nothing is cached once the call returns.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self._calls += 1
+            return future, True
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _lead(self, future: Future, key: str, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any]) -> T:
+        """Run the call for everyone waiting on `key` and publish its outcome."""
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._finish(key)
+        future.set_result(result)
+        return result
+
+    def do(self, key: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        return self._lead(future, key, fn, args, kwargs)
+
+    async def do_async(self, key: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Like do(), for callers on the event loop; the blocking call runs in
+        the default executor. A cancelled leader only stops waiting: the
+        call is shielded, runs to completion and publishes its real result
+        (or exception) to the followers.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        loop = asyncio.get_running_loop()
+        return await asyncio.shield(loop.run_in_executor(None, partial(self._lead, future, key, fn, args, kwargs)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requested = self._calls + self._coalesced
+            return {
+                "upstream_calls": self._calls,
+                "coalesced_calls": self._coalesced,
+                "in_flight": len(self._inflight),
+                "coalesced_ratio": round(self._coalesced / requested, 4) if requested else 0.0
+            }
\ No newline at end of file
@@ -0,0 +1,111 @@
+import time
+import inspect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+from app.utils.metrics import metrics
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+SPAN_SECONDS = metrics.histogram(
+    "span_seconds", "Wall time of instrumented service calls", ("span", "status")
+)
+
+class Trace:
+    """
+    The spans recorded while one request runs. Worker threads that copy the
+    request's context (stage pool, verification, batch workers) add to the
+    same trace, so concurrent spans overlap and may sum to more than the
+    total.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._spans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, started: float, seconds: float, status: str) -> None:
+        with self._lock:
+            self._spans.append({
+                "name": name,
+                "start_ms": round((started - self.started) * 1000, 1),
+                "duration_ms": round(seconds * 1000, 1),
+                "status": status
+            })
+
+    def summary(self) -> Dict[str, Any]:
+        """Spans in start order, plus count and total time per span name."""
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s["start_ms"])
+        by_span: Dict[str, Dict[str, float]] = {}
+        for s in spans:
+            totals = by_span.setdefault(s["name"], {"count": 0, "total_ms": 0.0})
+            totals["count"] += 1
+            totals["total_ms"] = round(totals["total_ms"] + s["duration_ms"], 1)
+        return {
+            "total_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "spans": spans,
+            "by_span": by_span
+        }
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+@contextmanager
+def collect_trace(enabled: bool = True) -> Iterator[Optional[Trace]]:
+    """Record the spans of the enclosed code (same thread, or threads copying its context)."""
+    if not enabled:
+        yield None
+        return
+    trace = Trace()
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        try:
+            _trace.reset(token)
+        except ValueError:
+            # A streaming generator finalised from another context (e.g.
+            # garbage-collected after a client disconnect); nothing to undo there.
+            pass
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block into the span histogram and the current trace, if any."""
+    started = time.monotonic()
+    status = "ok"
+    try:
+        yield
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        SPAN_SECONDS.observe(seconds, span=name, status=status)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(name, started, seconds, status)
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Decorator form of span(). For a generator function the span covers
+    the whole iteration (e.g. a streamed completion), not just the call.
+    """
+    def decorate(fn: F) -> F:
+        if inspect.isgeneratorfunction(fn):
+            @wraps(fn)
+            def generator(*args, **kwargs):
+                with span(name):
+                    return (yield from fn(*args, **kwargs))
+            return generator
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
\ No newline at end of file
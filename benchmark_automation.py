@@ -2,6 +2,7 @@ import json
 import time
 from app.services.rag_pipeline import run_rag_pipeline
 from app.services.kg_store import close as close_neo4j
+from app.services.rate_limiter import upstream_priority, EVALUATION
 
 def calculate_f1(predicted: str, truth: str) -> float:
     pred_tokens = set(predicted.lower().split())
@@ -25,6 +26,7 @@ def run_ablation_study(dataset_file: str):
         print(f"\n👉 Running Mode: {mode.upper()}...")
         results = []
         total_f1 = 0
+        total_latency = 0.0
         
         for item in dataset:
             q = item['question']
@@ -35,30 +37,35 @@ def run_ablation_study(dataset_file: str):
                 
                 f1 = calculate_f1(response.get("answer", ""), truth)
                 total_f1 += f1
+                latency = response.get("latency_ms", {})
+                total_latency += latency.get("total", 0.0)
                 
                 results.append({
                     "question": q,
                     "ground_truth": truth,
                     "predicted": response.get("answer", ""),
                     "f1_score": round(f1, 4),
-                    "confidence": response.get("confidence", 0)
+                    "confidence": response.get("confidence", 0),
+                    "latency_ms": latency
                 })
             except Exception as e:
                 print(f"Error on {q}: {e}")
 
         avg_f1 = total_f1 / len(dataset)
+        avg_latency = total_latency / len(results) if results else 0.0
         output_filename = f"results_{mode}.json"
         
         final_data = {
             "mode": mode,
             "average_f1": round(avg_f1, 4),
+            "average_latency_ms": round(avg_latency, 1),
             "details": results
         }
         
         with open(output_filename, "w") as f:
             json.dump(final_data, f, indent=2)
             
-        print(f"✅ Finished {mode}. Avg F1: {avg_f1:.4f}. Saved to {output_filename}")
+        print(f"✅ Finished {mode}. Avg F1: {avg_f1:.4f}. Avg latency: {avg_latency:.0f} ms. Saved to {output_filename}")
 
     close_neo4j()
 
@@ -67,4 +74,5 @@ if __name__ == "__main__":
     if not os.path.exists("test_dataset.json"):
         print("❌ Create 'test_dataset.json' first with 5-10 QA pairs!")
     else:
-        run_ablation_study("test_dataset.json")
\ No newline at end of file
+        with upstream_priority(EVALUATION):
+            run_ablation_study("test_dataset.json")
\ No newline at end of file
@@ -0,0 +1,121 @@
+import time
+import argparse
+import numpy as np
+from app.utils.kg_utils import find_connecting_paths
+
+RELATION = {"type": "RELATED_TO", "description": "synthetic edge"}
+
+def build_synthetic_graph(num_edges: int, avg_degree: int = 16, seed: int = 7):
+    """
+    Random undirected graph stored as CSR arrays (offsets, neighbours).
+    """
+    rng = np.random.default_rng(seed)
+    num_nodes = max(2 * num_edges // avg_degree, 10)
+
+    src = rng.integers(0, num_nodes, size=num_edges)
+    dst = rng.integers(0, num_nodes, size=num_edges)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+
+    heads = np.concatenate([src, dst])
+    tails = np.concatenate([dst, src])
+    order = np.argsort(heads, kind="stable")
+    heads, tails = heads[order], tails[order]
+
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.add.at(offsets, heads + 1, 1)
+    np.cumsum(offsets, out=offsets)
+    return num_nodes, offsets, tails
+
+def make_expander(offsets: np.ndarray, neighbours: np.ndarray, counter: dict):
+    def expand(frontier):
+        counter["levels"] += 1
+        counter["nodes"] += len(frontier)
+        return {
+            node: [(int(n), RELATION) for n in neighbours[offsets[node]:offsets[node + 1]]]
+            for node in frontier
+        }
+    return expand
+
+def pairwise_search(entities, expand, max_hops: int = 4, max_paths: int = 5):
+    """
+    Baseline mirroring the old query: one search per ordered pair.
+    """
+    paths = []
+    for a in entities:
+        for b in entities:
+            if a != b:
+                paths.extend(find_connecting_paths([a, b], expand, max_hops=max_hops, max_paths=1))
+    paths.sort(key=lambda p: p["hops"])
+    return paths[:max_paths]
+
+def time_search(search, entities, expand, counter: dict, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        counter["levels"] = counter["nodes"] = 0
+        start = time.perf_counter()
+        search(entities, expand)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), float(np.max(timings))
+
+def run_benchmark(sizes, num_entities: int, repeats: int, skip_baseline: bool):
+    print(f"🔬 CLAIM PATH SEARCH BENCHMARK ({num_entities} entities, max 4 hops)")
+    rng = np.random.default_rng(11)
+
+    for num_edges in sizes:
+        num_nodes, offsets, neighbours = build_synthetic_graph(num_edges)
+        counter = {"levels": 0, "nodes": 0}
+        expand = make_expander(offsets, neighbours, counter)
+        entities = [int(n) for n in rng.choice(num_nodes, size=num_entities, replace=False)]
+
+        found = len(find_connecting_paths(entities, expand, max_paths=100))
+        median_ms, max_ms = time_search(
+            lambda e, x: find_connecting_paths(e, x), entities, expand, counter, repeats
+        )
+        print(f"\n👉 {num_edges:,} edges / {num_nodes:,} nodes ({found} connected pairs)")
+        print(f"   multi-source BFS: median {median_ms:.2f} ms | max {max_ms:.2f} ms "
+              f"| {counter['levels']} batched lookups, {counter['nodes']} nodes expanded")
+
+        if not skip_baseline:
+            median_ms, max_ms = time_search(pairwise_search, entities, expand, counter, repeats)
+            print(f"   per-pair search:  median {median_ms:.2f} ms | max {max_ms:.2f} ms "
+                  f"| {counter['levels']} batched lookups, {counter['nodes']} nodes expanded")
+
+def run_neo4j_benchmark(num_entities: int, repeats: int):
+    """
+    The same comparison against the configured Neo4j graph, I/O included:
+    the shared BFS (one query per level) versus one shortestPath per pair.
+    The graph cache is cleared before every search.
+    """
+    from app.database.neo4j_connection import graph_db
+    from app.services.kg_cache import graph_cache
+    from app.services.kg_store import get_evidence_for_claim
+
+    entities = [r["name"] for r in graph_db.read(
+        "MATCH (e:Entity)-[:RELATION]-() WITH DISTINCT e ORDER BY rand() LIMIT $limit RETURN e.name AS name",
+        limit=num_entities
+    )]
+    print(f"🔬 CLAIM PATH SEARCH BENCHMARK (Neo4j, {len(entities)} entities, max 4 hops)")
+
+    for strategy in ("bfs", "cypher"):
+        timings, found = [], 0
+        for _ in range(repeats):
+            graph_cache.clear()
+            start = time.perf_counter()
+            found = len(get_evidence_for_claim(entities, max_paths=100, strategy=strategy))
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"   {strategy:>6}: median {np.median(timings):.2f} ms | max {np.max(timings):.2f} ms | {found} paths")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark KG claim-path search on synthetic graphs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--entities", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--skip-baseline", action="store_true")
+    parser.add_argument("--neo4j", action="store_true", help="search the configured graph instead of synthetic ones")
+    args = parser.parse_args()
+
+    if args.neo4j:
+        run_neo4j_benchmark(args.entities, args.repeats)
+    else:
+        run_benchmark(args.sizes, args.entities, args.repeats, args.skip_baseline)
\ No newline at end of file
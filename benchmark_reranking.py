@@ -0,0 +1,178 @@
+import time
+import argparse
+import numpy as np
+from app.services.reranker import rerank, DEFAULT_WEIGHTS
+
+FILLER = [f"filler{i}" for i in range(400)]
+
+def build_corpus(num_topics: int, docs_per_topic: int, chunks_per_doc: int, dim: int, seed: int = 7):
+    """
+    Synthetic corpus where relevance is finer-grained than topic: each chunk
+    covers one facet (an entity plus two keywords) of its document's topic.
+    Chunk vectors sit near the topic centroid with only a weak facet
+    direction, so dense similarity alone mixes facets. About a fifth of the
+    chunks are near-duplicates of the previous chunk in the same document.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((num_topics, dim))
+    chunks = []
+
+    for topic in range(num_topics):
+        entities = [f"Entity{topic}x{i}" for i in range(5)]
+        keywords = [f"term{topic}x{i}" for i in range(8)]
+        facets = [(e, (keywords[2 * j], keywords[2 * j + 1])) for e in entities for j in range(4)]
+        facet_dirs = rng.standard_normal((len(facets), dim))
+
+        for d in range(docs_per_topic):
+            document = f"topic{topic}_doc{d}.pdf"
+            for c in range(chunks_per_doc):
+                if chunks and chunks[-1]["document"] == document and rng.random() < 0.2:
+                    previous = chunks[-1]
+                    chunks.append({
+                        **previous,
+                        "chunk_id": f"{document}:{c}",
+                        "vector": previous["vector"] + 0.02 * rng.standard_normal(dim),
+                        "duplicate": True,
+                        "origin": previous["origin"]
+                    })
+                    continue
+
+                f = int(rng.integers(len(facets)))
+                entity, (kw1, kw2) = facets[f]
+                words = list(rng.choice(FILLER, size=40)) + [kw1, kw2] + list(rng.choice(keywords, size=2))
+                if rng.random() < 0.7:
+                    words.append(entity)
+                rng.shuffle(words)
+                chunks.append({
+                    "chunk_id": f"{document}:{c}",
+                    "document": document,
+                    "page": c // 4 + 1,
+                    "text": " ".join(words),
+                    "vector": centroids[topic] + 0.35 * facet_dirs[f] + 0.6 * rng.standard_normal(dim),
+                    "topic": topic,
+                    "facet": (topic, f),
+                    "entities": [entity],
+                    "duplicate": False,
+                    "origin": f"{document}:{c}"
+                })
+    return chunks, centroids
+
+def make_queries(chunks, centroids, num_queries: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    originals = [c for c in chunks if not c["duplicate"]]
+    queries = []
+    for _ in range(num_queries):
+        target = originals[int(rng.integers(len(originals)))]
+        entity = target["entities"][0]
+        keywords = [w for w in target["text"].split() if w.startswith("term")][:2]
+        vector = centroids[target["topic"]] + 0.4 * (target["vector"] - centroids[target["topic"]])
+        queries.append({
+            "question": f"What does {entity} say about {keywords[0]} and {keywords[1]}?",
+            "vector": vector + 0.5 * rng.standard_normal(len(vector)),
+            "facet": target["facet"],
+            "entities": [entity]
+        })
+    return queries
+
+def vector_search(query, matrix, chunks, num_candidates: int):
+    """Stand-in for the Pinecone query: cosine top-N with vectors included."""
+    q = query["vector"] / np.linalg.norm(query["vector"])
+    scores = matrix @ q
+    top = np.argsort(-scores)[:num_candidates]
+    return [
+        {
+            "chunk_id": chunks[i]["chunk_id"],
+            "document": chunks[i]["document"],
+            "page": chunks[i]["page"],
+            "text": chunks[i]["text"],
+            "similarity": round(float(scores[i]), 4),
+            "values": chunks[i]["vector"].astype(np.float32),
+            "facet": chunks[i]["facet"],
+            "origin": chunks[i]["origin"]
+        }
+        for i in top
+    ]
+
+def quality(selected, facet, total_relevant: int, k: int):
+    """A near-duplicate of a chunk already selected adds nothing, so it is not a hit."""
+    seen, hits = set(), []
+    for c in selected[:k]:
+        hits.append(c["facet"] == facet and c["origin"] not in seen)
+        seen.add(c["origin"])
+    gains = np.array(hits, dtype=float) / np.log2(np.arange(2, len(hits) + 2))
+    ideal = (1 / np.log2(np.arange(2, min(total_relevant, k) + 2))).sum()
+    return {
+        "precision": sum(hits) / k,
+        "recall": sum(hits) / max(total_relevant, 1),
+        "ndcg": gains.sum() / ideal if ideal else 0.0,
+        "documents": len({c["document"] for c in selected[:k]}),
+        "duplicates": k - len(seen)
+    }
+
+def run_quality(chunks, queries, num_candidates: int, ks):
+    matrix = np.stack([c["vector"] for c in chunks])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    chunk_entities = {c["chunk_id"]: c["entities"] for c in chunks}
+    relevant = {}
+    for c in chunks:
+        if not c["duplicate"]:
+            relevant[c["facet"]] = relevant.get(c["facet"], 0) + 1
+
+    no_kg = {**DEFAULT_WEIGHTS, "kg": 0.0}
+    strategies = {
+        "dense top-k (baseline)": lambda q, cands, k: cands[:k],
+        "rerank, no KG (rag_only)": lambda q, cands, k: rerank(q["question"], cands, k, weights=no_kg),
+        "rerank + KG + MMR (hybrid)": lambda q, cands, k: rerank(
+            q["question"], cands, k, question_entities=q["entities"], chunk_entities=chunk_entities
+        )
+    }
+
+    print(f"\n👉 Quality over {len(queries)} queries, {num_candidates} candidates each")
+    for k in ks:
+        print(f"   k = {k}")
+        for name, strategy in strategies.items():
+            totals = {}
+            for q in queries:
+                candidates = vector_search(q, matrix, chunks, num_candidates)
+                scores = quality(strategy(q, candidates, k), q["facet"], relevant[q["facet"]], k)
+                for metric, value in scores.items():
+                    totals[metric] = totals.get(metric, 0.0) + value
+            avg = {metric: value / len(queries) for metric, value in totals.items()}
+            print(f"     {name:<28} P@k {avg['precision']:.3f} | R@k {avg['recall']:.3f} | nDCG {avg['ndcg']:.3f} "
+                  f"| docs {avg['documents']:.2f} | near-duplicates {avg['duplicates']:.2f}")
+
+def run_latency(chunks, queries, sizes, top_k: int, repeats: int):
+    matrix = np.stack([c["vector"] for c in chunks])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    chunk_entities = {c["chunk_id"]: c["entities"] for c in chunks}
+
+    print(f"\n👉 Rerank latency (top_k = {top_k}, features + MMR, {repeats} queries per size)")
+    for size in sizes:
+        timings = []
+        for q in queries[:repeats]:
+            candidates = vector_search(q, matrix, chunks, size)
+            start = time.perf_counter()
+            rerank(q["question"], candidates, top_k, question_entities=q["entities"], chunk_entities=chunk_entities)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"   {size:>4} candidates: median {np.median(timings):.3f} ms | p95 {np.percentile(timings, 95):.3f} ms")
+
+def run_benchmark(num_topics: int, num_queries: int, num_candidates: int, ks, sizes, dim: int):
+    print(f"🔬 RERANKING BENCHMARK ({num_topics} topics, dim {dim})")
+    chunks, centroids = build_corpus(num_topics, docs_per_topic=4, chunks_per_doc=20, dim=dim)
+    queries = make_queries(chunks, centroids, num_queries)
+    print(f"   {len(chunks)} chunks, {sum(c['duplicate'] for c in chunks)} near-duplicates")
+
+    run_quality(chunks, queries, num_candidates, ks)
+    run_latency(chunks, queries, sizes, top_k=max(ks), repeats=min(num_queries, 100))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark candidate reranking (quality and latency) on a synthetic corpus")
+    parser.add_argument("--topics", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    run_benchmark(args.topics, args.queries, args.candidates, args.k, args.sizes, args.dim)
\ No newline at end of file
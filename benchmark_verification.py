@@ -0,0 +1,128 @@
+import random
+import argparse
+from typing import Dict, List, Tuple
+import numpy as np
+from app.services.evidence_index import EvidenceIndex
+from app.services.verification import lexical_support
+
+ORGS = ["Northwind", "Contoso", "Fabrikam", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay", "Wayne Enterprises", "Stark Industries"]
+CITIES = ["Berlin", "Lisbon", "Toronto", "Osaka", "Nairobi", "Lima", "Oslo", "Austin"]
+MONTHS = ["January", "March", "May", "July", "September", "November"]
+
+def build_passage(rng: random.Random) -> Dict[str, str]:
+    """One evidence passage of three sentences, and the facts it states."""
+    a, b = rng.sample(ORGS, 2)
+    facts = {
+        "a": a, "b": b,
+        "year": str(rng.randint(2005, 2023)),
+        "amount": str(rng.choice([12, 40, 75, 120, 300, 950])),
+        "month": rng.choice(MONTHS),
+        "city": rng.choice(CITIES),
+        "staff": str(rng.choice([80, 150, 400, 1200]))
+    }
+    negated = rng.random() < 0.3
+    verb = "did not acquire" if negated else "acquired"
+    facts["verb"] = verb
+    facts["sentences"] = [
+        f"{a} {verb} {b} in {facts['year']} for {facts['amount']} million dollars after the board reviewed the deal in {facts['month']}.",
+        f"The combined company is headquartered in {facts['city']} and employs {facts['staff']} people across its regional offices.",
+        f"Analysts said the decision reflected the strategy the management team had described to investors earlier that year."
+    ]
+    facts["text"] = " ".join(facts["sentences"])
+    return facts
+
+def claims_for(facts: Dict[str, str], distractors: List[Dict[str, str]], rng: random.Random) -> List[Tuple[str, bool, str]]:
+    """
+    (claim, truly supported, kind): faithful restatements and single-fact
+    perturbations. Replacement values are never ones a distractor passage
+    uses, so a perturbed claim is stated nowhere in the evidence.
+    """
+    first, second = facts["sentences"][0], facts["sentences"][1]
+    used = {v for d in distractors for v in (d["a"], d["b"], d["city"], d["month"])}
+    other_org = rng.choice([o for o in ORGS if o not in (facts["a"], facts["b"]) and o not in used] or ["Acme"])
+    other_city = rng.choice([c for c in CITIES if c != facts["city"] and c not in used] or ["Quito"])
+    other_month = rng.choice([m for m in MONTHS if m != facts["month"] and m not in used] or ["December"])
+    flipped = "acquired" if facts["verb"] == "did not acquire" else "did not acquire"
+    claims = [
+        (first, True, "verbatim"),
+        (second, True, "verbatim"),
+        (first.split(" after ")[0] + ".", True, "prefix"),
+        (second.replace("across its regional offices", "").strip() + ".", True, "prefix"),
+        (first.replace(facts["year"], str(int(facts["year"]) + 2)), False, "number"),
+        (first.replace(f"for {facts['amount']} million", f"for {int(facts['amount']) * 2} million"), False, "number"),
+        (second.replace(facts["staff"], str(int(facts["staff"]) + 50)), False, "number"),
+        (first.replace(facts["month"], other_month), False, "last_word"),
+        (first.replace(facts["b"], other_org), False, "entity"),
+        (second.replace(facts["city"], other_city), False, "entity"),
+        (first.replace(facts["verb"], flipped), False, "negation"),
+        (f"{facts['b']} {facts['verb']} {facts['a']}" + first.split(facts["b"], 1)[1], False, "role_swap"),
+        (first.replace("reviewed", "rejected"), False, "predicate"),
+        # Values and words that do occur in the passage, just elsewhere
+        (second.replace(f"employs {facts['staff']}", f"employs {facts['amount']}"), False, "reused_value"),
+        (f"{facts['b']} {facts['verb']} {facts['a']}" + first.split(facts["b"], 1)[1] + " " + second, False, "role_swap_long")
+    ]
+    return claims
+
+def build_dataset(num_passages: int, seed: int = 5):
+    rng = random.Random(seed)
+    dataset = []
+    for _ in range(num_passages):
+        facts = build_passage(rng)
+        distractors = [build_passage(rng) for _ in range(2)]
+        passages = [facts["text"]] + [d["text"] for d in distractors]
+        for claim, supported, kind in claims_for(facts, distractors, rng):
+            dataset.append({"passages": passages, "claim": claim, "supported": supported, "kind": kind})
+    return dataset
+
+def report(name: str, accepted: List[bool], dataset) -> None:
+    truth = np.array([d["supported"] for d in dataset])
+    accepted = np.array(accepted)
+    tp = int((accepted & truth).sum())
+    fp = int((accepted & ~truth).sum())
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    coverage = tp / truth.sum() if truth.sum() else 0.0
+    print(f"   {name:<36} accepts {accepted.sum():>5} | precision {precision:.4f} | "
+          f"supported claims settled {coverage:.1%} | false accepts {fp}")
+    kinds = sorted({d["kind"] for d in dataset if not d["supported"]})
+    leaks = {k: int(sum(a for a, d in zip(accepted, dataset) if d["kind"] == k)) for k in kinds}
+    print(f"   {'':<36} false accepts by perturbation: {leaks}")
+
+def run_lexical(dataset, thresholds: List[float]) -> None:
+    print(f"\n👉 Lexical tier over {len(dataset)} claims ({sum(d['supported'] for d in dataset)} supported)")
+    for threshold in thresholds:
+        accepted = [
+            EvidenceIndex(d["passages"]).containment(d["claim"]).max() >= threshold
+            for d in dataset
+        ]
+        report(f"containment >= {threshold} (alone)", accepted, dataset)
+    for threshold in thresholds:
+        accepted = [bool(lexical_support(d["claim"], EvidenceIndex(d["passages"]), threshold)) for d in dataset]
+        report(f"lexical_support @ {threshold}", accepted, dataset)
+
+def run_embedding(dataset, thresholds: List[float]) -> None:
+    """
+    Reject-below precision of the embedding tier. Needs the real embedding
+    model; the local stand-in's vectors are hash-based and say nothing.
+    """
+    print(f"\n👉 Embedding tier (claims rejected below the best cosine to any passage)")
+    best = np.array([EvidenceIndex(d["passages"]).similarity([d["claim"]]).max() for d in dataset])
+    truth = np.array([d["supported"] for d in dataset])
+    for threshold in thresholds:
+        reject = best < threshold
+        precision = (reject & ~truth).sum() / reject.sum() if reject.sum() else 1.0
+        print(f"   reject < {threshold:.2f}: rejects {reject.sum():>5} | precision {precision:.4f} | "
+              f"supported claims rejected {(reject & truth).sum()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precision of the local verification tiers on adversarial claims")
+    parser.add_argument("--passages", type=int, default=300)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, 1.0])
+    parser.add_argument("--embeddings", action="store_true", help="Also measure the embedding tier (calls the embedding API)")
+    parser.add_argument("--embedding-thresholds", type=float, nargs="+", default=[0.15, 0.25, 0.35])
+    args = parser.parse_args()
+
+    print("🔬 VERIFICATION TIER BENCHMARK")
+    dataset = build_dataset(args.passages)
+    run_lexical(dataset, args.thresholds)
+    if args.embeddings:
+        run_embedding(dataset, args.embedding_thresholds)
\ No newline at end of file
@@ -6,6 +6,7 @@ from sklearn.metrics.pairwise import cosine_similarity
 from app.services.rag_pipeline import run_rag_pipeline
 from app.services.embedding_service import get_embeddings
 from app.services.kg_store import close as close_neo4j
+from app.services.rate_limiter import upstream_priority, EVALUATION
 
 
 def calculate_f1(predicted: str, truth: str) -> float:
@@ -120,5 +121,6 @@ if __name__ == "__main__":
     if not os.path.exists("test_dataset.json"):
         print("❌ Please create 'test_dataset.json' first.")
     else:
-        run_evaluation("test_dataset.json")
+        with upstream_priority(EVALUATION):
+            run_evaluation("test_dataset.json")
         close_neo4j()
\ No newline at end of file
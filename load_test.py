@@ -0,0 +1,122 @@
+"""
+Closed-loop load test for the chat endpoints: N concurrent clients each send
+requests back to back for a fixed time, for every N in --clients. Prints
+throughput, latency percentiles, 429s (backpressure) and errors per level,
+so throughput scaling on a single worker is visible directly.
+
+    python local_llm_server.py --latency-ms 300 &
+    LLM_PROVIDER=local uvicorn app.main:app --workers 1 &
+    python load_test.py --clients 1 2 4 8 16 32 64 --duration 20
+
+An uncached question makes about three upstream calls, so past the
+initial burst UPSTREAM_REQUESTS_PER_MINUTE bounds throughput (500/min is
+under 3 questions/s). Raise it to measure the app rather than the budget.
+"""
+import time
+import asyncio
+import itertools
+import argparse
+from typing import Any, Dict, List
+import numpy as np
+import httpx
+
+QUESTIONS = [
+    "What are the main findings of the report?",
+    "Who is responsible for approving the policy?",
+    "How does the document define compliance?",
+    "What risks are mentioned for data retention?",
+    "Which procedures apply to incident reporting?"
+]
+
+_sequence = itertools.count()
+
+async def client_loop(
+    http: httpx.AsyncClient,
+    url: str,
+    payload: Dict[str, Any],
+    unique: bool,
+    stop: float,
+    results: Dict[str, List]
+):
+    i = 0
+    while time.perf_counter() < stop:
+        question = QUESTIONS[i % len(QUESTIONS)]
+        body = {**payload, "question": f"{question} (#{next(_sequence)})" if unique else question}
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await http.post(url, json=body)
+        except httpx.HTTPError:
+            results["errors"].append(time.perf_counter() - start)
+            continue
+        elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            results["ok"].append(elapsed)
+        elif response.status_code == 429:
+            results["rejected"].append(elapsed)
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+        else:
+            results["errors"].append(elapsed)
+
+async def run_level(
+    base_url: str,
+    endpoint: str,
+    clients: int,
+    duration: float,
+    payload: Dict[str, Any],
+    unique: bool
+) -> Dict[str, Any]:
+    results: Dict[str, List] = {"ok": [], "rejected": [], "errors": []}
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as http:
+        stop = time.perf_counter() + duration
+        await asyncio.gather(*(client_loop(http, endpoint, payload, unique, stop, results) for _ in range(clients)))
+
+    latencies = np.array(results["ok"]) * 1000
+    return {
+        "clients": clients,
+        "throughput": len(results["ok"]) / duration,
+        "p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p95": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+        "ok": len(results["ok"]),
+        "rejected": len(results["rejected"]),
+        "errors": len(results["errors"])
+    }
+
+async def run_load_test(
+    base_url: str,
+    endpoint: str,
+    levels: List[int],
+    duration: float,
+    payload: Dict[str, Any],
+    unique: bool
+):
+    print(f"🔬 LOAD TEST {base_url}{endpoint} ({duration:.0f}s per level)")
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as http:
+        before = (await http.get("/server/concurrency/stats")).json()
+
+    baseline = None
+    for clients in levels:
+        r = await run_level(base_url, endpoint, clients, duration, payload, unique)
+        baseline = baseline or r["throughput"] or None
+        scaling = f"x{r['throughput'] / baseline:.1f}" if baseline else "-"
+        print(f"   {clients:>4} clients: {r['throughput']:7.2f} req/s ({scaling}) | p50 {r['p50']:8.1f} ms "
+              f"| p95 {r['p95']:8.1f} ms | ok {r['ok']} | 429 {r['rejected']} | errors {r['errors']}")
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as http:
+        after = (await http.get("/server/concurrency/stats")).json()
+    print(f"\n👉 chat slots: peak {after['chat']['peak_active']}/{after['chat']['max_concurrent']} active, "
+          f"{after['chat']['rejected'] - before['chat']['rejected']} rejected during the run")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-client load test for /chat/ask")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/chat/ask")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per concurrency level")
+    parser.add_argument("--mode", default="hybrid")
+    parser.add_argument("--unique", action="store_true", help="Make every question distinct (defeats the answer cache)")
+    args = parser.parse_args()
+
+    payload = {"mode": args.mode, "session_id": 0}
+    asyncio.run(run_load_test(args.url, args.endpoint, args.clients, args.duration, payload, args.unique))
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Deterministic stand-in for the OpenAI HTTP API, for load tests, profiling
+and benchmarks without real calls. Run it and point the app at it:
+
+    python local_llm_server.py --latency-ms 300 --error-rate 0.02
+    LLM_PROVIDER=local uvicorn app.main:app
+
+- /v1/embeddings: bags of hash-seeded word vectors, so texts sharing
+  words are similar (same text -> same vector)
+- /v1/chat/completions: canned JSON for KG extraction, question entities,
+  claim splitting and (batched) entailment checks; otherwise a grounded
+  answer of one verbatim and one reworded sentence, so verification runs
+  its lexical as well as its embedding / LLM tiers
+- latency (mean + jitter, per-token delay when streaming) and error injection
+  (429 with Retry-After, or 500) from the command line
+"""
+import re
+import json
+import time
+import uuid
+import base64
+import random
+import asyncio
+import hashlib
+import argparse
+from functools import lru_cache
+from typing import Any, Dict, List
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+config = {
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "token_delay_ms": 0.0,
+    "error_rate": 0.0,
+    "rate_limit_share": 0.5,
+    "dimensions": 1536
+}
+rng = random.Random(0)
+app = FastAPI(title="Local LLM stand-in")
+
+def _tokens(text: str) -> int:
+    return max((len(text) + 3) // 4, 1)
+
+def _title_terms(text: str, limit: int = 8) -> List[str]:
+    terms = re.findall(r"\b[A-Z][\w-]*(?:\s+[A-Z][\w-]*)*", text)
+    return list(dict.fromkeys(t for t in terms if len(t) > 2))[:limit]
+
+def _after(marker: str, text: str) -> str:
+    return text.split(marker, 1)[1].strip() if marker in text else text
+
+@lru_cache(maxsize=50_000)
+def _word_vector(word: str, dimensions: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+
+def embed(text: str, dimensions: int) -> np.ndarray:
+    words = re.findall(r"\w+", text.lower()) or [text]
+    vector = np.sum([_word_vector(word, dimensions) for word in words], axis=0)
+    return vector / np.linalg.norm(vector)
+
+def _supported(claim: str, evidence: str) -> bool:
+    claim_words = set(re.findall(r"\w+", claim.lower()))
+    evidence_words = set(re.findall(r"\w+", evidence.lower()))
+    return bool(claim_words) and len(claim_words & evidence_words) / len(claim_words) >= 0.5
+
+def _numbered(section: str) -> Dict[int, str]:
+    return {int(i): m.strip() for i, m in re.findall(r"^\[(\d+)\] (.*)$", section, flags=re.MULTILINE)}
+
+def _candidates(section: str) -> List[List[int]]:
+    return [[int(i) for i in re.findall(r"\d+", m)] for m in re.findall(r"^\s*passages: (.*)$", section, flags=re.MULTILINE)]
+
+def canned_reply(prompt: str) -> str:
+    """Pick the reply by the prompt the services send."""
+    # kg_builder.EXTRACTION_PROMPT (ingestion), or llm_service.extract_entities_relations
+    if "knowledge graph builder" in prompt or "knowledge graph extractor" in prompt:
+        entities = _title_terms(_after("Text:", prompt))
+        return json.dumps({
+            "entities": [{"name": e, "type": "CONCEPT"} for e in entities],
+            "relationships": [
+                {"source": a, "target": b, "relation": "RELATED_TO", "description": f"{a} appears with {b}"}
+                for a, b in zip(entities, entities[1:])
+            ]
+        })
+
+    if "Extract the main entities" in prompt:
+        return json.dumps({"entities": _title_terms(_after("Question:", prompt), limit=5)})
+
+    if "atomic, factual claims" in prompt:
+        text = _after("Text:", prompt)
+        return json.dumps({"claims": [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]})
+
+    if "Judge each claim" in prompt:
+        passages = _numbered(_after("Evidence:", prompt).split("Claims:")[0])
+        claim_section = _after("Claims:", prompt).split("Return JSON")[0]
+        claims = _numbered(claim_section)
+        candidates = _candidates(claim_section)
+        verdicts = []
+        for n, (i, claim) in enumerate(claims.items()):
+            shown = candidates[n] if n < len(candidates) else list(passages)
+            support = [j for j in shown if j in passages and _supported(claim, passages[j])]
+            verdicts.append({"claim": i, "supported": bool(support), "evidence": support})
+        return json.dumps({"verdicts": verdicts})
+
+    if "Does the evidence fully support" in prompt:
+        evidence = _after("Evidence:", prompt.split("Claim:")[0])
+        claim = _after("Claim:", prompt).split("Does the evidence")[0]
+        return json.dumps({"supported": _supported(claim, evidence)})
+
+    excerpts = re.findall(r"Text: (.+)", prompt)
+    if not excerpts:
+        return "I don't have sufficient evidence to answer this confidently."
+    sentences = [s for text in excerpts for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+    answer = sentences[0]
+    if len(sentences) > 1:
+        answer += f" According to the documents, {sentences[1][:1].lower()}{sentences[1][1:]}"
+    return answer
+
+async def inject_faults():
+    delay = max(config["latency_ms"] + rng.uniform(-1, 1) * config["jitter_ms"], 0.0)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+    if rng.random() < config["error_rate"]:
+        if rng.random() < config["rate_limit_share"]:
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": "1"}
+            )
+        return JSONResponse({"error": {"message": "Injected server error", "type": "server_error"}}, status_code=500)
+    return None
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "local", "object": "model", "created": 0, "owned_by": "local"}]}
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    failure = await inject_faults()
+    if failure:
+        return failure
+
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    dimensions = body.get("dimensions") or (3072 if "large" in body.get("model", "") else config["dimensions"])
+    data = []
+    for i, text in enumerate(inputs):
+        vector = embed(str(text), dimensions)
+        encoded = base64.b64encode(vector.tobytes()).decode() if body.get("encoding_format") == "base64" else vector.tolist()
+        data.append({"object": "embedding", "index": i, "embedding": encoded})
+
+    prompt_tokens = sum(_tokens(str(t)) for t in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "local"),
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+    }
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    failure = await inject_faults()
+    if failure:
+        return failure
+
+    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    reply = canned_reply(prompt)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "local")
+    usage = {
+        "prompt_tokens": _tokens(prompt),
+        "completion_tokens": _tokens(reply),
+        "total_tokens": _tokens(prompt) + _tokens(reply)
+    }
+
+    if body.get("stream"):
+        async def events():
+            for piece in re.findall(r"\S+\s*", reply):
+                if config["token_delay_ms"]:
+                    await asyncio.sleep(config["token_delay_ms"] / 1000)
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            done = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+        "usage": usage
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Deterministic local stand-in for the OpenAI API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter around the mean")
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--rate-limit-share", type=float, default=0.5, help="Share of failures returned as 429")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding size for non -large models")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error injection")
+    args = parser.parse_args()
+
+    config.update({
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "token_delay_ms": args.token_delay_ms,
+        "error_rate": args.error_rate,
+        "rate_limit_share": args.rate_limit_share,
+        "dimensions": args.dimensions
+    })
+    rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
\ No newline at end of file
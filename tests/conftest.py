@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+# Settings needs these to import; a real .env (or environment) takes precedence.
+if not os.path.exists(".env"):
+    for key, value in {
+        "OPENAI_API_KEY": "test",
+        "PINECONE_API_KEY": "test",
+        "PINECONE_ENVIRONMENT": "test",
+        "PINECONE_INDEX_NAME": "test",
+        "NEO4J_URI": "bolt://localhost:7687",
+        "NEO4J_USERNAME": "neo4j",
+        "NEO4J_PASSWORD": "test"
+    }.items():
+        os.environ.setdefault(key, value)
+
+# Always a throwaway SQLite database, never the one configured in .env.
+os.environ["SQLITE_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="rag_chatbot_tests_"), "tests.db")
\ No newline at end of file
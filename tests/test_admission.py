@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from contextlib import aclosing
+import pytest
+from fastapi import HTTPException
+from app.api.concurrency import AdmissionLimiter, iterate_blocking
+from app.core.config import settings
+
+def test_rejects_with_429_once_slots_and_queue_are_full():
+    async def scenario():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        await limiter.acquire()
+        with pytest.raises(HTTPException) as rejected:
+            await limiter.acquire()
+        limiter.release()
+        await limiter.acquire()
+        return limiter.stats(), rejected.value
+
+    stats, error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert error.headers["Retry-After"] == str(settings.backpressure_retry_after_seconds)
+    assert stats["admitted"] == 2 and stats["rejected"] == 1 and stats["active"] == 1
+
+def test_queued_request_rejected_after_queue_timeout():
+    async def scenario():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        await limiter.acquire()
+        with pytest.raises(HTTPException) as rejected:
+            await limiter.acquire()
+        return limiter.stats(), rejected.value
+
+    stats, error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert stats["waiting"] == 0 and stats["rejected"] == 1
+
+def test_queued_request_admitted_when_a_slot_frees():
+    async def scenario():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["waiting"] == 1
+        limiter.release()
+        await waiter
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 1 and stats["admitted"] == 2 and stats["rejected"] == 0
+
+def test_slot_releases_on_error():
+    async def scenario():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("handler failed")
+        return limiter.stats()
+
+    assert asyncio.run(scenario())["active"] == 0
+def test_releaser_releases_only_once():
+    async def scenario():
+        limiter = AdmissionLimiter("test", max_concurrent=2, max_queue=0, queue_timeout=1.0)
+        await limiter.acquire()
+        await limiter.acquire()
+        release = limiter.releaser()
+        await release()
+        await release()
+        return limiter.stats()
+
+    assert asyncio.run(scenario())["active"] == 1
+
+def test_abandoned_blocking_iterator_is_closed():
+    closed = threading.Event()
+
+    def pipeline():
+        try:
+            yield from range(10)
+        finally:
+            closed.set()
+
+    async def scenario():
+        async with aclosing(iterate_blocking(pipeline())) as steps:
+            async for step in steps:
+                break
+
+    asyncio.run(scenario())
+    assert closed.wait(timeout=1.0)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import time
+import numpy as np
+import pytest
+from app.database.repository import bump_ingestion_generation
+from app.services import answer_cache
+from app.services.answer_cache import AnswerCache
+
+RESPONSE = {"answer": "Aspirin is taken every four hours.", "confidence": 0.9}
+
+def vector(*values: float) -> np.ndarray:
+    return np.array(values, dtype=np.float32)
+
+@pytest.fixture
+def cache():
+    # A fresh generation per test keeps entries stored by other tests out of the index.
+    bump_ingestion_generation()
+    return AnswerCache(threshold=0.95, ttl_seconds=60, max_entries=100)
+
+def test_similar_question_hits(cache):
+    cache.store("How often is aspirin taken?", vector(1, 0, 0), "hybrid", None, RESPONSE, cache.generation())
+    hit = cache.lookup(vector(1, 0.05, 0), "hybrid")
+    assert hit["answer"] == RESPONSE["answer"]
+    assert hit["cached"] is True
+    assert hit["cache"]["matched_question"] == "How often is aspirin taken?"
+    assert cache.stats()["hits"] == 1
+
+def test_dissimilar_question_or_other_mode_misses(cache):
+    cache.store("How often is aspirin taken?", vector(1, 0, 0), "hybrid", None, RESPONSE, cache.generation())
+    assert cache.lookup(vector(0, 1, 0), "hybrid") is None
+    assert cache.lookup(vector(1, 0, 0), "rag") is None
+    assert cache.lookup(vector(1, 0, 0), "hybrid", {"document": "other.pdf"}) is None
+
+def test_refusals_are_not_cached(cache):
+    cache.store("Who won?", vector(1, 0, 0), "hybrid", None, {**RESPONSE, "refusal": True}, cache.generation())
+    assert cache.lookup(vector(1, 0, 0), "hybrid") is None
+
+def test_entries_expire_after_the_ttl(cache):
+    cache.ttl_seconds = 0.05
+    cache.store("How often is aspirin taken?", vector(1, 0, 0), "hybrid", None, RESPONSE, cache.generation())
+    time.sleep(0.1)
+    assert cache.lookup(vector(1, 0, 0), "hybrid") is None
+    assert cache.stats()["entries"] == 0
+
+def test_ingestion_invalidates_cached_answers(cache):
+    cache.store("How often is aspirin taken?", vector(1, 0, 0), "hybrid", None, RESPONSE, cache.generation())
+    cache.invalidate(bump_ingestion_generation())
+    assert cache.lookup(vector(1, 0, 0), "hybrid") is None
+    assert cache.stats()["entries"] == 0
+
+def test_ingestion_in_another_process_is_seen_after_the_recheck_interval(cache):
+    cache.recheck_seconds = 0.05
+    cache.store("How often is aspirin taken?", vector(1, 0, 0), "hybrid", None, RESPONSE, cache.generation())
+    bump_ingestion_generation()
+    time.sleep(0.1)
+    assert cache.lookup(vector(1, 0, 0), "hybrid") is None
+
+def test_lookups_do_not_read_the_generation_from_sqlite(monkeypatch, cache):
+    cache.store("How often is aspirin taken?", vector(1, 0, 0), "hybrid", None, RESPONSE, cache.generation())
+    reads = []
+    monkeypatch.setattr(answer_cache, "get_ingestion_generation", lambda: reads.append(1) or 0)
+    for _ in range(5):
+        assert cache.lookup(vector(1, 0, 0), "hybrid") is not None
+    assert reads == []
+
+def test_entries_reload_from_sqlite(cache):
+    generation = cache.generation()
+    cache.store("a", vector(1, 0, 0), "hybrid", None, RESPONSE, generation)
+    cache.store("b", vector(0, 1, 0), "rag_only", None, RESPONSE, generation)
+    fresh = AnswerCache(threshold=0.95, ttl_seconds=60, max_entries=100)
+    assert fresh.lookup(vector(0, 1, 0), "rag_only")["cache"]["matched_question"] == "b"
+    assert fresh.stats()["entries"] == 2
+
+def test_answer_built_on_an_older_generation_is_dropped(cache):
+    generation = cache.generation()
+    cache.invalidate(bump_ingestion_generation())
+    cache.store("How often is aspirin taken?", vector(1, 0, 0), "hybrid", None, RESPONSE, generation)
+    assert cache.lookup(vector(1, 0, 0), "hybrid") is None
+
+def test_least_recently_used_entry_evicted(cache):
+    cache.max_entries = 2
+    generation = cache.generation()
+    cache.store("a", vector(1, 0, 0), "hybrid", None, RESPONSE, generation)
+    cache.store("b", vector(0, 1, 0), "hybrid", None, RESPONSE, generation)
+    cache.lookup(vector(1, 0, 0), "hybrid")
+    cache.store("c", vector(0, 0, 1), "hybrid", None, RESPONSE, generation)
+    assert cache.lookup(vector(0, 1, 0), "hybrid") is None
+    assert cache.lookup(vector(1, 0, 0), "hybrid") is not None
+    assert cache.stats()["evictions"] == 1
\ No newline at end of file
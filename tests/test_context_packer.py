@@ -0,0 +1,96 @@
+from app.services import context_packer
+from app.services.context_packer import pack_context, count_tokens
+
+def chunk(chunk_id: str, text: str, similarity: float) -> dict:
+    return {"chunk_id": chunk_id, "document": "guide.pdf", "page": 1, "text": text, "similarity": similarity}
+
+def path(start: str, target: str, *confidences: float) -> dict:
+    return {
+        "start": start,
+        "target": target,
+        "path": [{"type": "RELATED_TO", "description": "", "confidence": c} for c in confidences]
+    }
+
+DOSAGE = (
+    "Adults take 500 mg of aspirin every four hours with water, at most four times a day. "
+    "Children under sixteen should not take aspirin because of the risk of Reye's syndrome. "
+    "Stop taking it and see a doctor if the pain lasts longer than ten days or a fever develops."
+)
+
+def test_near_duplicate_chunks_are_dropped():
+    packed = pack_context("aspirin dosage", {
+        "rag_evidence": [
+            chunk("a", DOSAGE, 0.9),
+            chunk("b", DOSAGE.replace("ten days", "10 days"), 0.8),
+            chunk("c", "Ibuprofen is an anti-inflammatory drug sold over the counter.", 0.7)
+        ],
+        "kg_evidence": []
+    }, token_budget=2000, chunk_max_tokens=400, dedup_threshold=0.8)
+    assert [ev["chunk_id"] for ev in packed["rag_evidence"]] == ["a", "c"]
+    assert packed["stats"]["duplicates_removed"] == 1
+
+def test_redundant_kg_paths_between_the_same_entities_are_dropped():
+    packed = pack_context("aspirin", {
+        "rag_evidence": [],
+        "kg_evidence": [path("Aspirin", "Pain", 0.9), path("Pain", "Aspirin", 0.8, 0.8), path("Aspirin", "Fever", 0.7)]
+    }, token_budget=2000, chunk_max_tokens=400, dedup_threshold=0.8)
+    assert [(f["start"], f["target"]) for f in packed["kg_evidence"]] == [("Aspirin", "Pain"), ("Aspirin", "Fever")]
+
+def test_best_items_kept_within_the_token_budget():
+    evidence = {
+        "rag_evidence": [chunk(str(i), f"Document {i} talks about topic number {i} at some length. " * 8, 0.9 - i / 100) for i in range(10)],
+        "kg_evidence": []
+    }
+    packed = pack_context("topic", evidence, token_budget=300, chunk_max_tokens=400, dedup_threshold=0.99)
+    kept = [ev["chunk_id"] for ev in packed["rag_evidence"]]
+    assert kept and kept == [str(i) for i in range(len(kept))]
+    assert count_tokens(packed["context"]) <= 300
+    assert packed["stats"]["items_dropped"] == 10 - len(kept)
+
+def test_long_chunks_are_truncated():
+    packed = pack_context("aspirin", {"rag_evidence": [chunk("a", "word " * 2000, 0.9)], "kg_evidence": []},
+                          token_budget=1000, chunk_max_tokens=50, dedup_threshold=0.8)
+    assert packed["rag_evidence"][0]["chunk_id"] == "a"
+    assert packed["stats"]["packed_tokens"] < 100
+
+def test_question_decides_between_chunks_and_kg_facts():
+    evidence = {
+        "rag_evidence": [chunk("a", "Ibuprofen is an anti-inflammatory drug sold over the counter.", 0.9)],
+        "kg_evidence": [path("Aspirin", "Reye Syndrome", 0.6)]
+    }
+    # Room for either item, not both.
+    budget = count_tokens(context_packer.DOCUMENT_HEADER) + count_tokens(context_packer.KG_HEADER) + max(
+        count_tokens(context_packer.format_chunk(evidence["rag_evidence"][0])),
+        count_tokens(context_packer.format_kg_fact(evidence["kg_evidence"][0]))
+    )
+    packed = pack_context("Can aspirin cause Reye syndrome?", evidence, token_budget=budget, chunk_max_tokens=400, dedup_threshold=0.8)
+    assert [(f["start"], f["target"]) for f in packed["kg_evidence"]] == [("Aspirin", "Reye Syndrome")]
+    assert packed["rag_evidence"] == []
+
+    packed = pack_context("What kind of drug is ibuprofen?", evidence, token_budget=budget, chunk_max_tokens=400, dedup_threshold=0.8)
+    assert [ev["chunk_id"] for ev in packed["rag_evidence"]] == ["a"]
+    assert packed["kg_evidence"] == []
+
+def test_stats_count_headers_on_both_sides():
+    packed = pack_context("aspirin", {"rag_evidence": [chunk("a", DOSAGE, 0.9)], "kg_evidence": [path("Aspirin", "Pain", 0.9)]},
+                          token_budget=2000, chunk_max_tokens=400, dedup_threshold=0.8)
+    assert packed["stats"]["candidate_tokens"] == packed["stats"]["packed_tokens"] == count_tokens(packed["context"])
+    assert packed["stats"]["tokens_saved"] == 0
+
+def test_token_counts_fall_back_when_the_encoding_cannot_load(monkeypatch):
+    class OfflineTiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            raise OSError("cannot download the BPE file")
+
+    monkeypatch.setattr(context_packer, "tiktoken", OfflineTiktoken)
+    context_packer._encoding.cache_clear()
+    try:
+        assert count_tokens("x" * 40) == 10
+    finally:
+        context_packer._encoding.cache_clear()
+
+def test_central_targets_rank_above_peripheral_ones():
+    fact = path("Aspirin", "Pain", 0.9)
+    assert context_packer._kg_score({**fact, "target_centrality": 0.9}) > context_packer._kg_score({**fact, "target_centrality": 0.1})
+    assert context_packer._kg_score({**fact, "target_centrality": 1.0}) == context_packer._kg_score(fact)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import time
+from app.utils.deadline import Deadline
+
+def test_budget_is_the_stage_limit_when_time_is_plentiful():
+    assert Deadline(30).budget(5.0) == 5.0
+
+def test_budget_capped_by_remaining_time():
+    budget = Deadline(2).budget(5.0)
+    assert 1.9 < budget <= 2.0
+
+def test_budget_keeps_the_reserve_for_later_stages():
+    budget = Deadline(10).budget(5.0, reserve=8.0)
+    assert 1.9 < budget <= 2.0
+
+def test_budget_never_negative():
+    assert Deadline(1).budget(5.0, reserve=3.0) == 0.0
+    expired = Deadline(0.01)
+    time.sleep(0.02)
+    assert expired.budget(5.0) == 0.0
+    assert not expired.allows(0.001)
+
+def test_from_ms_falls_back_to_the_default():
+    assert Deadline.from_ms(None, 30).seconds == 30
+    assert Deadline.from_ms(1500, 30).seconds == 1.5
\ No newline at end of file
@@ -0,0 +1,41 @@
+import pytest
+from app.database.neo4j_connection import graph_db
+from app.services.entity_matcher import EntityMatcher
+
+ENTITIES = [
+    {"name": "New York", "aliases": ["NYC"]},
+    {"name": "New York Times", "aliases": []},
+    {"name": "The Beatles", "aliases": []},
+    {"name": "Aspirin", "aliases": ["acetylsalicylic acid"]},
+    {"name": "Art", "aliases": []},
+    {"name": "It", "aliases": []}
+]
+
+@pytest.fixture
+def matcher(monkeypatch):
+    monkeypatch.setattr(graph_db, "read", lambda query, **params: ENTITIES)
+    return EntityMatcher(fuzzy_cutoff=0.88)
+
+def test_longest_entity_wins(matcher):
+    assert matcher.match("Who owns the New York Times?") == ["New York Times"]
+    assert matcher.match("How big is New York?") == ["New York"]
+
+def test_matches_whole_words_only(matcher):
+    assert matcher.match("Is this article about modern art?") == ["Art"]
+    assert matcher.match("What is an artist?") == []
+
+def test_aliases_and_a_dropped_leading_the(matcher):
+    assert matcher.match("Is acetylsalicylic acid safe in NYC?") == ["Aspirin", "New York"]
+    assert matcher.match("When did beatles split up?") == ["The Beatles"]
+
+def test_short_stopword_entities_are_not_matched(matcher):
+    assert matcher.match("What is it used for?") == []
+
+def test_fuzzy_match_absorbs_typos(matcher):
+    assert matcher.match("What is the aspirn dosage?") == ["Aspirin"]
+    assert matcher.stats()["fuzzy_matches"] == 1
+
+def test_added_entities_match_without_a_reload(matcher):
+    matcher.match("warm up")
+    matcher.add(["Ibuprofen"])
+    assert matcher.match("Compare ibuprofen and aspirin") == ["Ibuprofen", "Aspirin"]
\ No newline at end of file
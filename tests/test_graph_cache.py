@@ -0,0 +1,67 @@
+from app.services import kg_cache
+from app.services.kg_cache import GraphCache, EDGES_TOKEN
+
+def make_cache() -> GraphCache:
+    return GraphCache(max_bytes=1024 * 1024, ttl_seconds=60)
+
+def test_entry_served_until_a_dependency_is_bumped():
+    cache = make_cache()
+    cache.put("n:Aspirin", ["row"], ["Aspirin"], cache.stamp())
+    cache.invalidate(["Ibuprofen"])
+    assert cache.get("n:Aspirin") == ["row"]
+
+    cache.invalidate(["Aspirin"])
+    assert cache.get("n:Aspirin") is None
+
+def test_result_read_before_a_write_is_not_cached():
+    cache = make_cache()
+    stamp = cache.stamp()
+    cache.invalidate(["Aspirin"])
+    cache.put("n:Aspirin", ["stale"], ["Aspirin"], stamp)
+    assert cache.get("n:Aspirin") is None
+
+def test_result_read_after_a_write_is_cached():
+    cache = make_cache()
+    cache.invalidate(["Aspirin"])
+    cache.put("n:Aspirin", ["fresh"], ["Aspirin"], cache.stamp())
+    assert cache.get("n:Aspirin") == ["fresh"]
+
+def test_pair_path_invalidated_by_any_new_edge():
+    cache = make_cache()
+    cache.put(("path", "A", "D"), {"hops": 3}, [EDGES_TOKEN, "A", "D", "B", "C"], cache.stamp())
+    # A new edge between two entities off the cached path may still create a shorter one.
+    cache.invalidate(["X", "Y", EDGES_TOKEN])
+    assert cache.get(("path", "A", "D")) is None
+
+def test_clear_rejects_results_read_before_it():
+    cache = make_cache()
+    stamp = cache.stamp()
+    cache.clear()
+    cache.put("n:Aspirin", ["row"], ["Aspirin"], stamp)
+    assert cache.get("n:Aspirin") is None
+
+def test_lru_eviction_keeps_memory_bounded():
+    cache = GraphCache(max_bytes=2000, ttl_seconds=60)
+    for i in range(50):
+        cache.put(f"n:{i}", ["x" * 50], [f"E{i}"], cache.stamp())
+    stats = cache.stats()
+    assert stats["memory_bytes"] <= 2000
+    assert stats["evictions"] > 0
+    assert cache.get("n:49") is not None
+    assert cache.get("n:0") is None
+
+def test_version_stamps_stay_bounded(monkeypatch):
+    monkeypatch.setattr(kg_cache, "MIN_TRACKED_VERSIONS", 10)
+    cache = make_cache()
+    cache.put("n:Aspirin", ["row"], ["Aspirin"], cache.stamp())
+    cache.put("n:Pain", ["row"], ["Pain"], cache.stamp())
+    stamp = cache.stamp()
+    cache.invalidate(["Pain"])
+    for i in range(25):
+        cache.invalidate([f"E{i}"])
+    assert cache.stats()["tracked_entities"] <= 10
+    # Sweeping keeps what is fresh, drops what is stale and still rejects older reads.
+    assert cache.get("n:Aspirin") == ["row"]
+    assert cache.get("n:Pain") is None
+    cache.put("n:Pain", ["stale"], ["Pain"], stamp)
+    assert cache.get("n:Pain") is None
\ No newline at end of file
@@ -0,0 +1,113 @@
+import random
+import numpy as np
+from collections import deque
+from itertools import combinations
+from app.utils.kg_utils import find_connecting_paths
+from app.database.neo4j_connection import graph_db
+from app.services import kg_store
+from app.services.kg_cache import graph_cache
+
+def random_graph(nodes: int, edges: int, seed: int):
+    rng = random.Random(seed)
+    adjacency = {n: [] for n in range(nodes)}
+    for _ in range(edges):
+        a, b = rng.sample(range(nodes), 2)
+        relation = {"type": "RELATED_TO", "description": f"{a}-{b}"}
+        adjacency[a].append((b, relation))
+        adjacency[b].append((a, relation))
+    return adjacency
+
+def pair_bfs(adjacency, source, target, max_hops: int):
+    """Reference: plain BFS from `source`, one pair at a time."""
+    distance = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        if node == target:
+            return distance[node]
+        if distance[node] == max_hops:
+            continue
+        for neighbour, _ in adjacency[node]:
+            if neighbour not in distance:
+                distance[neighbour] = distance[node] + 1
+                queue.append(neighbour)
+    return None
+
+def expander(adjacency, calls):
+    def expand(frontier):
+        calls.append(list(frontier))
+        return {node: adjacency[node] for node in frontier}
+    return expand
+
+def test_matches_per_pair_bfs_on_random_graphs():
+    for seed in range(30):
+        adjacency = random_graph(nodes=40, edges=55, seed=seed)
+        sources = random.Random(seed).sample(range(40), 5)
+        for max_hops in (2, 3, 4):
+            found = find_connecting_paths(sources, expander(adjacency, []), max_hops=max_hops, max_paths=100)
+            hops = {frozenset((p["source"], p["target"])): p["hops"] for p in found}
+            for a, b in combinations(sources, 2):
+                assert hops.get(frozenset((a, b))) == pair_bfs(adjacency, a, b, max_hops), (seed, max_hops, a, b)
+
+def test_paths_follow_real_edges():
+    adjacency = random_graph(nodes=30, edges=45, seed=7)
+    for path in find_connecting_paths([0, 5, 11, 17], expander(adjacency, []), max_hops=4, max_paths=100):
+        nodes = path["nodes"]
+        assert nodes[0] == path["source"] and nodes[-1] == path["target"]
+        assert len(nodes) == path["hops"] + 1 == len(path["path"]) + 1
+        for a, b, relation in zip(nodes, nodes[1:], path["path"]):
+            assert (b, relation) in adjacency[a]
+
+def test_one_batched_expansion_per_level():
+    adjacency = random_graph(nodes=40, edges=60, seed=3)
+    calls = []
+    find_connecting_paths([0, 1, 2, 3], expander(adjacency, calls), max_hops=4)
+    assert len(calls) <= 2
+    expanded = [node for call in calls for node in call]
+    assert len(expanded) == len(set(expanded))
+
+def test_results_sorted_and_capped():
+    chain = {0: [(1, "r01")], 1: [(0, "r01"), (2, "r12")], 2: [(1, "r12"), (3, "r23")], 3: [(2, "r23")]}
+    paths = find_connecting_paths([0, 1, 3], expander(chain, []), max_hops=4, max_paths=2)
+    assert [(p["source"], p["target"], p["hops"]) for p in paths] == [(0, 1, 1), (1, 3, 2)]
+
+def test_fewer_than_two_sources():
+    assert find_connecting_paths(["A", "", None, "A"], lambda frontier: {}) == []
+
+class GraphTransaction:
+    """Answers the neighbourhood and BFS frontier queries from an in-memory graph."""
+
+    def __init__(self, adjacency):
+        self.adjacency = adjacency
+        self.queries = []
+
+    def run(self, query, **params):
+        self.queries.append(query)
+        if query == kg_store.FRONTIER_QUERY:
+            return [
+                {"name": name, "neighbour": neighbour, "type": r["type"], "description": r["description"]}
+                for name in params["names"] for neighbour, r in self.adjacency.get(name, [])
+            ]
+        return [{"seed": seed, "paths": []} for seed in params["seeds"]]
+
+def test_kg_context_finds_pair_paths_with_the_shared_bfs(monkeypatch):
+    relation = {"type": "TREATS", "description": ""}
+    adjacency = {
+        "Aspirin": [("Pain", relation)],
+        "Pain": [("Aspirin", relation), ("Fever", relation)],
+        "Fever": [("Pain", relation)]
+    }
+    tx = GraphTransaction(adjacency)
+    monkeypatch.setattr(graph_db, "execute_read", lambda work, *args: work(tx, *args))
+    monkeypatch.setattr(kg_store, "get_entity_scores", lambda names: {"centrality": np.full(len(names), 0.5)})
+    graph_cache.clear()
+
+    context = kg_store.get_kg_context(["Aspirin", "Fever"], max_seed_entities=1)
+    assert [(p["source"], p["target"], p["hops"]) for p in context["claim_paths"]] == [("Aspirin", "Fever", 2)]
+    assert context["claim_paths"][0]["nodes"] == ["Aspirin", "Pain", "Fever"]
+    assert context["claim_paths"][0]["target_centrality"] == 0.5
+    assert tx.queries.count(kg_store.FRONTIER_QUERY) == 1
+
+    tx.queries.clear()
+    kg_store.get_kg_context(["Aspirin", "Fever"], max_seed_entities=1)
+    assert tx.queries == []
\ No newline at end of file
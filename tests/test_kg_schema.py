@@ -0,0 +1,20 @@
+import re
+import pytest
+from app.database.neo4j_connection import graph_db
+from app.services.kg_schema import SAMPLE_PARAMS, check_query_plans, collect_queries
+
+def test_sample_params_cover_every_graph_query():
+    # EXPLAIN still needs every parameter bound.
+    for name, query in collect_queries().items():
+        missing = set(re.findall(r"\$(\w+)", query)) - set(SAMPLE_PARAMS)
+        assert not missing, f"{name} uses {missing}"
+
+@pytest.fixture(scope="module")
+def neo4j():
+    try:
+        graph_db.driver.verify_connectivity()
+    except Exception as e:
+        pytest.skip(f"Neo4j not reachable: {e}")
+
+def test_hot_queries_plan_index_seeks(neo4j):
+    assert check_query_plans() == []
\ No newline at end of file
@@ -0,0 +1,44 @@
+from app.utils.metrics import Counter, Histogram, MetricsRegistry
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, route="/chat")
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        'latency_seconds_bucket{route="/chat",le="0.1"} 2',
+        'latency_seconds_bucket{route="/chat",le="1"} 3',
+        'latency_seconds_bucket{route="/chat",le="+Inf"} 4',
+        'latency_seconds_sum{route="/chat"} 2.65',
+        'latency_seconds_count{route="/chat"} 4'
+    ]
+
+def test_histogram_series_per_label_combination():
+    histogram = Histogram("span_seconds", "Spans", ("span", "status"), buckets=(1.0,))
+    histogram.observe(0.5, span="embedding", status="ok")
+    histogram.observe(0.5, span="embedding", status="error")
+    counts = [line for line in histogram.render() if "_count" in line]
+    assert counts == [
+        'span_seconds_count{span="embedding",status="error"} 1',
+        'span_seconds_count{span="embedding",status="ok"} 1'
+    ]
+
+def test_counter_and_label_escaping():
+    counter = Counter("calls_total", "Calls", ("model",))
+    counter.inc(model='gpt "4o"')
+    counter.inc(2, model='gpt "4o"')
+    assert counter.render()[-1] == 'calls_total{model="gpt \\"4o\\""} 3'
+
+def test_registry_renders_stats_sources_as_gauges():
+    registry = MetricsRegistry("rag")
+    registry.counter("calls_total", "Calls").inc()
+    registry.add_stats("cache", lambda: {"hits": 3, "hit_rate": 0.75, "by_class": {"interactive": 2}, "name": "x"})
+    registry.add_stats("broken", lambda: 1 / 0)
+    text = registry.render()
+    assert "rag_calls_total 1\n" in text
+    assert "rag_cache_hits 3\n" in text
+    assert "rag_cache_hit_rate 0.75\n" in text
+    assert 'rag_cache_by_class{key="interactive"} 2\n' in text
+    assert "rag_cache_name" not in text
+    assert "# rag_broken unavailable" in text
\ No newline at end of file
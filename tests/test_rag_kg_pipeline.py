@@ -0,0 +1,139 @@
+import time
+import pytest
+from app.core.config import settings
+
+try:
+    from app.services import rag_pipeline
+except Exception as e:  # vector_store connects to Pinecone on import
+    pytest.skip(f"vector store unavailable: {e}", allow_module_level=True)
+
+def evidence(similarities, kg_paths: int = 0) -> dict:
+    return {
+        "rag_evidence": [{"chunk_id": str(i), "similarity": s} for i, s in enumerate(similarities)],
+        "kg_evidence": [{"path": []}] * kg_paths
+    }
+
+def test_gate_passes_evidence_that_could_carry_an_answer():
+    assert rag_pipeline.evidence_gate(evidence([0.8, 0.6])) is None
+
+def test_gate_refuses_when_even_full_support_stays_under_the_threshold(monkeypatch):
+    monkeypatch.setattr(settings, "answer_confidence_threshold", 0.5)
+    # 0.4 * 0.2 retrieval + 0.3 claim support = 0.38 at best.
+    gate = rag_pipeline.evidence_gate(evidence([0.2]))
+    assert gate["reason"] == "max_confidence"
+    assert gate["max_confidence"] == 0.38
+
+def test_kg_coverage_lifts_the_ceiling(monkeypatch):
+    monkeypatch.setattr(settings, "answer_confidence_threshold", 0.5)
+    assert rag_pipeline.evidence_gate(evidence([0.2], kg_paths=5)) is None
+
+def test_gate_refuses_on_a_weak_best_chunk(monkeypatch):
+    monkeypatch.setattr(settings, "evidence_min_top_similarity", 0.7)
+    gate = rag_pipeline.evidence_gate(evidence([0.65, 0.6], kg_paths=5))
+    assert gate["reason"] == "top_similarity"
+    assert gate["top_similarity"] == 0.65
+
+def test_gate_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "evidence_gate_enabled", False)
+    assert rag_pipeline.evidence_gate(evidence([])) is None
+
+MATCHES = {
+    "What treats pain?": [{"chunk_id": "c1", "document": "a.pdf", "page": 1, "similarity": 0.9}],
+    "What treats fever?": [
+        {"chunk_id": "c1", "document": "a.pdf", "page": 1, "similarity": 0.7},
+        {"chunk_id": "c2", "document": "b.pdf", "page": 2, "similarity": 0.8}
+    ]
+}
+ENTITIES = {"What treats pain?": ["Pain"], "What treats fever?": ["Fever"]}
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = {"texts": [], "kg": []}
+    monkeypatch.setattr(settings, "rerank_enabled", False)
+    monkeypatch.setattr(rag_pipeline, "pinecone_query", lambda question, *args: MATCHES[question])
+    monkeypatch.setattr(rag_pipeline, "extract_entities_from_question", lambda question: ENTITIES[question])
+
+    def get_chunk_texts(chunk_ids):
+        calls["texts"].append(chunk_ids)
+        return {chunk_id: f"text of {chunk_id}" for chunk_id in chunk_ids}
+
+    def get_kg_contexts(entity_lists, *args):
+        calls["kg"].append(entity_lists)
+        return [
+            {"neighbours": [{"start": entities[0], "target": "Aspirin", "path": []}], "claim_paths": []}
+            for entities in entity_lists
+        ]
+
+    monkeypatch.setattr(rag_pipeline, "get_chunk_texts", get_chunk_texts)
+    monkeypatch.setattr(rag_pipeline, "get_kg_contexts", get_kg_contexts)
+    return calls
+
+def test_batch_shares_chunk_text_and_graph_lookups(lookups):
+    results = rag_pipeline.batch_retrieval(list(MATCHES), top_k=5)
+
+    assert lookups["texts"] == [["c1", "c2"]]
+    assert lookups["kg"] == [[["Pain"], ["Fever"]]]
+    assert [[ev["text"] for ev in r["rag_evidence"]] for r in results] == [["text of c1"], ["text of c1", "text of c2"]]
+    assert [r["entities"] for r in results] == [["Pain"], ["Fever"]]
+    assert [r["kg_evidence"][0]["start"] for r in results] == ["Pain", "Fever"]
+    assert all(r["branches"]["vector"]["status"] == r["branches"]["kg"]["status"] == "ok" for r in results)
+
+def test_failed_graph_lookup_degrades_kg_for_every_question(monkeypatch, lookups):
+    def unavailable(entity_lists, *args):
+        raise RuntimeError("graph unavailable")
+
+    monkeypatch.setattr(rag_pipeline, "get_kg_contexts", unavailable)
+    results = rag_pipeline.batch_retrieval(list(MATCHES), top_k=5)
+
+    assert [r["branches"]["kg"]["status"] for r in results] == ["error", "error"]
+    assert all(r["kg_evidence"] == [] and r["rag_evidence"] for r in results)
+
+def test_rag_only_mode_skips_the_graph(lookups):
+    results = rag_pipeline.batch_retrieval(list(MATCHES), top_k=5, mode="rag_only")
+    assert lookups["kg"] == []
+    assert all("kg" not in r["branches"] for r in results)
+def test_slow_graph_lookup_times_out_for_every_question(monkeypatch, lookups):
+    def slow(entity_lists, *args):
+        time.sleep(0.5)
+        return [{"neighbours": [], "claim_paths": []} for _ in entity_lists]
+
+    monkeypatch.setattr(settings, "retrieval_kg_timeout_seconds", 0.1)
+    monkeypatch.setattr(rag_pipeline, "get_kg_contexts", slow)
+    started = time.monotonic()
+    results = rag_pipeline.batch_retrieval(list(MATCHES), top_k=5)
+
+    assert time.monotonic() - started < 0.4
+    assert [r["branches"]["kg"]["status"] for r in results] == ["timeout", "timeout"]
+    assert all(r["rag_evidence"] for r in results)
+
+def test_graph_lookup_skipped_when_no_question_names_an_entity(monkeypatch, lookups):
+    monkeypatch.setattr(rag_pipeline, "extract_entities_from_question", lambda question: [])
+    results = rag_pipeline.batch_retrieval(list(MATCHES), top_k=5)
+    assert lookups["kg"] == []
+    assert [r["branches"]["kg"]["status"] for r in results] == ["ok", "ok"]
+
+def stalled_stream(question, evidence, timeout=None):
+    time.sleep(2)
+    yield "too late"
+
+def test_stream_that_stalls_before_its_first_token_ends_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(rag_pipeline, "_cache_lookup", lambda *args: {"response": None, "embedding": None})
+    monkeypatch.setattr(rag_pipeline, "stream_answer", stalled_stream)
+    monkeypatch.setattr(settings, "generation_min_seconds", 0.0)
+    started = time.monotonic()
+    events = list(rag_pipeline.stream_rag_pipeline("What is aspirin?", 1, mode="llm_only", deadline=rag_pipeline.Deadline(0.3)))
+    assert time.monotonic() - started < 1.5
+    assert [e["event"] for e in events] == ["final"]
+    assert events[-1]["data"]["degraded"] == ["generation"]
+
+def test_stream_within_passes_tokens_and_errors_through():
+    def tokens():
+        yield "a"
+        yield "b"
+        raise ValueError("upstream down")
+
+    seen = []
+    with pytest.raises(ValueError):
+        for token in rag_pipeline._stream_within(tokens(), rag_pipeline.Deadline(5)):
+            seen.append(token)
+    assert seen == ["a", "b"]
\ No newline at end of file
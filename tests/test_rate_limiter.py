@@ -0,0 +1,70 @@
+import time
+import httpx
+import openai
+import pytest
+from app.services.rate_limiter import UpstreamScheduler, RATE_LIMIT_BACKOFF, RECOVERY_STEP
+
+def make_scheduler(**overrides) -> UpstreamScheduler:
+    options = dict(requests_per_minute=1000, tokens_per_minute=600, max_retries=2, backoff_base=0.01, backoff_max=0.05)
+    options.update(overrides)
+    return UpstreamScheduler(**options)
+
+def rate_limit_error() -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after-ms": "20"})
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+def test_token_bucket_makes_callers_wait_for_refill():
+    scheduler = make_scheduler()
+    scheduler.call(lambda: None, estimated_tokens=600)
+
+    # 600 tokens per minute refill 10 per second; the next 3 tokens take ~0.3s.
+    started = time.monotonic()
+    scheduler.call(lambda: None, estimated_tokens=3)
+    assert time.monotonic() - started >= 0.25
+
+def test_request_larger_than_the_bucket_still_runs():
+    scheduler = make_scheduler()
+    started = time.monotonic()
+    assert scheduler.call(lambda: "ok", estimated_tokens=10_000) == "ok"
+    assert time.monotonic() - started < 0.1
+
+def test_rate_limit_cuts_the_rate_and_success_recovers_it():
+    scheduler = make_scheduler()
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise rate_limit_error()
+        return "ok"
+
+    assert scheduler.call(flaky) == "ok"
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == 1 and stats["retries"] == 1
+    assert stats["effective_requests_per_minute"] == pytest.approx(1000 * (RATE_LIMIT_BACKOFF + RECOVERY_STEP))
+    # Retry-After was honoured before the second attempt.
+    assert attempts[1] - attempts[0] >= 0.02
+
+def test_non_retryable_errors_fail_without_retry():
+    scheduler = make_scheduler()
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(broken)
+    stats = scheduler.stats()
+    assert stats["failures"] == 1 and stats["retries"] == 0
+
+def test_gives_up_after_max_retries():
+    scheduler = make_scheduler(max_retries=1)
+
+    def always_limited():
+        raise rate_limit_error()
+
+    with pytest.raises(openai.RateLimitError):
+        scheduler.call(always_limited)
+    stats = scheduler.stats()
+    assert stats["retries"] == 1 and stats["failures"] == 1
+    assert stats["effective_requests_per_minute"] == pytest.approx(1000 * RATE_LIMIT_BACKOFF ** 2)
\ No newline at end of file
@@ -0,0 +1,40 @@
+import numpy as np
+from app.services.reranker import mmr_select, rerank
+
+def test_mmr_without_vectors_is_top_k():
+    scores = np.array([0.2, 0.9, 0.5, 0.7])
+    assert mmr_select(scores, None, 3, mmr_lambda=0.7) == [1, 3, 2]
+
+def test_mmr_skips_a_near_duplicate():
+    scores = np.array([0.9, 0.89, 0.6])
+    vectors = np.array([[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]])
+    assert mmr_select(scores, vectors, 2, mmr_lambda=0.7) == [0, 2]
+
+def test_mmr_lambda_one_ignores_redundancy():
+    scores = np.array([0.9, 0.89, 0.6])
+    vectors = np.array([[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]])
+    assert mmr_select(scores, vectors, 2, mmr_lambda=1.0) == [0, 1]
+
+def test_mmr_returns_at_most_the_candidates():
+    assert mmr_select(np.array([0.3, 0.4]), None, 5, mmr_lambda=0.7) == [1, 0]
+
+def candidates():
+    return [
+        {"chunk_id": "a", "document": "d1", "similarity": 0.80, "text": "Aspirin dosage for adults"},
+        {"chunk_id": "b", "document": "d2", "similarity": 0.78, "text": "Ibuprofen dosage for adults"}
+    ]
+
+def test_kg_feature_lifts_chunks_mentioning_question_entities():
+    ranked = rerank(
+        "What is the aspirin dosage?", candidates(), 2,
+        question_entities=["Ibuprofen"], chunk_entities={"b": ["Ibuprofen"]},
+        weights={"dense": 0.6, "lexical": 0.0, "kg": 0.4, "diversity": 0.0}
+    )
+    assert [c["chunk_id"] for c in ranked] == ["b", "a"]
+
+def test_missing_chunk_entities_drop_the_kg_feature_and_keep_the_scale():
+    weights = {"dense": 0.6, "lexical": 0.0, "kg": 0.4, "diversity": 0.0}
+    ranked = rerank("What is the dosage?", candidates(), 2, question_entities=["Ibuprofen"], chunk_entities=None, weights=weights)
+    assert [c["chunk_id"] for c in ranked] == ["a", "b"]
+    # The dense weight is scaled up to the full 1.0 the weights sum to.
+    assert ranked[0]["rerank_score"] == 0.8
\ No newline at end of file
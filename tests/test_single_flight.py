@@ -0,0 +1,80 @@
+import time
+import asyncio
+import threading
+import pytest
+from app.utils.single_flight import SingleFlight
+
+def slow_call(calls, result, delay=0.2):
+    def fn():
+        calls.append(1)
+        time.sleep(delay)
+        return result
+    return fn
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls, results = [], []
+    fn = slow_call(calls, 42)
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fn))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [42] * 8
+    assert len(calls) == 1
+    assert flight.stats()["coalesced_calls"] == 7
+    assert flight.stats()["in_flight"] == 0
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight("test")
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    errors = []
+    def follower():
+        started.wait()
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(ValueError):
+        flight.do("k", failing)
+    thread.join()
+    assert errors == ["upstream down"]
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight("test")
+    calls = []
+    assert flight.do("k", slow_call(calls, 1, delay=0)) == 1
+    assert flight.do("k", slow_call(calls, 2, delay=0)) == 2
+    assert len(calls) == 2
+
+def test_cancelled_async_leader_does_not_fail_followers():
+    flight = SingleFlight("test")
+    calls = []
+    fn = slow_call(calls, 42, delay=0.3)
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do_async("k", fn))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(flight.do_async("k", fn))
+        thread_result = []
+        thread = threading.Thread(target=lambda: thread_result.append(flight.do("k", fn)))
+        thread.start()
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == 42
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        return thread_result
+
+    assert asyncio.run(scenario()) == [42]
+    assert len(calls) == 1
\ No newline at end of file
@@ -0,0 +1,101 @@
+import json
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.services import verification
+from app.services.evidence_index import EvidenceIndex
+from app.services.verification import lexical_support
+from app.services.explanation import _supported_by
+
+PASSAGES = [
+    "Globex acquired Initech in 2015 for 40 million dollars after the board reviewed the deal.",
+    "The combined company is headquartered in Oslo and employs 400 people.",
+    "Initech acquired Globex in 2015 for 40 million dollars after the board reviewed the deal."
+]
+
+def test_containment_is_the_share_of_claim_shingles_per_passage():
+    index = EvidenceIndex(PASSAGES)
+    contained = index.containment("The combined company is headquartered in Lisbon.")
+    # 5 shingles; passage 1 has all but "headquartered in lisbon"
+    assert np.allclose(contained, [0.0, 0.8, 0.0])
+
+def test_containment_ignores_case_and_punctuation():
+    index = EvidenceIndex(PASSAGES)
+    contained = index.containment("the COMBINED company, is headquartered in oslo")
+    assert contained[1] == 1.0
+
+def test_claims_shorter_than_a_shingle_contain_nothing():
+    index = EvidenceIndex(PASSAGES)
+    assert not index.containment("Globex Initech").any()
+
+def test_lexical_support_accepts_verbatim_statements():
+    index = EvidenceIndex(PASSAGES)
+    assert lexical_support("Globex acquired Initech in 2015", index, 1.0) == [0]
+    assert lexical_support("the board reviewed the deal", index, 1.0) == [0, 2]
+
+def test_lexical_support_rejects_a_changed_last_word():
+    index = EvidenceIndex(PASSAGES)
+    claim = "Globex acquired Initech in 2015 for 40 million dollars after the board reviewed the merger."
+    assert index.containment(claim)[0] >= 0.9
+    assert lexical_support(claim, index, 0.9) == []
+
+def test_lexical_support_rejects_swapped_roles_at_full_containment():
+    index = EvidenceIndex(PASSAGES[:1])
+    claim = "Initech acquired Globex in 2015 for 40 million dollars after the board reviewed the deal."
+    assert lexical_support(claim, index, 1.0) == []
+
+JUDGED_PASSAGES = ["Aspirin relieves pain.", "Aspirin thins the blood.", "Ibuprofen reduces swelling."]
+CLAIMS = ["Aspirin relieves pain.", "Ibuprofen thins the blood."]
+CANDIDATES = [[0, 1], [1, 2]]
+
+@pytest.fixture
+def batched(monkeypatch):
+    monkeypatch.setattr(settings, "verification_mode", "batched")
+    checked = []
+
+    def check(claim, evidence):
+        checked.append(claim)
+        return claim == CLAIMS[0]
+
+    monkeypatch.setattr(verification, "_check_entailment", check)
+    return checked
+
+def reply(monkeypatch, content: str) -> None:
+    monkeypatch.setattr(verification, "generate_structured", lambda prompt, **kwargs: content)
+
+def test_batched_verdicts_keep_only_valid_evidence_indices(monkeypatch, batched):
+    reply(monkeypatch, json.dumps({"verdicts": [
+        {"claim": 0, "supported": True, "evidence": [0, 7]},
+        {"claim": 1, "supported": False, "evidence": []}
+    ]}))
+    verdicts = verification._judge_with_llm(CLAIMS, JUDGED_PASSAGES, CANDIDATES)
+    assert [(v["supported"], v["evidence"]) for v in verdicts] == [(True, [0]), (False, [])]
+    assert batched == []
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    json.dumps({"answer": "yes"}),
+    json.dumps({"verdicts": [{"claim": 0, "supported": True, "evidence": [0]}]})
+])
+def test_unusable_batched_output_falls_back_to_per_claim_checks(monkeypatch, batched, content):
+    reply(monkeypatch, content)
+    verdicts = verification._judge_with_llm(CLAIMS, JUDGED_PASSAGES, CANDIDATES)
+    assert sorted(batched) == sorted(CLAIMS)
+    assert [v["supported"] for v in verdicts] == [True, False]
+    assert verdicts[0]["evidence"] == CANDIDATES[0]
+
+def test_failed_claim_extraction_is_unverified(monkeypatch):
+    monkeypatch.setattr(verification, "_extract_atomic_claims", lambda text: None)
+    result = verification.verify_claims("Aspirin relieves pain.", {"rag_evidence": [{"text": "Aspirin relieves pain."}], "kg_evidence": []})
+    assert result["status"] == "unverified"
+    assert result["support_ratio"] == 0.0
+
+def test_supported_by_names_the_evidence_kinds():
+    kinds = ["text", "text", "kg"]
+    assert _supported_by({"evidence": [0, 2], "candidates": [0, 1, 2]}, kinds) == "text + KG"
+    assert _supported_by({"evidence": [2], "candidates": [0, 1, 2]}, kinds) == "KG"
+
+def test_supported_by_without_cited_evidence_uses_the_candidates():
+    kinds = ["text", "text", "kg"]
+    assert _supported_by({"evidence": [], "candidates": [0, 1]}, kinds) == "text"
+    assert _supported_by({"evidence": [], "candidates": []}, kinds) == "unattributed"
\ No newline at end of file